@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Time for the batch calculator compared with one call per formula.
+
+Compares nsf.neutron_scattering and xsf.xray_sld called for each formula
+against :func:`periodictable.batch.calculate` on the same rows.
+
+Usage::
+
+    python benchmarks/batch.py [nformulas] [workers]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from periodictable import neutron_scattering, xray_sld, Cu
+from periodictable.batch import calculate
+
+def sample_rows(n):
+    """
+    Returns *n* rows with a few hundred distinct formulas, as in an
+    inventory or a list of candidate materials.
+    """
+    bases = ['H2O', 'D2O', 'SiO2', 'CaCO3', 'Fe2O3', 'C6H12O6', 'NaCl', 'Al2O3']
+    return [dict(formula="%s%d"%(bases[k%len(bases)], 1 + k%37),
+                 density=1 + (k%11)/10)
+            for k in range(n)]
+
+def one_at_a_time(rows):
+    """
+    Returns SLDs using one library call per formula.
+    """
+    result = []
+    for row in rows:
+        sld, _, penetration = neutron_scattering(row['formula'],
+                                                 density=row['density'])
+        rho, irho = xray_sld(row['formula'], density=row['density'],
+                             wavelength=Cu.K_alpha)
+        result.append((sld, penetration, rho, irho))
+    return result
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    rows = sample_rows(n)
+    m = min(n, 5000)
+    t0 = time.time()
+    one_at_a_time(rows[:m])
+    t1 = time.time()
+    for _ in calculate(rows, workers=workers):
+        pass
+    t2 = time.time()
+    print("%d formulas" % n)
+    print("one at a time  %8.2f us/formula" % (1e6*(t1-t0)/m))
+    print("batch (%d proc) %8.2f us/formula" % (workers, 1e6*(t2-t1)/n))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+Memory use and attribute access time for isotopes and ions.
+
+Reports the memory allocated by a private table with mass, density and
+neutron properties, measured with tracemalloc, and the time for common
+attribute lookups on isotopes and ions.
+
+Usage::
+
+    python benchmarks/isotopes.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from periodictable import core, mass, density, nsf
+
+def table_memory():
+    """
+    Returns the bytes allocated for a new table and for its isotopes and ions.
+    """
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    table = core.PeriodicTable("memory")
+    for module in (mass, density, nsf):
+        module.init(table)
+    loaded = tracemalloc.get_traced_memory()[0]
+    ions = [iso.ion[c] for el in table for iso in el for c in el.ions]
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    isotopes = sum(len(el.isotopes) for el in table)
+    return loaded - start, isotopes, used - loaded, len(ions)
+
+ACCESS = [
+    ("iso.mass", "iso.mass"),
+    ("iso.abundance", "iso.abundance"),
+    ("iso.neutron.b_c", "iso.neutron.b_c"),
+    ("iso.symbol", "iso.symbol"),
+    ("iso.number", "iso.number"),
+    ("str(iso)", "str(iso)"),
+    ("ion.mass", "ion.mass"),
+    ("ion.neutron", "ion.neutron"),
+]
+
+def main():
+    table_bytes, isotopes, ion_bytes, ions = table_memory()
+    print("table  %8.1f kB for %d isotopes"%(table_bytes/1024, isotopes))
+    print("ions   %8.1f kB for %d ions"%(ion_bytes/1024, ions))
+
+    import periodictable
+    periodictable.Ni.neutron  # load the neutron table
+    namespace = dict(iso=periodictable.Ni[58],
+                     ion=periodictable.Ni[58].ion[2])
+    number = 200000
+    for label, stmt in ACCESS:
+        t = min(timeit.repeat(stmt, number=number, repeat=3, globals=namespace))
+        print("%-16s %6.1f ns"%(label, 1e9*t/number))
+
+if __name__ == "__main__":
+    main()
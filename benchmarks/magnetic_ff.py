@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+First access latency for the magnetic form factor table.
+
+Compares the eval based parser used before periodictable 1.5.3 against the
+compiled coefficient table, both for parsing alone and for the first access
+of ``Fe.magnetic_ff`` in a fresh interpreter.
+
+Usage::
+
+    python benchmarks/magnetic_ff.py
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from periodictable import magnetic_ff
+
+def eval_parse(data):
+    """
+    The magnetic_ff.init parser from periodictable 1.5.2.
+    """
+    def Magnetic_Form_Type(state, values):
+        return state, values
+    result = {}
+    for line in data.replace('&\n', '').split('\n'):
+        line = line.strip()
+        if '=' not in line:
+            continue
+        a, b = line.split('=')
+        state, values = eval(b.replace('/', ''))
+        if a.startswith('Magnetic_Form'):
+            jn = "j0" if state[0] == 'M' else "J"
+            state = state[1:]
+        else:
+            jn = a.strip()[9:11]
+        if state[1].isdigit():
+            key = state[0], int(state[1])
+        else:
+            key = state[0:2].capitalize(), int(state[2])
+        result.setdefault(key, {})[jn] = values
+    return result
+
+# numpy is imported first since its import time would otherwise dominate.
+FIRST_ACCESS = """
+import time
+import numpy
+t0 = time.time()
+import periodictable
+t1 = time.time()
+periodictable.Fe.magnetic_ff
+t2 = time.time()
+print(t1 - t0, t2 - t1)
+"""
+
+def first_access(repeat=5):
+    """
+    Returns the best time to first access Fe.magnetic_ff in a new process.
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    best = float('inf')
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', FIRST_ACCESS],
+                                         env=env)
+        best = min(best, float(output.split()[1]))
+    return best
+
+def main():
+    number = 20
+    data = magnetic_ff.CFML_DATA
+    t_eval = min(timeit.repeat(lambda: eval_parse(data),
+                               number=number, repeat=3))/number
+    t_table = min(timeit.repeat(lambda: magnetic_ff._parse_cfml(data),
+                                number=number, repeat=3))/number
+    print("parse CFML_DATA    eval %7.2f ms   table %7.2f ms"
+          % (1e3*t_eval, 1e3*t_table))
+    print("first access (current tree) %7.2f ms" % (1e3*first_access()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Time to compute density and SLD for many mixtures of the same components.
+
+Compares building a formula with :func:`periodictable.mix_by_weight` for
+each set of fractions against :class:`periodictable.formulas.Mixer` for
+the whole grid.
+
+Usage::
+
+    python benchmarks/mixer.py [npoints]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+import numpy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from periodictable import formula, mix_by_weight, neutron_sld, xray_sld
+from periodictable.formulas import Mixer
+
+COMPONENTS = ['H2O@1', 'D2O@1n', 'NaCl@2.16', 'SiO2@2.2', 'C3H8O3@1.26']
+
+def by_formula(fractions):
+    """
+    Returns density, neutron and X-ray SLD using one formula per row.
+    """
+    components = [formula(c) for c in COMPONENTS]
+    result = []
+    for row in fractions:
+        args = []
+        for c, q in zip(components, row):
+            args.extend((c, q))
+        f = mix_by_weight(*args)
+        result.append((f.density, neutron_sld(f)[0], xray_sld(f, energy=8)[0]))
+    return numpy.array(result)
+
+def by_mixer(fractions):
+    """
+    Returns density, neutron and X-ray SLD using a Mixer for all rows.
+    """
+    mixer = Mixer(COMPONENTS)
+    return numpy.array([mixer.density(fractions),
+                        mixer.neutron_sld(fractions)[0],
+                        mixer.xray_sld(fractions, energy=8)[0]]).T
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    fractions = numpy.random.dirichlet(numpy.ones(len(COMPONENTS)), size=n)
+    by_formula(fractions[:10]) # load tables
+    m = min(n, 2000)
+    t0 = time.time()
+    slow = by_formula(fractions[:m])
+    t1 = time.time()
+    fast = by_mixer(fractions)
+    t2 = time.time()
+    assert numpy.allclose(slow, fast[:m])
+    print("%d mixtures of %d components" % (n, len(COMPONENTS)))
+    print("mix_by_weight %9.2f us/point" % (1e6*(t1-t0)/m))
+    print("Mixer         %9.2f us/point" % (1e6*(t2-t1)/n))
+
+if __name__ == "__main__":
+    main()
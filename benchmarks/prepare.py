@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Time to compute neutron and X-ray SLD for a compound at many densities,
+wavelengths and energies, as when fitting a model.
+
+Compares calling :func:`periodictable.neutron_sld` and
+:func:`periodictable.xray_sld` for each point against the methods of
+:func:`periodictable.prepare` for all points.
+
+Usage::
+
+    python benchmarks/prepare.py [npoints]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+import numpy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from periodictable import formula, neutron_sld, xray_sld, prepare
+
+COMPOUND = 'C3H5(C3H4O2)(C8H8)2Si0.1Fe0.02'
+
+def timed(fn, *args):
+    """
+    Returns the result of *fn(*args)* and the time it took.
+    """
+    t0 = time.time()
+    result = fn(*args)
+    return result, time.time() - t0
+
+def per_point(f, density, wavelength, energy):
+    """
+    Returns neutron and X-ray SLD calling the functions for each point.
+    """
+    return numpy.array([
+        (neutron_sld(f, density=d, wavelength=L)[0],
+         xray_sld(f, density=d, energy=E)[0])
+        for d, L, E in zip(density, wavelength, energy)])
+
+def prepared(f, density, wavelength, energy):
+    """
+    Returns neutron and X-ray SLD for all points from a prepared compound.
+    """
+    p = prepare(f)
+    return numpy.array([p.neutron_sld(wavelength=wavelength, density=density)[0],
+                        p.xray_sld(energy=energy, density=density)[0]]).T
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    f = formula(COMPOUND)
+    density = numpy.random.uniform(0.9, 1.3, size=n)
+    wavelength = numpy.random.uniform(1, 20, size=n)
+    energy = numpy.random.uniform(1, 24, size=n)
+    per_point(f, density[:10], wavelength[:10], energy[:10]) # load tables
+    m = min(n, 2000)
+    slow, t_slow = timed(per_point, f, density[:m], wavelength[:m], energy[:m])
+    fast, t_fast = timed(prepared, f, density, wavelength, energy)
+    assert numpy.allclose(slow, fast[:m], rtol=1e-12)
+    print("%d points for %s" % (n, COMPOUND))
+    print("neutron_sld+xray_sld %9.2f us/point" % (1e6*t_slow/m))
+    print("prepare              %9.2f us/point" % (1e6*t_fast/n))
+
+if __name__ == "__main__":
+    main()
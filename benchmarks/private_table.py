@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Time to create a private periodic table with the common properties.
+
+Compares initializing a new table from the data with *module.init(table)*
+against :meth:`PeriodicTable.clone` from the public table.
+
+Usage::
+
+    python benchmarks/private_table.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from periodictable import elements, core
+from periodictable import mass, density, nsf, xsf, covalent_radius, crystal_structure
+
+PROPERTIES = ['mass', 'density', 'neutron', 'xray', 'covalent_radius',
+              'crystal_structure']
+_count = [0]
+def _name():
+    _count[0] += 1
+    return "bench%d"%_count[0]
+
+def init_table():
+    table = core.PeriodicTable(_name())
+    for module in (mass, density, nsf, xsf, covalent_radius, crystal_structure):
+        module.init(table)
+    return table
+
+def clone_table():
+    return elements.clone(_name(), properties=PROPERTIES,
+                          overrides={'Ni': {'density': 9.}})
+
+def main():
+    number = 20
+    clone_table()  # load the public table properties before timing
+    for label, fn in (("init", init_table), ("clone", clone_table)):
+        t = min(timeit.repeat(fn, number=number, repeat=3))/number
+        print("%-6s %7.2f ms"%(label, 1e3*t))
+
+if __name__ == "__main__":
+    main()
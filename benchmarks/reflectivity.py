@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Time to compute neutron reflectivity for a batch of models.
+
+Compares computing the layer SLDs with :func:`periodictable.neutron_sld`
+and the reflectivity for each model in turn against a single call to
+:func:`periodictable.nsf.neutron_reflectivity` with arrays of model
+parameters, as for a population in a fit or MCMC.
+
+Usage::
+
+    python benchmarks/reflectivity.py [nmodels]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+import numpy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from periodictable.nsf import neutron_reflectivity
+
+MATERIALS = ['air', 'C8H8@1.05', 'Ni', 'Ti', 'SiO2@2.2', 'Si']
+
+def models(n, seed=1):
+    """
+    Returns the thickness and roughness for *n* random models.
+    """
+    rng = numpy.random.RandomState(seed)
+    thickness = rng.uniform(20, 200, size=(len(MATERIALS), n))
+    roughness = rng.uniform(2, 10, size=(len(MATERIALS), n))
+    return thickness, roughness
+
+def stack(thickness, roughness):
+    """
+    Returns the layers for the given thickness and roughness.
+    """
+    return [(0 if m == 'air' else m, t, s)
+            for m, t, s in zip(MATERIALS, thickness, roughness)]
+
+def by_model(Q, thickness, roughness):
+    """
+    Returns reflectivity computing one model at a time.
+    """
+    return numpy.array([neutron_reflectivity(stack(t, s), Q=Q)
+                        for t, s in zip(thickness.T, roughness.T)])
+
+def by_batch(Q, thickness, roughness):
+    """
+    Returns reflectivity for all models at once.
+    """
+    return neutron_reflectivity(stack(thickness, roughness), Q=Q)
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    Q = numpy.linspace(0.005, 0.3, 400)
+    thickness, roughness = models(n)
+    m = min(n, 200)
+    t0 = time.time()
+    slow = by_model(Q, thickness[:, :m], roughness[:, :m])
+    t1 = time.time()
+    fast = by_batch(Q, thickness, roughness)
+    t2 = time.time()
+    assert numpy.allclose(slow, fast[:m], rtol=1e-10, atol=0)
+    print("%d models of %d layers at %d Q" % (n, len(MATERIALS), len(Q)))
+    print("one model at a time %9.3f ms/model" % (1e3*(t1-t0)/m))
+    print("batch of models     %9.3f ms/model" % (1e3*(t2-t1)/n))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+"""
+Benchmark suite for formula parsing, scattering, activation and import time.
+
+Each benchmark times one realistic workload: long polymer formulas,
+protein formulas on large energy and Q grids, a proteome-sized FASTA
+file, an activation inventory and the import of the package.  Times are
+the best of several repeats, reported per call of the workload.
+
+Results are compared with the saved baseline in benchmarks/baseline.json,
+and benchmarks which are slower than the baseline by more than the
+tolerance are flagged as regressions, with a non-zero exit status.
+Baselines depend on the machine, so save a new baseline before making
+changes when running on a different machine.
+
+Usage::
+
+    python benchmarks/suite.py [-k name] [--save] [--tolerance 0.3]
+                               [--baseline file] [--output file]
+"""
+from __future__ import division, print_function
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy
+
+import periodictable
+from periodictable import activation, cromermann, fasta, formulas, nsf, xsf
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'baseline.json')
+
+BENCHMARKS = []
+def benchmark(function):
+    """
+    Register a benchmark.  The function does any setup and returns the
+    workload to time as a function of no arguments.
+    """
+    BENCHMARKS.append((function.__name__, function))
+    return function
+
+def polymer(n=300):
+    """
+    Returns a block copolymer formula string with *n* blocks.
+    """
+    monomers = ['C8H8', 'C3H4O2', 'C5H8O2', 'C2H4O', 'C6H10O5', 'C4H6']
+    return "".join("(%s)%d" % (monomers[k % len(monomers)], 5 + k % 17)
+                   for k in range(n))
+
+def proteome(n=2000, length=350, seed=1):
+    """
+    Returns FASTA text for *n* random protein sequences.
+    """
+    rng = random.Random(seed)
+    residues = "ACDEFGHIKLMNPQRSTVWY"
+    lines = []
+    for k in range(n):
+        lines.append(">sp|P%05d|PROT%d_HUMAN Protein %d" % (k, k, k))
+        seq = "".join(rng.choice(residues) for _ in range(length))
+        lines.extend(seq[i:i+60] for i in range(0, length, 60))
+    return "\n".join(lines) + "\n"
+
+def proteins(n=200):
+    """
+    Returns the formulas for *n* proteins.
+    """
+    return [fasta.Sequence(name, seq).Hnatural
+            for name, seq in fasta.read_fasta(io.StringIO(proteome(n)))]
+
+@benchmark
+def parse_polymer():
+    text = polymer()
+    return lambda: formulas.parse_formula(text)
+
+@benchmark
+def parse_small():
+    rng = random.Random(2)
+    elements = ['H', 'C', 'N', 'O', 'Na', 'Cl', 'Fe', 'Si', 'Ca', 'S']
+    texts = ["".join("%s%d" % (rng.choice(elements), rng.randint(1, 12))
+                     for _ in range(rng.randint(1, 5)))
+             for _ in range(1000)]
+    return lambda: [formulas.parse_formula(t) for t in texts]
+
+@benchmark
+def formula_atoms():
+    f = formulas.parse_formula(polymer())
+    return lambda: f.atoms
+
+@benchmark
+def neutron_scattering_proteins():
+    compounds = proteins()
+    return lambda: [periodictable.neutron_scattering(f, density=1.35)
+                    for f in compounds]
+
+@benchmark
+def xray_sld_energy_grid():
+    f = proteins(1)[0]
+    energy = numpy.linspace(1, 24, 10000)
+    return lambda: periodictable.xray_sld(f, density=1.35, energy=energy)
+
+@benchmark
+def scattering_factors_grid():
+    energy = numpy.linspace(0.1, 29, 100000)
+    Fe = periodictable.Fe
+    return lambda: Fe.xray.scattering_factors(energy=energy)
+
+@benchmark
+def fxrayatq_grid():
+    Q = numpy.linspace(0, 24*numpy.pi, 100000)
+    return lambda: cromermann.fxrayatq('Fe', Q)
+
+@benchmark
+def sld_tables():
+    wavelength = numpy.linspace(1, 20, 200)
+    energy = numpy.linspace(1, 24, 200)
+    def run():
+        nsf.sld_array(wavelength=wavelength)
+        xsf.sld_array(energy=energy)
+    return run
+
+@benchmark
+def activation_inventory():
+    compounds = ['Co30Fe70', 'Fe70Cr18Ni10Mn2', 'Al', 'Cu', 'Ti6Al4V', 'W',
+                 'Au', 'NaCl', 'In', 'Sb2O3', 'Ag', 'Cd', 'Ta', 'Eu2O3',
+                 'Mn', 'Ni', 'Zn', 'Sn', 'Pb', 'Si']
+    env = activation.ActivationEnvironment(fluence=1e8, Cd_ratio=70,
+                                           fast_ratio=50)
+    samples = [activation.Sample(c, mass=10) for c in compounds]
+    def run():
+        for sample in samples:
+            sample.calculate_activation(env, exposure=10,
+                                        rest_times=[0, 1, 24, 360])
+    return run
+
+@benchmark
+def fasta_proteome():
+    text = proteome()
+    return lambda: [fasta.Sequence(name, seq)
+                    for name, seq in fasta.read_fasta(io.StringIO(text))]
+
+# numpy is imported first since its import time would otherwise dominate.
+IMPORT = """
+import time
+import numpy
+t0 = time.perf_counter()
+import periodictable
+print(time.perf_counter() - t0)
+"""
+
+def import_time(repeat=5):
+    """
+    Returns the best time to import periodictable in a new process.
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return min(float(subprocess.check_output([sys.executable, '-c', IMPORT],
+                                             env=env))
+               for _ in range(repeat))
+
+def time_workload(run, repeat=5):
+    """
+    Returns the best time in seconds for one call of *run*.
+    """
+    timer = timeit.Timer(run)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number))/number
+
+def run_suite(names=None, repeat=5):
+    """
+    Returns {name: seconds} for the selected benchmarks.
+    """
+    results = {}
+    for name, function in BENCHMARKS + [('import_periodictable', None)]:
+        if names and not any(k in name for k in names):
+            continue
+        if function is None:
+            results[name] = import_time(repeat)
+        else:
+            results[name] = time_workload(function(), repeat)
+        print("%-28s %12.3f ms" % (name, 1e3*results[name]))
+        sys.stdout.flush()
+    return results
+
+def machine():
+    """
+    Returns a description of the machine and python version.
+    """
+    return dict(platform=platform.platform(), machine=platform.machine(),
+                processor=platform.processor(), cpus=os.cpu_count(),
+                python=platform.python_version(), numpy=numpy.__version__)
+
+def compare(results, baseline, tolerance):
+    """
+    Prints the change from *baseline* and returns the regressed benchmarks.
+    """
+    regressions = []
+    print("\n%-28s %12s %12s %8s" % ("benchmark", "baseline", "current",
+                                     "ratio"))
+    for name, value in sorted(results.items()):
+        if name not in baseline:
+            continue
+        ratio = value/baseline[name]
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print("%-28s %9.3f ms %9.3f ms %8.2f%s"
+              % (name, 1e3*baseline[name], 1e3*value, ratio, flag))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-k', dest='names', action='append',
+                        help="run benchmarks containing this name")
+    parser.add_argument('--save', action='store_true',
+                        help="save the results as the new baseline")
+    parser.add_argument('--baseline', default=BASELINE,
+                        help="baseline file (default benchmarks/baseline.json)")
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help="allowed slowdown relative to baseline")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="also write the results to this file")
+    opts = parser.parse_args()
+
+    results = run_suite(opts.names, repeat=opts.repeat)
+    record = dict(machine=machine(), results=results)
+    if opts.output:
+        with open(opts.output, 'w') as fh:
+            json.dump(record, fh, indent=2, sort_keys=True)
+    if opts.save:
+        if os.path.exists(opts.baseline):
+            with open(opts.baseline) as fh:
+                saved = json.load(fh)
+            saved['results'].update(results)
+            record = dict(machine=machine(), results=saved['results'])
+        with open(opts.baseline, 'w') as fh:
+            json.dump(record, fh, indent=2, sort_keys=True)
+        print("saved baseline to %s" % opts.baseline)
+        return
+    if not os.path.exists(opts.baseline):
+        print("no baseline; use --save to create one")
+        return
+    with open(opts.baseline) as fh:
+        baseline = json.load(fh)
+    if baseline['machine'] != machine():
+        print("\nwarning: baseline is from a different machine:\n  %s"
+              % baseline['machine'])
+    regressions = compare(results, baseline['results'], opts.tolerance)
+    if regressions:
+        print("\n%d benchmark(s) slower than baseline by more than %d%%"
+              % (len(regressions), 100*opts.tolerance))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Time to compute X-ray filter transmission over thickness and energy grids.
+
+Compares calling :func:`periodictable.xray_sld` for each energy and
+converting the imaginary SLD to transmission for each thickness against
+:func:`periodictable.xsf.xray_transmission` for the whole grid.  The
+energy grid includes the absorption edges of the filter materials.
+
+Usage::
+
+    python benchmarks/xray_transmission.py [nthickness]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+import numpy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from periodictable import xray_sld
+from periodictable.xsf import xray_transmission, energy_grid, xray_wavelength
+
+FILTER = 'Cu'
+WINDOW = ('C22H10N2O5@1.42', 100e-4)
+
+def by_loop(thickness, energy):
+    """
+    Returns transmission calling xray_sld for each energy.
+    """
+    result = numpy.empty((len(thickness), len(energy)))
+    for j, E in enumerate(energy):
+        L = xray_wavelength(E)
+        mu_filter = 2*L*xray_sld(FILTER, energy=E)[1]*100
+        mu_window = 2*L*xray_sld(WINDOW[0], energy=E)[1]*100
+        for i, t in enumerate(thickness):
+            result[i, j] = numpy.exp(-mu_filter*t - mu_window*WINDOW[1])
+    return result
+
+def by_grid(thickness, energy):
+    """
+    Returns transmission for the whole grid.
+    """
+    return xray_transmission([(FILTER, thickness), WINDOW], energy=energy)
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    thickness = numpy.linspace(1e-4, 100e-4, n)
+    energy = energy_grid([FILTER, WINDOW[0]], 2, 30, n=5000)
+    by_loop(thickness[:2], energy[:2]) # load tables
+    m = min(len(energy), 200)
+    t0 = time.time()
+    slow = by_loop(thickness, energy[:m])
+    t1 = time.time()
+    fast = by_grid(thickness, energy)
+    t2 = time.time()
+    assert numpy.allclose(slow, fast[:, :m], rtol=1e-12, atol=0)
+    points = n*len(energy)
+    print("%d thicknesses x %d energies" % (n, len(energy)))
+    print("xray_sld loop     %9.3f us/point" % (1e6*(t1-t0)/(n*m)))
+    print("xray_transmission %9.3f us/point" % (1e6*(t2-t1)/points))
+
+if __name__ == "__main__":
+    main()
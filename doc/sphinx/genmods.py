@@ -65,8 +65,10 @@ modules=[
     ('mass', 'Mass'),
     ('activation', 'Neutron activation'),
     ('nsf', 'Neutron scattering potentials'),
+    ('absorption', 'Neutron absorption corrections'),
     ('xsf', 'X-ray scattering potentials and spectral lines'),
     ('cromermann', 'X-ray scattering factor f0 calculations'),
+    ('shared', 'Shared tables for worker pools'),
     ('plot', 'Element plotter'),
     ('util', 'Utility functions'),
 ]
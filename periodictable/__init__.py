@@ -27,7 +27,8 @@ whose conditions may differ from those of your experiment.
 
 __docformat__ = 'restructuredtext en'
 __all__ = ['elements', 'neutron_sld', 'xray_sld',
-           'formula', 'mix_by_weight', 'mix_by_volume'] # and all elements
+           'formula', 'mix_by_weight', 'mix_by_volume',
+           'prepare'] # and all elements
 __version__ = "1.5.2"
 
 from . import core
@@ -320,5 +321,17 @@ def xray_sld(*args, **kw):
     from . import xsf
     return xsf.xray_sld(*args, **kw)
 
+def prepare(*args, **kw):
+    """
+    Precompute composition sums for repeated scattering calculations.
+
+    Returns a compound with *neutron_sld* and *xray_sld* methods which
+    accept vectors of wavelength, energy and density.
+
+    See :func:`periodictable.formulas.prepare` for details.
+    """
+    from . import formulas
+    return formulas.prepare(*args, **kw)
+
 
 #del core, mass, density
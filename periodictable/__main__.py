@@ -0,0 +1,9 @@
+"""
+Batch calculator for formulas read from CSV files or stdin.
+
+See :mod:`periodictable.batch` for details.
+"""
+from .batch import main
+
+if __name__ == "__main__":
+    main()
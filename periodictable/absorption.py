@@ -0,0 +1,340 @@
+# This program is public domain
+r"""
+Neutron absorption corrections for slab, cylinder and annulus samples.
+
+The attenuation of the beam scattered at angle $2\theta$ from a point in
+the sample depends on the path lengths $l_\text{in}$ into and
+$l_\text{out}$ out of the sample.  The absorption factor for scattering
+from part $s$ of a sample assembly is the average over the part
+
+.. math::
+
+    A_{s} = \frac{1}{V_s} \int_{V_s}
+            \exp\left(-\sum_k \mu_k (l_{\text{in},k} + l_{\text{out},k})\right)
+            dV
+
+where the sum is over all parts of the assembly, each with attenuation
+coefficient $\mu_k(\lambda)$ from the scattering and absorption cross
+sections of its material (see :func:`periodictable.nsf.transmission`).
+For a sample in a container these are the Paalman-Pings factors
+$A_{s,sc}$ and $A_{c,sc}$, with $A_{c,c}$ from the container alone; see
+:func:`paalman_pings`.
+
+Shapes are:
+
+    :class:`Slab`
+        Flat plate, rotated about the vertical axis.
+
+    :class:`Cylinder`, :class:`Annulus`
+        Cylinder or hollow cylinder with a vertical axis.
+
+The integrals are computed with the midpoint rule on a grid whose
+*resolution* is set by the caller, and are evaluated for every wavelength
+and angle together.  The path lengths for a set of shapes, angles and
+resolution are cached, as are the factors for each set of materials,
+shapes, wavelengths and angles.  The scattered beam is in the horizontal
+plane, so out of plane detector angles are not handled.
+
+Example
+=======
+
+Absorption factors for vanadium rod at three wavelengths and two
+angles::
+
+    >>> from periodictable.absorption import Cylinder, absorption_factors
+    >>> A = absorption_factors([('V', Cylinder(0.3))],
+    ...                        wavelength=[1, 2, 4], two_theta=[10, 90])
+    >>> print(A.shape)
+    (1, 3, 2)
+    >>> for row in A[0]: print("%.4f %.4f"%tuple(row))
+    0.7484 0.7531
+    0.6755 0.6834
+    0.5513 0.5664
+"""
+from __future__ import division
+
+import numpy
+from numpy import pi, radians, sqrt
+
+from . import formulas
+from .nsf import ABSORPTION_WAVELENGTH
+from .util import require_keywords
+
+__all__ = ['Slab', 'Cylinder', 'Annulus', 'absorption_factors',
+           'paalman_pings']
+
+# Path length for rays parallel to a slab which start inside it.
+_LONG_PATH = 1e100
+
+class Slab(object):
+    r"""
+    Flat plate sample.
+
+    :Parameters:
+        *thickness* : float | cm
+            Thickness of the plate.
+        *position* = 0 : float | cm
+            Distance of the upstream face from the origin along the normal,
+            for stacking windows and sample.
+        *angle* = 0 : float | degrees
+            Angle between the beam and the plate normal.
+
+    Scattering with $|2\theta - \text{angle}| < 90^\circ$ is in
+    transmission and larger angles are in reflection.  The plate is
+    infinite in extent, so the integral is over the thickness only, with
+    *resolution* points.
+    """
+    def __init__(self, thickness, position=0., angle=0.):
+        self.thickness = thickness
+        self.position = position
+        self.angle = angle
+        theta = radians(angle)
+        self._normal = numpy.array([numpy.cos(theta), numpy.sin(theta)])
+
+    def __repr__(self):
+        return "Slab(%g, position=%g, angle=%g)" % (
+            self.thickness, self.position, self.angle)
+
+    def key(self):
+        """
+        Returns a hashable value identifying the shape, for caching.
+        """
+        return ('Slab', float(self.thickness), float(self.position),
+                float(self.angle))
+
+    def points(self, resolution):
+        """
+        Returns the quadrature points (n x 2) and weights (n).
+        """
+        step = self.thickness/resolution
+        z = self.position + step*(numpy.arange(resolution) + 0.5)
+        return z[:, None]*self._normal[None, :], numpy.full(resolution, step)
+
+    def path_length(self, points, direction):
+        """
+        Returns the length inside the shape of the rays from *points* in
+        *direction*.
+        """
+        z = numpy.dot(points, self._normal)
+        dz = numpy.dot(direction, self._normal)
+        z0, z1 = self.position, self.position + self.thickness
+        if dz == 0:
+            inside = (z >= z0) & (z <= z1)
+            return numpy.where(inside, _LONG_PATH, 0.)
+        # The ray is inside for s between the crossings of the two faces.
+        s0, s1 = (z0 - z)/dz, (z1 - z)/dz
+        start = numpy.maximum(numpy.minimum(s0, s1), 0.)
+        end = numpy.maximum(s0, s1)
+        return numpy.maximum(end - start, 0.)
+
+class Annulus(object):
+    """
+    Hollow cylinder with a vertical axis.
+
+    :Parameters:
+        *inner*, *outer* : float | cm
+            Inner and outer radius.
+
+    The integral over the cross section uses *resolution* radial points
+    and 4 x *resolution* angular points.
+    """
+    def __init__(self, inner, outer):
+        self.inner = inner
+        self.outer = outer
+
+    def __repr__(self):
+        return "Annulus(%g, %g)" % (self.inner, self.outer)
+
+    def key(self):
+        """
+        Returns a hashable value identifying the shape, for caching.
+        """
+        return ('Annulus', float(self.inner), float(self.outer))
+
+    def points(self, resolution):
+        """
+        Returns the quadrature points (n x 2) and weights (n).
+        """
+        dr = (self.outer - self.inner)/resolution
+        r = self.inner + dr*(numpy.arange(resolution) + 0.5)
+        nphi = 4*resolution
+        phi = 2*pi/nphi*(numpy.arange(nphi) + 0.5)
+        r, phi = [v.flatten() for v in numpy.meshgrid(r, phi)]
+        points = numpy.vstack((r*numpy.cos(phi), r*numpy.sin(phi))).T
+        return points, r*dr*2*pi/nphi
+
+    def path_length(self, points, direction):
+        """
+        Returns the length inside the shape of the rays from *points* in
+        *direction*.
+        """
+        return (_chord(points, direction, self.outer)
+                - _chord(points, direction, self.inner))
+
+class Cylinder(Annulus):
+    """
+    Solid cylinder with a vertical axis.
+
+    :Parameters:
+        *radius* : float | cm
+            Cylinder radius.
+    """
+    def __init__(self, radius):
+        Annulus.__init__(self, 0., radius)
+
+    def __repr__(self):
+        return "Cylinder(%g)" % self.outer
+
+def _chord(points, direction, radius):
+    """
+    Length inside a circle of *radius* about the origin of the rays from
+    *points* in *direction*.
+    """
+    if radius == 0:
+        return numpy.zeros(len(points))
+    # Solve |p + s d|^2 = R^2 for s, with d a unit vector.
+    b = numpy.dot(points, direction)
+    c = numpy.sum(points**2, axis=1) - radius**2
+    disc = numpy.maximum(b**2 - c, 0.)
+    start = numpy.maximum(-b - sqrt(disc), 0.)
+    end = numpy.maximum(-b + sqrt(disc), 0.)
+    return end - start
+
+_PATHS = {}
+def _path_lengths(shapes, two_theta, resolution):
+    """
+    Returns the quadrature weights and the path lengths for each part.
+
+    For part *i*, *weights[i]* has one entry for each point and
+    *paths[i]* is an array (parts x angles x points) with the incoming
+    plus outgoing path length through each part.
+    """
+    key = (tuple(shape.key() for shape in shapes), two_theta.tobytes(),
+           two_theta.shape, resolution)
+    result = _PATHS.get(key, None)
+    if result is None:
+        # The beam travels along +x, so the incoming path is the ray
+        # from the point towards -x.
+        incoming = numpy.array([-1., 0.])
+        outgoing = [numpy.array([numpy.cos(a), numpy.sin(a)])
+                    for a in radians(two_theta.flatten())]
+        weights, paths = [], []
+        for shape in shapes:
+            points, w = shape.points(resolution)
+            L = numpy.empty((len(shapes), len(outgoing), len(points)))
+            for k, part in enumerate(shapes):
+                l_in = part.path_length(points, incoming)
+                for j, d in enumerate(outgoing):
+                    L[k, j] = l_in + part.path_length(points, d)
+            weights.append(w/numpy.sum(w))
+            paths.append(L)
+        if len(_PATHS) > 100:
+            _PATHS.clear()
+        result = _PATHS[key] = weights, paths
+    return result
+
+_FACTORS = {}
+@require_keywords
+def absorption_factors(parts, wavelength=ABSORPTION_WAVELENGTH, two_theta=0.,
+                       resolution=20, absorbers=None, chunksize=1000000,
+                       table=None):
+    r"""
+    Absorption factors for scattering from each part of a sample assembly.
+
+    :Parameters:
+        *parts* : [(Formula, shape)]
+            Materials, with density, and the :class:`Slab`, :class:`Cylinder`
+            or :class:`Annulus` that each one fills.  Shapes should not
+            overlap.
+        *wavelength* = 1.798 : float or vector | |Ang|
+            Neutron wavelength.
+        *two_theta* = 0 : float or vector | degrees
+            Scattering angle.
+        *resolution* = 20 : int
+            Number of quadrature points across each shape.
+        *absorbers* : {atom: f(wavelength) -> float or vector}
+            Energy dependent absorption cross sections, as for
+            :func:`periodictable.nsf.transmission`.
+        *chunksize* = 1000000 : int
+            Maximum number of (wavelength, angle, point) values computed
+            at once, which limits the memory used.
+        *table* : PeriodicTable
+            Private table to use when parsing string formulas.
+
+    :Returns:
+        *A* : array
+            Absorption factors with shape (parts, wavelength, two_theta),
+            where *A[i]* is the fraction of the scattering from part *i*
+            which leaves the assembly.
+    """
+    wavelength = numpy.asarray(wavelength, 'd')
+    two_theta = numpy.asarray(two_theta, 'd')
+    compounds = [formulas.formula(material, table=table)
+                 for material, _ in parts]
+    shapes = [shape for _, shape in parts]
+    mu = numpy.array([formulas.prepare(c).neutron_attenuation(
+                          wavelength=wavelength.flatten(), absorbers=absorbers)
+                      for c in compounds])
+    # The factors depend on the materials only through the attenuation,
+    # so the key covers the table, composition, density and wavelength.
+    # Results with absorber functions are not cached.
+    key = None if absorbers else (
+        mu.tobytes(), mu.shape, wavelength.shape,
+        tuple(shape.key() for shape in shapes),
+        two_theta.tobytes(), two_theta.shape, resolution)
+    result = _FACTORS.get(key, None)
+    if result is not None:
+        return result.copy()
+
+    weights, paths = _path_lengths(shapes, two_theta, resolution)
+    num_w, num_a = mu.shape[1], paths[0].shape[1]
+    result = numpy.empty((len(parts), num_w, num_a))
+    for i, (w, L) in enumerate(zip(weights, paths)):
+        step = max(1, chunksize//(num_a*len(w)))
+        for start in range(0, num_w, step):
+            # exponent is (wavelength x angle x point)
+            exponent = numpy.einsum('kw,kap->wap',
+                                    mu[:, start:start+step], L)
+            result[i, start:start+step] = numpy.dot(numpy.exp(-exponent), w)
+    result = result.reshape((len(parts),) + wavelength.shape + two_theta.shape)
+    if key is not None:
+        if len(_FACTORS) > 100:
+            _FACTORS.clear()
+        _FACTORS[key] = result
+        result = result.copy()
+    return result
+
+@require_keywords
+def paalman_pings(sample, sample_shape, container, container_shape,
+                  wavelength=ABSORPTION_WAVELENGTH, two_theta=0.,
+                  resolution=20, absorbers=None, table=None):
+    r"""
+    Paalman-Pings absorption factors for a sample in a container.
+
+    :Parameters:
+        *sample*, *container* : Formula
+            Materials, with density.
+        *sample_shape*, *container_shape* : shape
+            Shapes filled by the sample and the container, such as
+            a :class:`Cylinder` inside an :class:`Annulus`.
+
+    Other parameters are as for :func:`absorption_factors`.
+
+    :Returns:
+        *A_ssc*, *A_csc*, *A_cc* : array
+            Factors for scattering in the sample attenuated by sample and
+            container, in the container attenuated by sample and
+            container, and in the container attenuated by the container
+            alone, with shape (wavelength, two_theta).
+
+    The corrected sample scattering is
+    $I_s = (I_{sc} - I_c A_{c,sc}/A_{c,c})/A_{s,sc}$ for the measured
+    scattering $I_{sc}$ from the filled container and $I_c$ from the
+    empty container.
+    """
+    kw = dict(wavelength=wavelength, two_theta=two_theta,
+              resolution=resolution, absorbers=absorbers, table=table)
+    A_ssc, A_csc = absorption_factors(
+        [(sample, sample_shape), (container, container_shape)], **kw)
+    A_cc, = absorption_factors([(container, container_shape)], **kw)
+    return A_ssc, A_csc, A_cc
@@ -63,6 +63,19 @@ Activation can be run from the command line using::
 
 where FORMULA is the chemical formula for the material.
 
+Whole sample inventories can be screened with :func:`batch_activation`,
+which reads samples from :func:`read_inventory` and computes them in a
+pool of worker processes, streaming the results back in input order.
+Use :func:`write_activation_csv` to save the results::
+
+    >>> import io
+    >>> inventory = io.StringIO("name,formula,mass\nmagnet,Co30Fe70,10\n")
+    >>> records = batch_activation(read_inventory(inventory), env,
+    ...                            exposure=10, workers=1)
+    >>> for r in records:
+    ...     print("%s %.4g"%(r['name'], r['activity'][0]))
+    magnet 1.665
+
 .. [#Shleien1998] Shleien, B., Slaback, L.A., Birky, B.K., 1998.
    Handbook of health physics and radiological health.
    Williams & Wilkins, Baltimore.
@@ -77,6 +90,9 @@ from __future__ import division, print_function
 
 from math import exp, log
 import os
+import re
+
+import numpy
 
 from .formulas import formula as build_formula
 from . import core
@@ -152,20 +168,12 @@ class Sample(object):
         default it uses :func:`NIST2001_isotopic_abundance`, and there is the alternative
         :func:`IAEA273_isotopic_abundance`.
         """
-        self.activity = {}
+        response = _activation_response(environment, exposure, rest_times,
+                                        abundance)
+        self.activity = response.activity(self.formula, self.mass)
         self.environment = environment
         self.exposure = exposure
         self.rest_times = rest_times
-        for el, frac in self.formula.mass_fraction.items():
-            if core.isisotope(el):
-                A = activity(el, self.mass*frac, environment, exposure, rest_times)
-                self._accumulate(A)
-            else:
-                for iso in el.isotopes:
-                    iso_mass = self.mass*frac*abundance(el[iso])*0.01
-                    if iso_mass:
-                        A = activity(el[iso], iso_mass, environment, exposure, rest_times)
-                        self._accumulate(A)
 
     def decay_time(self, target):
         """
@@ -189,11 +197,6 @@ class Sample(object):
         t, ft = find_root(0, f, df)
         return t
 
-    def _accumulate(self, activity):
-        for el, activity_el in activity.items():
-            el_total = self.activity.get(el, [0]*len(self.rest_times))
-            self.activity[el] = [T+v for T, v in zip(el_total, activity_el)]
-
     def show_table(self, cutoff=0.0001, format="%.4g"):
         """
         Tabulate the daughter products.
@@ -346,6 +349,99 @@ INT_COLUMNS = [1, 2, 4]
 BOOL_COLUMNS = [13]
 FLOAT_COLUMNS = [6, 11, 14, 15, 16, 17, 19, 20, 21]
 
+class ActivationResponse(object):
+    """
+    Activity per gram of each target for a fixed activation environment.
+
+    *environment*, *exposure*, *rest_times* and *abundance* are as for
+    :meth:`Sample.calculate_activation`.
+
+    The activity produced from a target isotope or element is proportional
+    to its mass, so the activity per gram is computed once for each target,
+    the first time it is needed.  The activity of a sample is then the sum
+    of the responses of the targets in the sample weighted by their mass.
+    Build one response for each beamline setup and use it for all the
+    samples, either with :meth:`calculate` or :meth:`activity`::
+
+        >>> from periodictable.activation import (
+        ...     ActivationEnvironment, ActivationResponse, Sample)
+        >>> env = ActivationEnvironment(fluence=1e5, Cd_ratio=70, fast_ratio=50)
+        >>> response = ActivationResponse(env, exposure=10, rest_times=[0, 24])
+        >>> for formula in ("Co30Fe70", "NaCl", "Au"):
+        ...     sample = Sample(formula, mass=10)
+        ...     response.calculate(sample)
+        ...     total = [sum(v) for v in zip(*sample.activity.values())]
+        ...     print("%-8s %s"%(formula, " ".join("%.4g"%v for v in total)))
+        Co30Fe70 1.665 0.0005084
+        NaCl     0.1974 0.01852
+        Au       1.015 0.7843
+    """
+    def __init__(self, environment, exposure=1, rest_times=(0, 1, 24, 360),
+                 abundance=NIST2001_isotopic_abundance):
+        self.environment = environment
+        self.exposure = exposure
+        self.rest_times = tuple(rest_times)
+        self.abundance = abundance
+        self._response = {}
+
+    def response(self, target):
+        """
+        Activity for one gram of *target*.
+
+        *target* is an isotope, or an element with its isotopes in the
+        proportions given by *abundance*.
+
+        Returns (*records*, *activity*) where *records* is the tuple of
+        :class:`ActivationResult` reactions and *activity* is an array
+        with the activity (uCi/g) of each reaction at each rest time.
+        """
+        result = self._response.get(target, None)
+        if result is None:
+            args = (self.environment, self.exposure, self.rest_times)
+            if core.isisotope(target):
+                parts = [activity(target, 1., *args)]
+            else:
+                parts = []
+                for iso in target.isotopes:
+                    fraction = self.abundance(target[iso])*0.01
+                    if fraction:
+                        parts.append(activity(target[iso], fraction, *args))
+            records = tuple(ai for part in parts for ai in part)
+            values = [v for part in parts for v in part.values()]
+            values = numpy.array(values, 'd').reshape(len(records),
+                                                      len(self.rest_times))
+            result = self._response[target] = records, values
+        return result
+
+    def activity(self, formula, mass):
+        """
+        Activity of *mass* grams of *formula*.
+
+        Returns a dictionary mapping each :class:`ActivationResult`
+        reaction to the list of activities (uCi) at each rest time, as
+        stored in :attr:`Sample.activity`.
+        """
+        total = {}
+        for target, fraction in build_formula(formula).mass_fraction.items():
+            records, values = self.response(target)
+            if not records:
+                continue
+            values = values*(mass*fraction)
+            for ai, v in zip(records, values):
+                total[ai] = total[ai] + v if ai in total else v
+        return dict((ai, v.tolist()) for ai, v in total.items())
+
+    def calculate(self, sample):
+        """
+        Calculate the activation of *sample*, setting its *activity*,
+        *environment*, *exposure* and *rest_times* attributes as for
+        :meth:`Sample.calculate_activation`.
+        """
+        sample.environment = self.environment
+        sample.exposure = self.exposure
+        sample.rest_times = self.rest_times
+        sample.activity = self.activity(sample.formula, sample.mass)
+
 def activity(isotope, mass, env, exposure, rest_times):
     """
     Compute isotope specific daughter products after the given exposure time and rest period.
@@ -462,14 +558,35 @@ def init(table, reload=False):
         return
     table.properties.append('neutron_activation')
 
-    # Clear the existing activation table
-    for el in table:
-        for iso in el.isotopes:
-            if hasattr(el[iso], 'neutron_activation'):
-                del el[iso].neutron_activation
+    # Attach a view of the activation records to each target isotope.
+    # Every isotope in the index is replaced, so there are no stale
+    # records to clear when reloading.
+    data = activation_table()
+    for (Z, A), rows in data.by_isotope.items():
+        table[Z][A].neutron_activation = tuple(data.record(k) for k in rows)
+
+
+_ACTIVATION_TABLE = None
+def activation_table():
+    """
+    Return the :class:`ActivationTable` for *activation.dat*.
 
-    path = os.path.join(core.get_data_path('.'), 'activation.dat')
-    for row in open(path, 'r'):
+    The table is read the first time it is needed and shared by all
+    periodic tables in the process.
+    """
+    global _ACTIVATION_TABLE
+    if _ACTIVATION_TABLE is None:
+        path = os.path.join(core.get_data_path('.'), 'activation.dat')
+        with open(path, 'r') as fh:
+            _ACTIVATION_TABLE = ActivationTable(_read_activation_rows(fh))
+    return _ACTIVATION_TABLE
+
+def _read_activation_rows(fh):
+    """
+    Parse the rows of *activation.dat* into tuples of public column values.
+    """
+    rows = []
+    for row in fh:
         columns = row.split('\t')
         if columns[0].strip() in ('', 'xx'):
             continue
@@ -486,26 +603,318 @@ def init(table, reload=False):
         columns[-1] = columns[-1].replace('"', '').strip()
         kw = dict(zip(COLUMN_NAMES, columns))
         kw['Thalf_str'] = " ".join((kw['_Thalf'], kw['_Thalf_unit']))
+        rows.append(tuple(kw[name] for name in ActivationTable.fields))
+    return rows
 
-        # Strip columns whose names start with underscore
-        kw = dict((k, v) for k, v in kw.items() if not k.startswith('_'))
+_NUCLIDE_PATTERN = re.compile(r"^[A-Z][a-z]?-[0-9]+")
+def _nuclide(daughter):
+    """
+    Strip the isomer and decay chain annotations from a daughter product,
+    so that e.g., 'Co-60m+' becomes 'Co-60'.
+    """
+    match = _NUCLIDE_PATTERN.match(daughter)
+    return match.group(0) if match else daughter
+
+# Public columns of the activation table and their types
+ACTIVATION_FIELDS = (
+    ('Z', 'i4'), ('symbol', 'U'), ('A', 'i4'), ('isotope', 'U'),
+    ('abundance', 'f8'), ('daughter', 'U'), ('isomer', 'U'),
+    ('percentIT', 'f8'), ('reaction', 'U'), ('fast', '?'),
+    ('thermalXS', 'f8'), ('gT', 'f8'), ('resonance', 'f8'),
+    ('Thalf_hrs', 'f8'), ('Thalf_str', 'U'), ('Thalf_parent', 'f8'),
+    ('thermalXS_parent', 'f8'), ('resonance_parent', 'f8'),
+    ('comments', 'U'),
+)
+
+class ActivationTable(object):
+    """
+    Neutron activation records stored as a NumPy structured array.
+
+    *data* is the structured array, with one row per reaction and the
+    columns listed in *fields*.  Each column is also available as an
+    attribute, so ``table.thermalXS`` is the array of thermal cross
+    sections for all reactions.
+
+    *by_isotope* maps (Z, A) for the target isotope to the array of
+    row numbers for its reactions, in file order.
+
+    *by_daughter* maps the daughter nuclide, such as 'Co-60', to the
+    array of row numbers for reactions producing it.  Isomer and decay
+    chain annotations are ignored, so 'Co-60m+' is indexed under 'Co-60'.
+
+    Use :meth:`record` to get an :class:`ActivationResult` view of a row.
+    For example, list the reactions which produce 60-Co:
+
+    .. doctest::
+
+        >>> from periodictable.activation import activation_table
+        >>> data = activation_table()
+        >>> rows = data.producing('Co-60')
+        >>> for r in rows:
+        ...     print("%s %s %s"%(data.isotope[r], data.daughter[r], data.reaction[r]))
+        Co-59 Co-60m+ act
+        Co-59 Co-60 act
+        Ni-60 Co-60 n,p
+        Ni-60 Co-60m+ n,p
+        Cu-63 Co-60 n,a
+    """
+    fields = tuple(name for name, _ in ACTIVATION_FIELDS)
+
+    def __init__(self, rows):
+        # Size string columns to fit the longest value
+        dtype = []
+        for k, (name, kind) in enumerate(ACTIVATION_FIELDS):
+            if kind == 'U':
+                kind = 'U%d'%max([len(r[k]) for r in rows] + [1])
+            dtype.append((name, kind))
+        self._index(numpy.array(rows, dtype=dtype))
+
+    @classmethod
+    def from_array(cls, data):
+        """
+        Return a table using the structured array *data* without copying,
+        such as the *data* attribute of another table.
+        """
+        table = cls.__new__(cls)
+        table._index(data)
+        return table
+
+    def _index(self, data):
+        self.data = data
+        for name in self.fields:
+            setattr(self, name, self.data[name])
 
-        # Create an Activation record and add it to the isotope
-        iso = table[kw['Z']][kw['A']]
-        activation = getattr(iso, 'neutron_activation', [])
-        activation.append(ActivationResult(**kw))
-        iso.neutron_activation = activation
+        self.by_isotope = _group_rows(zip(self.Z.tolist(), self.A.tolist()))
+        self.by_daughter = _group_rows(_nuclide(d) for d in self.daughter)
+        self._records = [None]*len(self.data)
 
-        # Check abundance values
-        #if abs(iso.abundance - kw['abundance']) > 0.001*kw['abundance']:
-        #    percent = 100*abs(iso.abundance - kw['abundance'])/kw['abundance']
-        #    print "Abundance of", iso, "is", iso.abundance, \
-        #        "but activation.dat has", kw['abundance'], "(%.1f%%)"%percent
+    def __len__(self):
+        return len(self.data)
+
+    def rows(self, Z, A):
+        """
+        Row numbers for the reactions of isotope *A* of element *Z*.
+        """
+        return self.by_isotope.get((Z, A), _EMPTY_ROWS)
+
+    def producing(self, nuclide):
+        """
+        Row numbers for the reactions producing *nuclide*, such as 'Co-60'.
+        """
+        return self.by_daughter.get(_nuclide(nuclide), _EMPTY_ROWS)
+
+    def record(self, row):
+        """
+        Return the :class:`ActivationResult` view of row number *row*.
+        """
+        record = self._records[row]
+        if record is None:
+            record = self._records[row] = ActivationResult(self, row)
+        return record
+
+def _group_rows(keys):
+    """
+    Map each distinct key to the array of positions where it occurs.
+    """
+    index = {}
+    for k, key in enumerate(keys):
+        index.setdefault(key, []).append(k)
+    return dict((k, numpy.array(v, dtype='i4')) for k, v in index.items())
+
+_EMPTY_ROWS = numpy.empty(0, dtype='i4')
 
 class ActivationResult(object):
-    def __init__(self, **kw):
-        self.__dict__ = kw
+    """
+    Activation record for a single reaction.
+
+    This holds the values from one row of the :class:`ActivationTable`
+    as attributes (*isotope*, *daughter*, *reaction*, *thermalXS*,
+    *Thalf_hrs*, etc.).  The values are converted to python scalars
+    when the record is created so that attribute access is cheap.
+    """
+    def __init__(self, table, row):
+        self.__dict__ = dict(zip(table.fields, table.data[row].item()))
+        self._row = row
+
+    def __repr__(self):
+        return "ActivationResult(%s -> %s %s)" % (self.isotope, self.daughter, self.reaction)
+
+    def __reduce__(self):
+        return _make_activation_result, (self._row, )
+
+def _make_activation_result(row):
+    return activation_table().record(row)
+
+
+def read_inventory(fh):
+    """
+    Iterate over the samples in a CSV inventory file.
+
+    *fh* is an open file or any iterable of lines.  The first line
+    contains the column names.  The *formula* and *mass* (g) columns are
+    required.  Optional columns *name*, *exposure* (hours), *fluence*
+    (n/cm^2/s), *Cd_ratio*, *fast_ratio* and *location* override the
+    defaults given to :func:`batch_activation` for that sample.  Blank
+    values are treated as missing.
+
+    Yields one dictionary per sample, with numeric columns converted
+    to float.
+    """
+    import csv
+    for row in csv.DictReader(fh):
+        row = dict((k.strip(), v.strip()) for k, v in row.items()
+                   if k is not None and v is not None and v.strip())
+        for k in INVENTORY_NUMERIC_COLUMNS:
+            if k in row:
+                row[k] = float(row[k])
+        yield row
+
+INVENTORY_NUMERIC_COLUMNS = ('mass', 'exposure', 'fluence', 'Cd_ratio', 'fast_ratio')
+
+def batch_activation(samples, environment=None, exposure=1,
+                     rest_times=(0, 1, 24, 360),
+                     abundance=NIST2001_isotopic_abundance,
+                     workers=None, chunksize=16):
+    """
+    Calculate activation for a stream of samples using a process pool.
 
+    *samples* is an iterable of dictionaries as returned by
+    :func:`read_inventory`, or of tuples (*formula*, *mass*) or
+    (*formula*, *mass*, *environment*, *exposure*), with *environment*
+    and *exposure* set to None to use the defaults.
+
+    *environment* is the default :class:`ActivationEnvironment`.
+
+    *exposure* is the default exposure time in hours.
+
+    *rest_times* and *abundance* are as for :meth:`Sample.calculate_activation`.
+
+    *workers* is the number of worker processes, or 1 to compute in the
+    current process.  Defaults to the number of CPUs.
+
+    *chunksize* is the number of samples sent to each worker at a time.
+
+    Yields one record per sample in input order.  Each record is a
+    dictionary with *name*, *formula*, *mass*, *exposure*, *rest_times*,
+    *activity* (total activity in uCi at each rest time), *products*
+    (a list of (isotope, daughter, reaction, half-life, activity) tuples)
+    and *error* (None, or the reason that the sample could not be
+    computed).  Samples are read and computed incrementally, so arbitrarily
+    large inventories can be processed with bounded memory.
+    """
+    from .util import pool_map
+    if environment is None:
+        environment = ActivationEnvironment()
+    jobs = (_activation_job(s, environment, exposure, rest_times, abundance)
+            for s in samples)
+    return pool_map(_run_activation_job, jobs, workers=workers,
+                    chunksize=chunksize, initializer=_warm_activation_worker)
+
+def _activation_job(sample, environment, exposure, rest_times, abundance):
+    """
+    Convert an inventory row into a picklable job description.
+    """
+    if isinstance(sample, dict):
+        sample = dict(sample)
+        formula = sample.pop('formula', '')
+        mass = sample.pop('mass', None)
+        name = sample.pop('name', None)
+        exposure = sample.pop('exposure', exposure)
+        if sample:
+            env = dict(fluence=environment.fluence,
+                       Cd_ratio=environment.Cd_ratio,
+                       fast_ratio=environment.fast_ratio,
+                       location=environment.location)
+            env.update((k, v) for k, v in sample.items() if k in env)
+            environment = ActivationEnvironment(**env)
+    else:
+        formula, mass = sample[:2]
+        if len(sample) > 2 and sample[2] is not None:
+            environment = sample[2]
+        if len(sample) > 3 and sample[3] is not None:
+            exposure = sample[3]
+        name = None
+    return (name, formula, mass, environment, exposure, tuple(rest_times),
+            abundance)
+
+# Responses for recent environments in this process, indexed by the
+# environment values and the calculation parameters.
+_RESPONSES = {}
+def _activation_response(environment, exposure, rest_times, abundance):
+    """
+    Return the cached :class:`ActivationResponse` for the parameters.
+
+    The response holds its own copy of *environment* so that changes
+    to the caller's environment do not alter the cached activities.
+    """
+    key = (environment.fluence, environment.Cd_ratio, environment.fast_ratio,
+           environment.location, exposure, tuple(rest_times), abundance)
+    response = _RESPONSES.get(key, None)
+    if response is None:
+        if len(_RESPONSES) > 100:
+            _RESPONSES.clear()
+        environment = ActivationEnvironment(
+            fluence=environment.fluence, Cd_ratio=environment.Cd_ratio,
+            fast_ratio=environment.fast_ratio, location=environment.location)
+        response = _RESPONSES[key] = ActivationResponse(
+            environment, exposure=exposure, rest_times=rest_times,
+            abundance=abundance)
+    return response
+
+def _warm_activation_worker():
+    """
+    Load the activation table and formula parser before processing samples.
+    """
+    init(core.default_table())
+    build_formula("H2O")
+
+def _run_activation_job(job):
+    """
+    Compute the activation record for one job.
+    """
+    name, formula, mass, environment, exposure, rest_times, abundance = job
+    record = dict(name=name if name else str(formula), formula=str(formula),
+                  mass=mass, exposure=exposure, rest_times=rest_times,
+                  activity=[0.]*len(rest_times), products=[], error=None)
+    try:
+        if mass is None:
+            raise ValueError("missing sample mass")
+        sample = Sample(formula, mass, name=name)
+        _activation_response(environment, exposure, rest_times,
+                             abundance).calculate(sample)
+    except Exception as exc:
+        record['error'] = str(exc) if str(exc) else exc.__class__.__name__
+        return record
+    record['name'] = sample.name
+    for ai, activity_el in sorted_activity(sample.activity.items()):
+        record['products'].append((ai.isotope, ai.daughter, ai.reaction,
+                                   ai.Thalf_str, activity_el))
+        record['activity'] = [t+a for t, a in zip(record['activity'], activity_el)]
+    return record
+
+def write_activation_csv(records, fh, format="%.4g"):
+    """
+    Write activation records from :func:`batch_activation` as CSV.
+
+    The output has one row per sample with the total activity (uCi) at each
+    rest time.  Rows are written as the records arrive, so the records can
+    be streamed directly from :func:`batch_activation`.
+    """
+    import csv
+    writer = csv.writer(fh)
+    header = None
+    for record in records:
+        if header is None:
+            header = (["name", "formula", "mass", "exposure"]
+                      + ["%g hrs"%t for t in record['rest_times']]
+                      + ["error"])
+            writer.writerow(header)
+        activity = ([""]*len(record['activity']) if record['error']
+                    else [format%a for a in record['activity']])
+        writer.writerow([record['name'] or "", record['formula'],
+                         "%g"%record['mass'] if record['mass'] is not None else "",
+                         "%g"%record['exposure']]
+                        + activity + [record['error'] or ""])
 
 def demo():  # pragma: nocover
     import sys
@@ -0,0 +1,332 @@
+# This program is public domain
+"""
+Batch calculation of mass, neutron and X-ray scattering for many formulas.
+
+Usage::
+
+    python -m periodictable [options] [file ...]
+
+Each input file is either CSV with a header line containing a *formula*
+column, or plain text with one formula per line.  Use '-' or no file to
+read from stdin.  CSV files may also have *density*, *natural_density*,
+*wavelength* (neutron, |Ang|), *energy* (neutron, meV), *xray_wavelength*
+(|Ang|) and *xray_energy* (keV) columns, which override the defaults
+given on the command line.  Formulas may include the density, as in
+"D2O@1.11n".
+
+The output has one row per input formula, in CSV or JSON-lines format,
+with the molar mass, the neutron SLD (real, imaginary and incoherent),
+the 1/e neutron penetration depth, the X-ray SLD (real and imaginary),
+and an error message for formulas which could not be computed.  Input is
+read and written in chunks, which are computed with array operations and
+optionally in parallel, so memory use does not depend on the number of
+formulas.  For example::
+
+    $ printf "formula,density\\nH2O,1\\nD2O@1n,\\n" | python -m periodictable
+    formula,density,mass,wavelength,sld,isld,incoh,penetration,xray_energy,xray_sld,xray_isld,error
+    H2O,1,18.0153,1.798,-0.56052,6.18538e-05,21.1797,0.177078,8.04152,9.46912,0.0318076,
+    D2O,1.1117,20.0276,1.798,6.40246,1.14153e-07,3.32566,1.53307,8.04152,9.46912,0.0318076,
+
+Use *--help* for the list of options.
+"""
+from __future__ import division, print_function
+
+import csv
+import itertools
+import json
+import sys
+from math import pi
+
+import numpy
+
+from . import core
+from .constants import avogadro_number, electron_radius
+from .formulas import formula as build_formula
+
+#: Columns of the output records.
+OUTPUT_COLUMNS = ('formula', 'density', 'mass', 'wavelength', 'sld', 'isld',
+                  'incoh', 'penetration', 'xray_energy', 'xray_sld',
+                  'xray_isld', 'error')
+
+INPUT_NUMERIC_COLUMNS = ('density', 'natural_density', 'wavelength', 'energy',
+                         'xray_wavelength', 'xray_energy')
+
+def read_rows(fh):
+    """
+    Iterate over the formulas in an input file.
+
+    *fh* is an open file or any iterable of lines, either CSV with a
+    *formula* column in the header, or one formula per line.
+
+    Yields one dictionary per formula, with numeric columns converted to
+    float.  Blank values are treated as missing.  Values which are not
+    numbers are left as strings and reported by :func:`calculate`.
+    """
+    lines = iter(fh)
+    first = next(lines, None)
+    if first is None:
+        return
+    header = [v.strip() for v in next(csv.reader([first]))]
+    if 'formula' not in header:
+        for line in itertools.chain([first], lines):
+            if line.strip():
+                yield {'formula': line.strip()}
+        return
+    for values in csv.reader(lines):
+        row = dict((k, v.strip()) for k, v in zip(header, values)
+                   if v.strip())
+        if not row:
+            continue
+        for k in INPUT_NUMERIC_COLUMNS:
+            if k in row:
+                try:
+                    row[k] = float(row[k])
+                except ValueError:
+                    pass  # reported as an error for the row by calculate
+        yield row
+
+def calculate(rows, wavelength=None, energy=None, xray_wavelength=None,
+              xray_energy=None, chunksize=1000, workers=1):
+    """
+    Calculate mass and scattering for a stream of formulas.
+
+    :Parameters:
+        *rows* : iterable
+            Dictionaries as returned by :func:`read_rows`.
+        *wavelength*, *energy* : float | |Ang|, meV
+            Default neutron wavelength or energy.  The default is 1.798 |Ang|.
+        *xray_wavelength*, *xray_energy* : float | |Ang|, keV
+            Default X-ray wavelength or energy.  The default is Cu K-alpha.
+        *chunksize* = 1000 : int
+            Number of formulas computed together.
+        *workers* = 1 : int
+            Number of worker processes, or None for the number of CPUs.
+
+    :Returns:
+        *records* : iterator
+            One dictionary per row with the keys in :data:`OUTPUT_COLUMNS`,
+            in input order.
+    """
+    from .util import pool_map
+    from .nsf import neutron_wavelength, ABSORPTION_WAVELENGTH
+    from .xsf import xray_energy as to_xray_energy
+    if energy is not None:
+        wavelength = neutron_wavelength(energy)
+    if wavelength is None:
+        wavelength = ABSORPTION_WAVELENGTH
+    if xray_wavelength is None and xray_energy is None:
+        xray_wavelength = core.default_table().Cu.K_alpha
+    if xray_wavelength is not None:
+        xray_energy = to_xray_energy(xray_wavelength)
+    defaults = float(wavelength), float(xray_energy)
+
+    rows = iter(rows)
+    chunks = iter(lambda: list(itertools.islice(rows, chunksize)), [])
+    jobs = ((chunk, defaults) for chunk in chunks)
+    for records in pool_map(_calculate_chunk, jobs, workers=workers,
+                            initializer=_warm_worker):
+        for record in records:
+            yield record
+
+def _calculate_chunk(job):
+    """
+    Compute the records for a chunk of rows.
+    """
+    from .nsf import neutron_wavelength, ABSORPTION_WAVELENGTH
+    from .xsf import xray_energy as to_xray_energy
+    rows, (default_wavelength, default_xray_energy) = job
+    n = len(rows)
+    sums = numpy.zeros((5, n))
+    density = numpy.full(n, numpy.nan)
+    wavelength = numpy.full(n, default_wavelength)
+    xray_energy = numpy.full(n, default_xray_energy)
+    names, errors, atoms = [None]*n, [None]*n, {}
+    for k, row in enumerate(rows):
+        try:
+            compound, sums[:, k] = _parse(row.get('formula', ''))
+            names[k] = str(compound)
+            if 'density' in row:
+                density[k] = row['density']
+            elif 'natural_density' in row:
+                density[k] = (row['natural_density']
+                              / compound.natural_mass_ratio())
+            elif compound.density is not None:
+                density[k] = compound.density
+            else:
+                raise ValueError("missing density for %s"%compound)
+            if 'energy' in row:
+                wavelength[k] = neutron_wavelength(row['energy'])
+            elif 'wavelength' in row:
+                wavelength[k] = row['wavelength']
+            if 'xray_wavelength' in row:
+                xray_energy[k] = to_xray_energy(row['xray_wavelength'])
+            elif 'xray_energy' in row:
+                xray_energy[k] = row['xray_energy']
+        except Exception as exc:
+            sums[:, k] = numpy.nan
+            names[k] = row.get('formula', '')
+            errors[k] = str(exc) if str(exc) else exc.__class__.__name__
+            continue
+        for atom, count in compound.atoms.items():
+            index, counts = atoms.setdefault(atom, ([], []))
+            index.append(k)
+            counts.append(count)
+    mass, num_atoms, b_c, sigma_s, sigma_a = sums
+
+    # Neutron scattering; see nsf.neutron_scattering for details.
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        b_c = b_c/num_atoms
+        sigma_s = sigma_s/num_atoms
+        sigma_a = sigma_a*wavelength/ABSORPTION_WAVELENGTH/num_atoms
+        cell_volume = (mass/density)/avogadro_number*1e24
+        number_density = num_atoms/cell_volume
+        sigma_c = 4*pi/100 * b_c**2
+        sigma_i = numpy.maximum(sigma_s - sigma_c, 0.0)
+        sld = number_density * b_c * 10
+        isld = number_density * sigma_a / (2 * wavelength) * 0.01
+        incoh = number_density * numpy.sqrt(sigma_i / (4*pi/100)) * 10
+        penetration = 1/(number_density*(sigma_a + sigma_s))
+
+    # X-ray scattering; see xsf.xray_sld for details.
+    sum_f1, sum_f2 = numpy.zeros(n), numpy.zeros(n)
+    for atom, (index, counts) in atoms.items():
+        index, counts = numpy.array(index), numpy.array(counts)
+        f1, f2 = atom.xray.scattering_factors(energy=xray_energy[index])
+        if f1 is None:
+            f1 = f2 = numpy.nan
+        numpy.add.at(sum_f1, index, counts*f1)
+        numpy.add.at(sum_f2, index, counts*f2)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        N = density/mass*avogadro_number*1e-8
+        xray_sld = N*sum_f1*electron_radius
+        xray_isld = N*sum_f2*electron_radius
+
+    # Vacuum for empty formulas or zero density.
+    vacuum = (mass*density == 0)
+    for v in (sld, isld, incoh, xray_sld, xray_isld):
+        v[vacuum] = 0.
+    penetration[vacuum] = numpy.inf
+
+    columns = (names, density, mass, wavelength, sld, isld, incoh,
+               penetration, xray_energy, xray_sld, xray_isld, errors)
+    records = []
+    for values in zip(*columns):
+        record = dict(zip(OUTPUT_COLUMNS, values))
+        if record['error'] is not None:
+            for key in OUTPUT_COLUMNS[1:-1]:
+                record[key] = None
+        else:
+            for key in OUTPUT_COLUMNS[1:-1]:
+                record[key] = float(record[key])
+        records.append(record)
+    return records
+
+# Parsed formulas and their neutron sums (mass, atoms, b_c, sigma_s,
+# sigma_a), indexed by formula string.
+_FORMULA_CACHE = {}
+def _parse(compound):
+    """
+    Return the formula and its neutron sums, using the parse cache.
+    """
+    result = _FORMULA_CACHE.get(compound, None)
+    if result is None:
+        f = build_formula(compound)
+        sums = numpy.zeros(5)
+        for atom, count in f.atoms.items():
+            if atom.neutron.has_sld():
+                sums += (atom.mass*count, count, count*atom.neutron.b_c,
+                         count*atom.neutron.total,
+                         count*atom.neutron.absorption)
+            else:
+                # Neutron columns are missing, but mass and X-ray are not.
+                sums[:2] += (atom.mass*count, count)
+                sums[2:] = numpy.nan
+        if len(_FORMULA_CACHE) > 10000:
+            _FORMULA_CACHE.clear()
+        result = _FORMULA_CACHE[compound] = f, sums
+    return result
+
+def _warm_worker():
+    """
+    Load the scattering tables and formula parser before processing.
+    """
+    _parse("H2O")[0].xray_sld(energy=8.)
+
+def write_csv(records, fh, format="%.6g"):
+    """
+    Write the records from :func:`calculate` as CSV, with numbers written
+    using *format*.  Missing values are left blank.
+    """
+    writer = csv.writer(fh)
+    writer.writerow(OUTPUT_COLUMNS)
+    for record in records:
+        writer.writerow([
+            "" if record[k] is None
+            else record[k] if k in ('formula', 'error')
+            else format%record[k]
+            for k in OUTPUT_COLUMNS])
+
+def write_jsonl(records, fh):
+    """
+    Write the records from :func:`calculate` as JSON, one record per line.
+    Values which are missing, infinite or NaN are written as null.
+    """
+    for record in records:
+        record = dict((k, None if isinstance(v, float) and not numpy.isfinite(v)
+                       else v) for k, v in record.items())
+        fh.write(json.dumps(record))
+        fh.write("\n")
+
+def main(argv=None):
+    """
+    Command line interface for batch calculations.
+    """
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog="python -m periodictable",
+        description="Compute mass, neutron and X-ray SLD for formulas "
+        "read from CSV files or stdin.")
+    parser.add_argument('files', nargs='*', default=['-'],
+                        help="input files, or '-' for stdin")
+    parser.add_argument('-o', '--output', default='-',
+                        help="output file, or '-' for stdout")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), default='csv',
+                        help="output format")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--wavelength', type=float,
+                       help="neutron wavelength (Ang, default 1.798)")
+    group.add_argument('--energy', type=float, help="neutron energy (meV)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--xray-wavelength', type=float,
+                       help="X-ray wavelength (Ang, default Cu K-alpha)")
+    group.add_argument('--xray-energy', type=float, help="X-ray energy (keV)")
+    parser.add_argument('--chunksize', type=int, default=1000,
+                        help="formulas computed together")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="worker processes, or 0 for the number of CPUs")
+    opts = parser.parse_args(argv)
+
+    def rows():
+        for filename in opts.files:
+            if filename == '-':
+                for row in read_rows(sys.stdin):
+                    yield row
+            else:
+                with open(filename, newline='') as fh:
+                    for row in read_rows(fh):
+                        yield row
+    records = calculate(rows(), wavelength=opts.wavelength,
+                        energy=opts.energy,
+                        xray_wavelength=opts.xray_wavelength,
+                        xray_energy=opts.xray_energy,
+                        chunksize=opts.chunksize,
+                        workers=opts.workers if opts.workers > 0 else None)
+    write = write_csv if opts.format == 'csv' else write_jsonl
+    if opts.output == '-':
+        write(records, sys.stdout)
+    else:
+        with open(opts.output, 'w', newline='') as fh:
+            write(records, fh)
+
+if __name__ == "__main__":
+    main()
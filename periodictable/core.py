@@ -63,6 +63,8 @@ __all__ = ['delayed_load', 'define_elements', 'get_data_path',
            'Ion', 'Isotope', 'Element', 'PeriodicTable',
            'isatom', 'iselement', 'isisotope', 'ision']
 
+import copy
+
 from . import constants
 
 PUBLIC_TABLE_NAME = "public"
@@ -213,6 +215,12 @@ class PeriodicTable(object):
             raise ValueError("Periodic table '%s' is already defined"%table)
         PRIVATE_TABLES[table] = self
         self.properties = []
+        self._overrides = []
+        self._recipe = None
+        # Only tables built with clone and override have a recipe.
+        self._reproducible = False
+        # Tables built from a recipe can be replaced when the recipe changes.
+        self._rebuilt = False
         self._element = {}
         for Z, (name, symbol, ions, uncommon_ions) in element_base.items():
             element = Element(name=name.lower(), symbol=symbol, Z=Z,
@@ -228,6 +236,130 @@ class PeriodicTable(object):
         self.T.name = 'tritium'
         self.T.symbol = 'T'
 
+    def clone(self, table, properties=None, overrides=None):
+        """
+        Create a new periodic table with the same data as this one.
+
+        :Parameters:
+            *table* : string
+                Name of the new table, which must be unique in the session.
+            *properties* = None : [string]
+                Properties such as 'neutron' or 'xray' to load into this
+                table before copying.  All properties already loaded are
+                copied as well.
+            *overrides* = None : {atom: {attribute: value}}
+                Values to change in the new table, with *atom* given
+                as an element, isotope or name such as 'Fe', '58-Ni' or 'D',
+                and *attribute* a name such as 'mass', 'density' or a
+                dotted name such as 'neutron.b_c'.
+
+        :Returns: PeriodicTable
+
+        This is much faster than initializing a new table from the data
+        files with *module.init(table)* since the parsed data is shared
+        between the tables rather than read again.  Values such as
+        *el.neutron* are the same objects in both tables, so change them
+        using *overrides* or :meth:`override`, which copy the object before
+        changing it, rather than by assigning to their attributes.
+
+        For example, create a table with enriched nickel:
+
+        .. doctest::
+
+            >>> from periodictable import elements
+            >>> mine = elements.clone("enriched Ni", properties=['neutron'],
+            ...     overrides={'Ni': {'mass': 60., 'neutron.b_c': 2.8}})
+            >>> print("%.1f %.2f %.2f"%(mine.Ni.mass, mine.Ni.neutron.b_c,
+            ...                         elements.Ni.neutron.b_c))
+            60.0 2.80 10.30
+        """
+        for prop in (properties or []):
+            if prop not in self.properties:
+                _load_property(self, prop)
+
+        clone = PeriodicTable(table)
+        clone.properties = list(self.properties)
+        clone._overrides = list(self._overrides)
+        clone._reproducible = self is PUBLIC_TABLE or self._reproducible
+        for el in self:
+            target = clone[el.number]
+            target.__dict__.update((k, v) for k, v in el.__dict__.items()
+                                   if k not in _STRUCTURE_ATTRIBUTES)
+            for number, iso in el._isotopes.items():
+                target._isotopes[number] = _clone_isotope(iso, target)
+        clone.D, clone.T = clone.H[2], clone.H[3]
+        for atom, values in (overrides or {}).items():
+            for attr, value in values.items():
+                clone.override(atom, attr, value)
+        return clone
+
+    def override(self, atom, attr, value):
+        """
+        Set the value of an attribute for an atom in the table.
+
+        :Parameters:
+            *atom* : Element, Isotope or string
+                Atom in the table, or its name as accepted by :meth:`isotope`.
+            *attr* : string
+                Attribute name, or a dotted name such as 'neutron.b_c' to
+                change the attribute of a property.
+            *value* : any
+                New value.
+
+        :Returns: None
+
+        Computed properties such as *mass* and *density* are set by
+        setting the underlying *_mass* or *_density* value.  Property
+        objects such as *neutron* are copied before they are changed, so
+        tables created with :meth:`clone` can be changed without affecting
+        the table they were cloned from.  Values set with :meth:`override`
+        are part of the table :attr:`recipe`.
+        """
+        if not isinstance(atom, str):
+            atom = str(atom)
+        target = self.isotope(atom)
+        path = attr.split('.')
+        # Copy each object along the path before modifying it.
+        for name in path[:-1]:
+            child = copy.copy(getattr(target, name))
+            setattr(target, name, child)
+            target = child
+        name = path[-1]
+        if (isinstance(getattr(type(target), name, None), property)
+                and getattr(type(target), name).fset is None):
+            name = '_' + name
+        setattr(target, name, value)
+        # Record the override once it has succeeded so that the recipe
+        # can be replayed.
+        self._overrides.append((atom, attr, value))
+
+    @property
+    def recipe(self):
+        """
+        Recipe (name, properties, overrides) for rebuilding the table, or
+        None if the table was not built with :meth:`clone`.
+
+        Elements, isotopes, ions and formulas from a table with a recipe
+        carry the recipe when they are pickled, so a process which does not
+        have the table, such as a worker started with the *spawn* method,
+        rebuilds it with :meth:`clone` from the public table the first
+        time it is needed.  Later overrides made by the pickling process
+        are applied to the existing copy, and unpickling raises ValueError
+        if the original table does not match the recipe.  The recipe records the properties loaded into the table
+        and the changes made with :meth:`override`.  Values assigned
+        directly to the atoms are not recorded.  Tables without a recipe
+        must be created by the process before their atoms are unpickled.
+        """
+        if not self._reproducible:
+            return None
+        key = len(self.properties), len(self._overrides)
+        if self._recipe is None or self._recipe[0] != key:
+            # Keep the same tuple while the table is unchanged so that
+            # pickle stores it once for all references to the table.
+            self._recipe = key, (self[0].table, tuple(self.properties),
+                                 tuple(self._overrides))
+        return self._recipe[1]
+
     def __getitem__(self, Z):
         """
         Retrieve element Z.
@@ -409,6 +541,7 @@ class PeriodicTable(object):
                 #    raise
 
 class IonSet(object):
+    __slots__ = ('element_or_isotope', 'ionset')
     def __init__(self, element_or_isotope):
         self.element_or_isotope = element_or_isotope
         self.ionset = {}
@@ -430,11 +563,19 @@ class Ion(object):
     properties (*charge*). Properties not specific to the ion (i.e., *charge*)
     are retrieved from the associated element.
     """
+    # Ions only store charge; other attributes, such as the x-ray tables
+    # for the ion, are kept in an instance dictionary created on demand.
+    __slots__ = ('element', 'charge', '__dict__')
     def __init__(self, element, charge):
         self.element = element
         self.charge = charge
     def __getattr__(self, attr):
         return getattr(self.element, attr)
+    # Frequently used element attributes are looked up directly rather than
+    # through __getattr__.
+    number = property(lambda self: self.element.number)
+    symbol = property(lambda self: self.element.symbol)
+    name = property(lambda self: self.element.name)
     @property
     def mass(self):
         return getattr(self.element, 'mass') - constants.electron_mass*self.charge
@@ -447,12 +588,12 @@ class Ion(object):
         return repr(self.element)+'.ion[%d]'%self.charge
     def __reduce__(self):
         try:
-            return _make_isotope_ion, (self.element.table,
+            return _make_isotope_ion, (_table_key(self.element.table),
                                        self.element.number,
                                        self.element.isotope,
                                        self.charge)
         except Exception:
-            return _make_ion, (self.element.table,
+            return _make_ion, (_table_key(self.element.table),
                                self.element.number,
                                self.charge)
 
@@ -466,21 +607,44 @@ class Isotope(object):
     Properties not specific to the isotope (e.g., *x-ray scattering factors*)
     are retrieved from the associated element.
     """
+    # The isotope data common to all isotopes is stored in slots.  Other
+    # properties, such as neutron scattering factors, are kept in an
+    # instance dictionary which is only created for isotopes which have them.
+    __slots__ = ('element', 'isotope', '_ionset', '_name', '_symbol',
+                 '_mass', '_abundance', 'nuclear_spin', '__dict__')
     def __init__(self, element, isotope_number):
         self.element = element
         self.isotope = isotope_number
-        self.ion = IonSet(self)
+        self._ionset = self._name = self._symbol = None
     def __getattr__(self, attr):
         return getattr(self.element, attr)
+    @property
+    def ion(self):
+        """Ions of the isotope, indexed by charge."""
+        if self._ionset is None:
+            self._ionset = IonSet(self)
+        return self._ionset
+    # Deuterium and tritium have their own name and symbol.
+    def _get_name(self):
+        return self.element.name if self._name is None else self._name
+    def _set_name(self, name):
+        self._name = name
+    name = property(_get_name, _set_name)
+    def _get_symbol(self):
+        return self.element.symbol if self._symbol is None else self._symbol
+    def _set_symbol(self, symbol):
+        self._symbol = symbol
+    symbol = property(_get_symbol, _set_symbol)
+    number = property(lambda self: self.element.number)
     def __str__(self):
         # Deuterium and Tritium are special
-        if 'symbol' in self.__dict__:
-            return self.symbol
+        if self._symbol is not None:
+            return self._symbol
         return "%d-%s"%(self.isotope, self.element.symbol)
     def __repr__(self):
         return "%s[%d]"%(self.element.symbol, self.isotope)
     def __reduce__(self):
-        return _make_isotope, (self.element.table,
+        return _make_isotope, (_table_key(self.element.table),
                                self.element.number,
                                self.isotope)
 
@@ -546,7 +710,7 @@ class Element(object):
         return self.symbol
 
     def __reduce__(self):
-        return _make_element, (self.table, self.number)
+        return _make_element, (_table_key(self.table), self.number)
 
 def isatom(val):
     """Return true if value is an element, isotope or ion"""
@@ -582,13 +746,129 @@ def change_table(atom, table):
         else:
             return table[atom.number]
 
+# Module providing init(table) for each table property.
+PROPERTY_MODULES = {
+    'mass': 'mass',
+    'density': 'density',
+    'neutron': 'nsf',
+    'xray': 'xsf',
+    'magnetic_ff': 'magnetic_ff',
+    'covalent_radius': 'covalent_radius',
+    'crystal_structure': 'crystal_structure',
+    'neutron_activation': 'activation',
+}
+
+# Attributes which refer to the table structure rather than to data, and
+# so are not copied by PeriodicTable.clone.
+_STRUCTURE_ATTRIBUTES = set(('number', 'table', 'element', 'isotope',
+                             '_isotopes', 'ion', '_xray'))
+def _load_property(table, prop):
+    """
+    Load property *prop* into *table* using the init function of its module.
+    """
+    try:
+        name = PROPERTY_MODULES[prop]
+    except KeyError:
+        raise ValueError("Unknown periodic table property '%s'"%prop)
+    module = __import__('periodictable.'+name, fromlist=['init'])
+    module.init(table)
+
+def _clone_isotope(iso, element):
+    """
+    Return a copy of *iso* for *element* sharing the same data attributes.
+    """
+    # Isotope.__init__ and copy.copy are avoided since they are slow for
+    # the thousands of isotopes in the table.
+    clone = Isotope.__new__(Isotope)
+    clone.element, clone.isotope = element, iso.isotope
+    clone._ionset, clone._name, clone._symbol = None, iso._name, iso._symbol
+    for get, set in _ISOTOPE_DATA_SLOTS:
+        try:
+            set(clone, get(iso))
+        except AttributeError:
+            pass
+    if iso.__dict__:
+        clone.__dict__.update(iso.__dict__)
+    return clone
+# Slots which may be unset on an isotope, such as nuclear_spin when there
+# is no neutron data.
+_ISOTOPE_DATA_SLOTS = [
+    (getattr(Isotope, k).__get__, getattr(Isotope, k).__set__)
+    for k in ('_mass', '_abundance', 'nuclear_spin')
+]
+
 PRIVATE_TABLES = {}
 def _get_table(name):
+    """
+    Return the table with the given name, or for a table recipe, the table
+    built from the recipe if it does not yet exist in this process.
+    """
+    if isinstance(name, tuple):
+        recipe, name = name, name[0]
+        table = PRIVATE_TABLES.get(name, None)
+        if table is None:
+            _rebuild_table(recipe)
+        elif table.recipe != recipe:
+            _update_table(table, recipe)
     try:
         return PRIVATE_TABLES[name]
     except KeyError:
         raise ValueError("Periodic table '%s' is not initialized"%name)
 
+def _rebuild_table(recipe, install=None, installed=()):
+    """
+    Build a table from its *recipe* by cloning the public table.
+
+    If *install(table)* is given, it is called before the overrides are
+    applied to set the *installed* properties, which are then not loaded
+    from the data files.
+    """
+    name, properties, overrides = recipe
+    table = PUBLIC_TABLE.clone(
+        name, properties=[p for p in properties if p not in installed])
+    if install is not None:
+        install(table)
+    for atom, attr, value in overrides:
+        table.override(atom, attr, value)
+    table._rebuilt = True
+    return table
+
+def _update_table(table, recipe):
+    """
+    Bring *table* up to date with a *recipe* for the table of the same
+    name from another process.
+
+    Overrides made after the table was copied are applied to the table.
+    Otherwise a table built from an earlier recipe is replaced.
+
+    Raises ValueError if the table does not match the recipe.
+    """
+    name, properties, overrides = recipe
+    current = table.recipe
+    if current is not None:
+        n = len(current[2])
+        if (set(properties) <= set(current[1])
+                and overrides[:n] == current[2]):
+            for atom, attr, value in overrides[n:]:
+                table.override(atom, attr, value)
+            return
+    if not table._rebuilt:
+        raise ValueError("Periodic table '%s' does not match the pickled "
+                         "table"%name)
+    del PRIVATE_TABLES[name]
+    _rebuild_table(recipe)
+
+def _table_key(name):
+    """
+    Return the recipe of a private table built with
+    :meth:`PeriodicTable.clone`, or otherwise the table name, for pickling
+    atoms from the table.
+    """
+    if name == PUBLIC_TABLE_NAME or name not in PRIVATE_TABLES:
+        return name
+    recipe = PRIVATE_TABLES[name].recipe
+    return name if recipe is None else recipe
+
 def _make_element(table, Z):
     return _get_table(table)[Z]
 def _make_isotope(table, Z, n):
@@ -143,9 +143,9 @@ def init(table, reload=False):
         return
     table.properties.append('density')
     Isotope.density \
-        = property(density, "density using inter-atomic spacing from naturally occurring form")
+        = property(density, doc="density using inter-atomic spacing from naturally occurring form")
     Element.density \
-        = property(density, "density using inter-atomic spacing from naturally occurring form")
+        = property(density, doc="density using inter-atomic spacing from naturally occurring form")
     Element.density_units = "g/cm^3"
 
     Element.interatomic_distance \
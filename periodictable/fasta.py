@@ -12,10 +12,16 @@ labile hydrogens.  :meth:`Molecule.D2Osld` computes the neutron SLD for
 the solvated molecule in a %D2O solvent.
 
 :func:`D2Omatch` computes the %D2O constrast match value given the fully
-hydrogenated and fully deuterated forms.
+hydrogenated and fully deuterated forms.  :func:`contrast_series` computes
+SLD and match points for many molecules over a range of %D2O and labile
+exchange fractions at once.
 
 :class:`Sequence` lets you read amino acid and DNA/RNA sequences from FASTA
-files.
+files.  :func:`batch_sequences` computes mass, SLD and contrast match for
+every sequence in a FASTA file of any size, optionally using several
+worker processes.  :class:`FastaIndex` retrieves individual sequences
+from large FASTA files by accession or position using an index built once
+by :func:`index_fasta`.
 
 Tables for common molecules are provided[1]:
 
@@ -39,6 +45,10 @@ ratio on the non-swappable hydrogens.
 """
 from __future__ import division
 
+import os
+
+import numpy
+
 from .formulas import formula as parse_formula
 from .nsf import neutron_sld
 from .xsf import xray_sld
@@ -121,6 +131,10 @@ class Sequence(Molecule):
        rna: rna sequence
 
     Note: rna sequence files treat T as U and dna sequence files treat U as T.
+
+    The composition is computed from the number of times each code appears
+    in the sequence, so the cost after counting the codes does not depend
+    on the sequence length.
     """
     @staticmethod
     def loadall(filename, type=None):
@@ -145,21 +159,146 @@ class Sequence(Molecule):
             return Sequence(name, seq, type=type)
 
     def __init__(self, name, sequence, type='aa'):
-        codes = CODE_TABLES[type]
         sequence = sequence.split('*', 1)[0]  # stop at first '*'
         sequence = sequence.replace(' ', '')  # ignore spaces
-        parts = tuple(codes[c] for c in sequence)
-        cell_volume = sum(p.cell_volume for p in parts)
-        charge = sum(p.charge for p in parts)
-        structure = []
-        for p in parts:
-            structure.extend(list(p.formula.structure))
-        formula = parse_formula(structure).hill
+
+        # Composition only depends on the number of times each code appears,
+        # so sum the residue properties weighted by the code counts.
+        residues = _residue_table(type)
+        counts = residues.count(sequence)
+        cell_volume = float(numpy.dot(counts, residues.cell_volume))
+        charge = _count(numpy.dot(counts, residues.charge))
+        formula = parse_formula(residues.atoms(counts))
 
         Molecule.__init__(self, name, formula,
                           cell_volume=cell_volume, charge=charge)
         self.sequence = sequence
 
+class _ResidueTable(object):
+    """
+    Residue properties for a FASTA code table stored as arrays.
+
+    *codes* is the list of codes, with *lookup* mapping character values
+    to code index or -1 for invalid codes.  Row *i* of *composition*
+    gives the number of each of *elements* in code *i*, with *cell_volume*
+    and *charge* giving the residue volume and charge.
+    """
+    def __init__(self, code_table):
+        self.codes = sorted(code_table.keys())
+        molecules = [code_table[c] for c in self.codes]
+        elements = set()
+        for m in molecules:
+            elements.update(m.formula.atoms.keys())
+        self.elements = list(elements)
+        column = dict((el, k) for k, el in enumerate(self.elements))
+        self.composition = numpy.zeros((len(self.codes), len(self.elements)))
+        for k, m in enumerate(molecules):
+            for el, n in m.formula.atoms.items():
+                self.composition[k, column[el]] = n
+        self.cell_volume = numpy.array([m.cell_volume for m in molecules], 'd')
+        self.charge = numpy.array([m.charge for m in molecules], 'd')
+        self.lookup = numpy.full(256, -1, dtype='i')
+        for k, c in enumerate(self.codes):
+            self.lookup[ord(c)] = k
+
+    def count(self, sequence):
+        """
+        Return the number of times each code appears in the sequence.
+
+        Raises KeyError for characters which are not in the code table.
+        """
+        try:
+            values = numpy.frombuffer(sequence.encode('latin-1'), dtype='uint8')
+        except UnicodeEncodeError as exc:
+            raise KeyError(sequence[exc.start])
+        index = self.lookup[values]
+        bad = index < 0
+        if bad.any():
+            raise KeyError(sequence[numpy.argmax(bad)])
+        return numpy.bincount(index, minlength=len(self.codes))
+
+    def atoms(self, counts):
+        """
+        Return the {*atom*: *count*} composition given the code counts.
+        """
+        total = numpy.dot(counts, self.composition)
+        return dict((el, _count(n)) for el, n in zip(self.elements, total) if n)
+
+def _count(value):
+    """
+    Return *value* as an int if it is integral, as it is for sequences
+    without ambiguous codes, otherwise as a float.
+    """
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+_RESIDUE_TABLES = {}
+def _residue_table(type):
+    """
+    Return the residue property arrays for sequence *type*, building them
+    from the code table on first use.
+    """
+    if type not in _RESIDUE_TABLES:
+        _RESIDUE_TABLES[type] = _ResidueTable(CODE_TABLES[type])
+    return _RESIDUE_TABLES[type]
+
+def batch_sequences(source, type=None, workers=None, chunksize=64):
+    """
+    Compute the properties of every sequence in a FASTA file.
+
+    *source* is a filename or an open FASTA file.
+
+    *type* is the sequence type ('aa', 'dna' or 'rna').  If it is not given
+    then it is guessed from the filename extension.
+
+    *workers* is the number of worker processes, or 1 to compute in the
+    current process.  Defaults to the number of CPUs.
+
+    *chunksize* is the number of sequences sent to each worker at a time.
+
+    Yields one record per sequence in file order.  Each record is a
+    dictionary with the sequence *name*, *length*, *mass*, *Hmass*,
+    *Dmass*, *cell_volume*, *charge*, *sld*, *Hsld*, *Dsld* and *D2Omatch*
+    as defined in :class:`Molecule`, and *error*, which is None or the
+    reason the sequence could not be computed.  Sequences are read and
+    computed incrementally, so memory use does not depend on the file size.
+    """
+    from .util import pool_map
+    if isinstance(source, str):
+        type = _guess_type_from_filename(source, type)
+        with open(source, 'rt') as fh:
+            for record in batch_sequences(fh, type=type, workers=workers,
+                                          chunksize=chunksize):
+                yield record
+        return
+    if type is None:
+        type = 'aa'
+    jobs = ((name, seq, type) for name, seq in read_fasta(source))
+    for record in pool_map(_sequence_record, jobs, workers=workers,
+                           chunksize=chunksize):
+        yield record
+
+SEQUENCE_RECORD_FIELDS = (
+    'name', 'length', 'mass', 'Hmass', 'Dmass', 'cell_volume', 'charge',
+    'sld', 'Hsld', 'Dsld', 'D2Omatch',
+)
+def _sequence_record(job):
+    """
+    Compute the properties of one sequence for :func:`batch_sequences`.
+    """
+    name, seq, type = job
+    record = dict((k, None) for k in SEQUENCE_RECORD_FIELDS)
+    record.update(name=name, error=None)
+    try:
+        s = Sequence(name, seq, type=type)
+    except KeyError as exc:
+        record['error'] = "unknown sequence code %s"%exc
+        return record
+    record['length'] = len(s.sequence)
+    for k in SEQUENCE_RECORD_FIELDS[2:]:
+        record[k] = getattr(s, k)
+    return record
+
 def _guess_type_from_filename(filename, type):
     if type is None:
         if filename.endswith('.fna'):
@@ -174,6 +313,190 @@ def _guess_type_from_filename(filename, type):
             type = 'aa'
     return type
 
+class FastaIndex(object):
+    """
+    Random access to the sequences in a FASTA file.
+
+    *filename* is the FASTA file.  The file is memory mapped, and only the
+    sequences requested are read.
+
+    *type* is the sequence type ('aa', 'dna' or 'rna').  If it is not given
+    then it is guessed from the filename extension.
+
+    *index* is the name of the index file, which defaults to *filename*
+    with '.index' appended.  The index is built by :func:`index_fasta` if
+    it is missing or older than the FASTA file.  If the index cannot be
+    saved then it is kept in memory for the life of the object.
+
+    Sequences are retrieved as :class:`Sequence` objects by position,
+    *fasta[k]*, or by accession, *fasta['P02666']*, where the accession is
+    the first word of the header line.  Use :meth:`sequence` to get the
+    code string without computing the composition.
+
+    The file stays open until :meth:`close` is called or the *with*
+    block is exited.
+    """
+    def __init__(self, filename, type=None, index=None):
+        import mmap
+        self.filename = filename
+        self.type = _guess_type_from_filename(filename, type)
+        if index is None:
+            index = filename + '.index'
+        self._fh = open(filename, 'rb')
+        try:
+            size = os.fstat(self._fh.fileno()).st_size
+            self._data = (mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+                          if size else b'')
+            entries = _read_fasta_index(index, filename, size)
+            if entries is None:
+                entries = _scan_fasta(self._data)
+                try:
+                    _write_fasta_index(index, entries)
+                except (IOError, OSError):
+                    pass
+        except Exception:
+            self.close()
+            raise
+        self.names = [e[0] for e in entries]
+        offsets = numpy.array([e[1:] for e in entries], dtype='int64')
+        self._offsets = offsets.reshape(len(entries), 3)
+        self._position = {}
+        for k, name in enumerate(self.names):
+            self._position.setdefault(name, k)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._position
+
+    def __getitem__(self, key):
+        k = self.position(key)
+        return Sequence(self.header(k), self.sequence(k), type=self.type)
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def position(self, key):
+        """
+        Return the position in the file of sequence *key*, which is either
+        a position or an accession.  Raises KeyError if the accession is
+        not in the file, or IndexError if the position is out of range.
+        """
+        if isinstance(key, str):
+            return self._position[key]
+        k = int(key)
+        if not -len(self) <= k < len(self):
+            raise IndexError("sequence %d out of range"%k)
+        return k % len(self)
+
+    def header(self, key):
+        """
+        Return the header line for sequence *key*, including the leading '>'.
+        """
+        header, start, _ = self._offsets[self.position(key)]
+        return self._data[header:start].rstrip().decode('latin-1')
+
+    def sequence(self, key):
+        """
+        Return the code string for sequence *key*.
+        """
+        _, start, end = self._offsets[self.position(key)]
+        return b''.join(self._data[start:end].split()).decode('latin-1')
+
+    def close(self):
+        """
+        Release the memory map and close the file.
+        """
+        if hasattr(self._data, 'close'):
+            self._data.close()
+        self._data = b''
+        self._fh.close()
+
+def index_fasta(filename, index=None):
+    """
+    Build the index used by :class:`FastaIndex` for a FASTA file.
+
+    *index* is the name of the index file, which defaults to *filename*
+    with '.index' appended.
+
+    Each line of the index has the accession, then the byte offsets of
+    the header line, the start of the sequence and the end of the sequence,
+    separated by tabs.  The index only needs to be rebuilt when the FASTA
+    file changes.
+
+    Returns the name of the index file.
+    """
+    import mmap
+    if index is None:
+        index = filename + '.index'
+    with open(filename, 'rb') as fh:
+        if os.fstat(fh.fileno()).st_size:
+            data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                entries = _scan_fasta(data)
+            finally:
+                data.close()
+        else:
+            entries = []
+    _write_fasta_index(index, entries)
+    return index
+
+def _scan_fasta(data):
+    """
+    Return (accession, header, start, end) for each sequence in *data*.
+
+    Only the header lines are visited, so the scan runs at memory speed
+    even for very large files.
+    """
+    entries = []
+    if data[:1] == b'>':
+        header = 0
+    else:
+        header = data.find(b'\n>')
+        header = header + 1 if header >= 0 else -1
+    while header >= 0:
+        start = data.find(b'\n', header) + 1
+        if start == 0:
+            start = len(data)
+        end = data.find(b'\n>', start - 1)
+        end = end + 1 if end >= 0 else len(data)
+        words = data[header+1:start].split(None, 1)
+        name = words[0].decode('latin-1') if words else ''
+        entries.append((name, header, start, end))
+        header = end if end < len(data) else -1
+    return entries
+
+def _write_fasta_index(index, entries):
+    with open(index, 'wt') as fh:
+        for entry in entries:
+            fh.write("%s\t%d\t%d\t%d\n"%entry)
+
+def _read_fasta_index(index, filename, size):
+    """
+    Return the index entries, or None if the index is missing or stale.
+    """
+    try:
+        if os.path.getmtime(index) < os.path.getmtime(filename):
+            return None
+        with open(index, 'rt') as fh:
+            entries = []
+            for line in fh:
+                name, header, start, end = line.rstrip('\n').split('\t')
+                entries.append((name, int(header), int(start), int(end)))
+    except (IOError, OSError, ValueError):
+        return None
+    if entries and entries[-1][3] != size:
+        return None
+    return entries
+
 # Water density at 20C; neutron wavelength doesn't matter (use 5 A).
 H2O_SLD = neutron_sld(parse_formula("H2O@0.9982"), wavelength=5)[0]
 D2O_SLD = neutron_sld(parse_formula("D2O@0.9982"), wavelength=5)[0]
@@ -196,6 +519,58 @@ def D2Omatch(Hsld, Dsld):
     # % = 100*(SLD(H2O) - SLD(Hsample)) / (SLD(Dsample) - SLD(Hsample) + SLD(H2O) - SLD(D2O))
     return 100*(H2O_SLD - Hsld) / (Dsld - Hsld + H2O_SLD - D2O_SLD)
 
+def contrast_series(molecules=None, D2O_fraction=None, exchange=1.,
+                    volume_fraction=1., sld=None, Dsld=None):
+    r"""
+    Neutron SLD of many molecules in solution across a range of %D2O.
+
+    :Parameters:
+        *molecules* : [Molecule]
+            Molecules to evaluate.  Alternatively, supply the SLD arrays
+            *sld* and *Dsld* for the natural and deuterated forms of the
+            molecules (see :class:`Molecule` *sld* and *Dsld*).
+        *D2O_fraction* : vector
+            Fraction of D2O in the solvent.  Defaults to 0 to 1 in steps
+            of 0.01.
+        *exchange* = 1 : float or vector
+            Fraction of the labile hydrogens which exchange with the solvent.
+        *volume_fraction* = 1 : float or vector
+            Volume fraction of each molecule in the solution.
+
+    :Returns:
+        *sld* : array(n_molecules, n_exchange, n_D2O) | |1e-6/Ang^2|
+            Neutron SLD for each molecule, exchange fraction and D2O fraction.
+        *match* : array(n_molecules, n_exchange) | %D2O
+            Contrast match point for each molecule and exchange fraction.
+
+    The molecule SLD with exchange fraction $x$ in a solvent with D2O
+    fraction $f$ is $\rho + x f (\rho_D - \rho)$.  This is combined
+    with the solvent SLD in proportion to the volume fraction.  With full
+    exchange and volume fraction 1 this is the same as
+    :meth:`Molecule.D2Osld`.  The match point is as given by
+    :func:`D2Omatch`, and is only meaningful between 0% and 100%.
+    """
+    if molecules is not None:
+        sld = [m.sld for m in molecules]
+        Dsld = [m.Dsld for m in molecules]
+    if sld is None or Dsld is None:
+        raise TypeError("contrast_series needs molecules or sld and Dsld")
+    if D2O_fraction is None:
+        D2O_fraction = numpy.linspace(0, 1, 101)
+    sld = numpy.asarray(sld, 'd').reshape(-1, 1, 1)
+    Dsld = numpy.asarray(Dsld, 'd').reshape(-1, 1, 1)
+    x = numpy.asarray(exchange, 'd').reshape(1, -1, 1)
+    f = numpy.asarray(D2O_fraction, 'd').reshape(1, 1, -1)
+    phi = numpy.asarray(volume_fraction, 'd')
+    if phi.ndim > 0:
+        phi = phi.reshape(-1, 1, 1)
+
+    solvent_sld = f*D2O_SLD + (1-f)*H2O_SLD
+    solute_sld = sld + (x*f)*(Dsld - sld)
+    match = D2Omatch(sld[:, :, 0], sld[:, :, 0] + x[:, :, 0]*(Dsld - sld)[:, :, 0])
+    sld = phi*solute_sld + (1-phi)*solvent_sld
+    return sld, match
+
 def read_fasta(fp):
     """
     Iterate over the sequences in a FASTA file.
@@ -454,6 +829,11 @@ def test():
     assert abs(s.mass/avogadro_number/s.cell_volume*1e24 - 1.267) < 0.01
     assert abs(s.Dsld-2.75) < 0.01
 
+    # Counts and charge stay integral unless there are ambiguous codes
+    assert s.charge == -3 and isinstance(s.charge, int)
+    assert all(isinstance(n, int) for n in s.formula.atoms.values())
+    assert Sequence("mixed", "ACZ").charge == -0.5
+
     # Check that X-ray sld is independent of isotope
     H = isotope_substitution(s.formula, elements.T, elements.H)
     D = isotope_substitution(s.formula, elements.T, elements.D)
@@ -461,5 +841,44 @@ def test():
     #print Hsld, Dsld
     assert abs(Hsld[0]-Dsld[0]) < 1e-10
 
+    # Check that batch processing matches individual sequences
+    from io import StringIO
+    fasta = StringIO(">beta casein\n%s\n%s\n>bad\nAC1D\n"
+                     % (beta_casein[:100], beta_casein[100:]))
+    records = list(batch_sequences(fasta, workers=1))
+    assert records[0]['name'] == ">beta casein"
+    assert records[0]['length'] == len(beta_casein)
+    assert records[0]['Dsld'] == s.Dsld and records[0]['mass'] == s.mass
+    assert records[1]['error'] == "unknown sequence code '1'"
+
+    # Check random access to sequences in an indexed file
+    import os, shutil, tempfile
+    path = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(path, "casein.fasta")
+        with open(filename, "w") as fh:
+            fh.write(fasta.getvalue() + ">P3 third\nACDE\nFG")
+        with FastaIndex(filename) as index:
+            assert index.names == ["beta", "bad", "P3"]
+            assert index["beta"].mass == s.mass
+            assert index[-1].name == ">P3 third"
+            assert index.sequence(2) == "ACDEFG"
+        assert os.path.exists(filename + ".index")
+        with FastaIndex(filename) as index:
+            assert index.header(1) == ">bad" and "P3" in index
+    finally:
+        shutil.rmtree(path)
+
+    # Check that the contrast series matches the individual calculation
+    molecules = [s, AMINO_ACID_CODES['A'], AMINO_ACID_CODES['K']]
+    sld, match = contrast_series(molecules, D2O_fraction=[0, 0.4, 1],
+                                 exchange=[0.5, 1], volume_fraction=0.2)
+    assert sld.shape == (3, 2, 3) and match.shape == (3, 2)
+    assert abs(sld[0, 1, 1] - s.D2Osld(volume_fraction=0.2, D2O_fraction=0.4)) < 1e-12
+    assert abs(match[2, 1] - AMINO_ACID_CODES['K'].D2Omatch) < 1e-10
+    sld, match = contrast_series(sld=[s.sld], Dsld=[s.Dsld], exchange=0.5)
+    assert sld.shape == (1, 1, 101)
+    assert abs(sld[0, 0, 0] - s.sld) < 1e-12
+
 if __name__ == "__main__":
     fasta_table()
@@ -8,12 +8,14 @@ from __future__ import division, print_function
 from copy import copy
 from math import pi, sqrt
 
+import numpy
+
 # Requires that the pyparsing module is installed.
 
 from pyparsing import (Literal, Optional, White, Regex,
                        ZeroOrMore, OneOrMore, Forward, StringEnd, Group)
 
-from .core import default_table, isatom, isisotope, change_table
+from .core import default_table, isatom, isisotope, change_table, Isotope
 from .constants import avogadro_number
 from .util import require_keywords, cell_volume
 
@@ -195,6 +197,470 @@ def _mix_by_volume_pairs(pairs):
 
     return result
 
+class Mixer(object):
+    """
+    Mixtures of a fixed set of components evaluated for many fractions.
+
+    :Parameters:
+        *components* : [Formula OR string]
+            Materials to mix.
+
+        *by* = 'weight' : string
+            Quantities are relative weights ('weight') or relative
+            volumes ('volume').
+
+        *table* : PeriodicTable
+            Private table to use when parsing string formulas.
+
+    :Raises:
+        *ValueError* : component density is missing when mixing by volume
+
+    The methods take an array of *fractions* with one column per
+    component and one row per mixture, and return one value per row.
+    The results match :func:`mix_by_weight` or :func:`mix_by_volume` for
+    each row, with NaN in place of None for unknown densities, but the
+    component sums are computed once rather than building a formula for
+    every mixture.  This is useful for composition fits and phase maps
+    with many mixtures of the same materials.  For example::
+
+        >>> from periodictable.formulas import Mixer
+        >>> mixer = Mixer(['H2O@1', 'D2O@1n'], by='volume')
+        >>> rho, mu, inc = mixer.neutron_sld([[1, 0], [0.5, 0.5], [0, 1]])
+        >>> print(", ".join("%.3f"%v for v in rho))
+        -0.561, 2.921, 6.402
+    """
+    def __init__(self, components, by='weight', table=None):
+        if by not in ('weight', 'volume'):
+            raise ValueError("Mixer needs by='weight' or by='volume'")
+        table = default_table(table)
+        self.components = [formula(c, table=table) for c in components]
+        self.by = by
+        atoms = {}
+        for f in self.components:
+            for atom in f.atoms:
+                atoms.setdefault(atom, len(atoms))
+        #: Atoms in the order of the columns returned by :meth:`counts`.
+        self.atoms = list(atoms)
+        self._counts = numpy.zeros((len(self.components), len(atoms)))
+        for k, f in enumerate(self.components):
+            for atom, count in f.atoms.items():
+                self._counts[k, atoms[atom]] = count
+        self._mass = numpy.array([f.mass for f in self.components])
+        self._density = numpy.array([
+            f.density if f.density else numpy.nan for f in self.components])
+        if by == 'volume' and numpy.isnan(self._density).any():
+            k = numpy.isnan(self._density).argmax()
+            raise ValueError("Need the mass density of "
+                             + str(self.components[k]))
+        self._neutron = None
+
+    def quantity(self, fractions):
+        """
+        Formula units of each component in the mixture.
+
+        Units are scaled so that the component with the smallest non-zero
+        fraction has one formula unit, as in :func:`mix_by_weight`.
+        """
+        fractions = numpy.asarray(fractions, 'd')
+        if self.by == 'weight':
+            n = fractions/self._mass
+        else:
+            n = fractions*self._density/self._mass
+        n[fractions <= 0] = 0.
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            scale = numpy.where(n > 0, n, numpy.inf).min(axis=-1)
+            return numpy.nan_to_num(n/scale[..., None], copy=False)
+
+    def counts(self, fractions):
+        """
+        Number of each atom in :attr:`atoms` in the mixture.
+        """
+        return numpy.dot(self.quantity(fractions), self._counts)
+
+    def mass(self, fractions):
+        """
+        Molar mass of the mixture as returned by :func:`mix_by_weight`.
+        """
+        return numpy.dot(self.quantity(fractions), self._mass)
+
+    def density(self, fractions):
+        """
+        Mass density of the mixture, or NaN if it is not known.
+        """
+        fractions = numpy.asarray(fractions, 'd')
+        fractions = numpy.where(fractions > 0, fractions, 0.)
+        total = numpy.sum(fractions, axis=-1)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            if self.by == 'weight':
+                volume = _masked_dot(fractions, 1/self._density)
+                return total/volume
+            mass = numpy.dot(fractions, self._density)
+            return mass/total
+
+    def neutron_sld(self, fractions, wavelength=None, energy=None):
+        """
+        Neutron scattering length density of the mixture.
+
+        :Parameters:
+            *fractions* : array
+                Quantity of each component in each mixture.
+            *wavelength* : float | |Ang|
+                Neutron wavelength, defaulting to 1.798 |Ang|.
+            *energy* : float | meV
+                Neutron energy, used if wavelength is not given.
+
+        :Returns:
+            *sld* : (array, array, array) | |1e-6/Ang^2|
+                (*real*, -*imaginary*, *incoherent*) scattering length
+                density.
+
+        See :func:`periodictable.nsf.neutron_scattering` for details.
+        """
+        from .nsf import neutron_wavelength, ABSORPTION_WAVELENGTH
+        if energy is not None:
+            wavelength = neutron_wavelength(energy)
+        if wavelength is None:
+            wavelength = ABSORPTION_WAVELENGTH
+        if self._neutron is None:
+            self._neutron = _neutron_sums(self.components)
+        n = self.quantity(fractions)
+        num_atoms, b_c, sigma_s, sigma_a = [
+            _masked_dot(n, v) for v in self._neutron]
+        number_density = self._number_density(n, fractions, num_atoms)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            b_c /= num_atoms
+            sigma_s /= num_atoms
+            sigma_a *= wavelength/ABSORPTION_WAVELENGTH/num_atoms
+        sigma_c = 4*pi/100 * b_c**2
+        sigma_i = numpy.maximum(sigma_s - sigma_c, 0.0)
+        sld_re = number_density * b_c * 10
+        sld_im = number_density * sigma_a / (2 * wavelength) * 0.01
+        sld_inc = number_density * numpy.sqrt(sigma_i / (4*pi/100)) * 10
+        return (_vacuum(sld_re, num_atoms), _vacuum(sld_im, num_atoms),
+                _vacuum(sld_inc, num_atoms))
+
+    def xray_sld(self, fractions, energy=None, wavelength=None):
+        """
+        X-ray scattering length density of the mixture.
+
+        :Parameters:
+            *fractions* : array
+                Quantity of each component in each mixture.
+            *energy* : float or vector | keV
+                X-ray energy, if *wavelength* is not given.
+            *wavelength* : float or vector | |Ang|
+                X-ray wavelength.
+
+        :Returns:
+            *sld* : (array, array) | |1e-6/Ang^2|
+                (*real*, *imaginary*) scattering length density, with an
+                extra trailing dimension if *energy* is a vector.
+
+        See :func:`periodictable.xsf.xray_sld` for details.
+        """
+        from .xsf import xray_energy
+        from .constants import electron_radius
+        if wavelength is not None:
+            energy = xray_energy(wavelength)
+        if energy is None:
+            raise TypeError("X-ray SLD needs energy or wavelength")
+        energy = numpy.asarray(energy, 'd')
+        f1 = numpy.zeros((len(self.atoms),) + energy.shape)
+        f2 = numpy.zeros_like(f1)
+        for k, atom in enumerate(self.atoms):
+            f1[k], f2[k] = atom.xray.scattering_factors(energy=energy)
+        n = self.quantity(fractions)
+        counts = numpy.dot(n, self._counts)
+        sum_f1, sum_f2 = _masked_dot(counts, f1), _masked_dot(counts, f2)
+        mass = numpy.dot(n, self._mass)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            N = self.density(fractions)/mass*avogadro_number*1e-8
+        N = N.reshape(N.shape + (1,)*energy.ndim)
+        mass = mass.reshape(N.shape)
+        rho = N*sum_f1*electron_radius
+        irho = N*sum_f2*electron_radius
+        return _vacuum(rho, mass), _vacuum(irho, mass)
+
+    def _number_density(self, n, fractions, num_atoms):
+        """
+        Atoms per cubic Angstrom for the mixture.
+        """
+        mass = numpy.dot(n, self._mass)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            cell_volume = (mass/self.density(fractions))/avogadro_number*1e24
+            return num_atoms/cell_volume
+
+def _neutron_sums(components):
+    """
+    Return number of atoms, b_c, sigma_s and sigma_a for each component,
+    with NaN for components containing atoms without neutron data.
+    """
+    sums = numpy.zeros((4, len(components)))
+    for k, f in enumerate(components):
+        for atom, count in f.atoms.items():
+            if not atom.neutron.has_sld():
+                sums[1:, k] = numpy.nan
+                break
+            sums[:, k] += (count, count*atom.neutron.b_c,
+                           count*atom.neutron.total,
+                           count*atom.neutron.absorption)
+    return sums
+
+def _masked_dot(n, values):
+    """
+    Return n.values, ignoring NaN in *values* where *n* is zero.
+    """
+    missing = numpy.isnan(values)
+    result = numpy.dot(n, numpy.where(missing, 0., values))
+    if missing.any():
+        result = numpy.where(numpy.dot(n > 0, missing), numpy.nan, result)
+    return result
+
+def _vacuum(value, total):
+    """
+    Return zero in place of *value* where *total* is zero, as for vacuum.
+    """
+    return numpy.where(total == 0, 0., value)
+
+def prepare(compound, density=None, natural_density=None, table=None):
+    """
+    Precompute the composition sums for repeated scattering calculations.
+
+    :Parameters:
+        *compound* : Formula initializer
+            Chemical formula.
+        *density* : float | |g/cm^3|
+            Default mass density, or None to use the formula density.
+        *natural_density* : float | |g/cm^3|
+            Default mass density with naturally occurring abundances.
+        *table* : PeriodicTable
+            Private table to use when parsing string formulas.
+
+    :Returns:
+        *prepared* : :class:`PreparedCompound`
+
+    Table lookups and sums over the atoms are done once, so that
+    :meth:`PreparedCompound.neutron_sld` and
+    :meth:`PreparedCompound.xray_sld` are a few array operations.  This
+    is useful when fitting models where only the density, wavelength or
+    energy changes between evaluations.  For example::
+
+        >>> from periodictable.formulas import prepare
+        >>> quartz = prepare("SiO2@2.65")
+        >>> rho, irho, incoh = quartz.neutron_sld(wavelength=[1.798, 5.])
+        >>> print(", ".join("%.4f"%v for v in rho))
+        4.1861, 4.1861
+        >>> print("%.4f"%quartz.neutron_sld(density=2.2)[0])
+        3.4753
+    """
+    return PreparedCompound(formula(compound, density=density,
+                                    natural_density=natural_density,
+                                    table=table))
+
+class PreparedCompound(object):
+    """
+    Compound with precomputed composition sums for scattering calculations.
+
+    Use :func:`prepare` to create one.  The compound should not be changed
+    after it is prepared.
+
+    *formula* is the compound, and *density* is the default density.
+
+    *mass* is the molar mass, and *num_atoms*, *b_c*, *sigma_s* and
+    *sigma_a* are the sums over the atoms of the count, the coherent
+    scattering length, the total scattering cross section and the
+    absorption cross section at 1.798 |Ang|, or NaN if there is no
+    neutron data for one of the atoms.
+    """
+    def __init__(self, compound):
+        self.formula = compound
+        self.density = compound.density
+        self.atoms = list(compound.atoms.items())
+        self.mass = sum(atom.mass*count for atom, count in self.atoms)
+        self.num_atoms = sum(count for _, count in self.atoms)
+        if all(atom.neutron.has_sld() for atom, _ in self.atoms):
+            self.b_c = sum(count*atom.neutron.b_c
+                           for atom, count in self.atoms)
+            self.sigma_s = sum(count*atom.neutron.total
+                               for atom, count in self.atoms)
+            self.sigma_a = sum(count*atom.neutron.absorption
+                               for atom, count in self.atoms)
+        else:
+            self.b_c = self.sigma_s = self.sigma_a = numpy.nan
+        self._xray = None
+
+    def _density(self, density):
+        if density is None:
+            density = self.density
+        assert density is not None, "scattering calculation needs density"
+        return numpy.asarray(density, 'd')
+
+    def neutron_sld(self, wavelength=None, energy=None, density=None):
+        """
+        Neutron scattering length density.
+
+        :Parameters:
+            *wavelength* : float or vector | |Ang|
+                Neutron wavelength, defaulting to 1.798 |Ang|.
+            *energy* : float or vector | meV
+                Neutron energy, used if wavelength is not given.
+            *density* : float or vector | |g/cm^3|
+                Mass density, or None for the density of the compound.
+
+        :Returns:
+            *sld* : (float, float, float) | |1e-6/Ang^2|
+                (*real*, -*imaginary*, *incoherent*) scattering length
+                density, as from :func:`periodictable.nsf.neutron_sld`,
+                or (None, None, None) if there is no neutron data for
+                one of the atoms.  Vector inputs are broadcast together.
+        """
+        from .nsf import neutron_wavelength, ABSORPTION_WAVELENGTH
+        if energy is not None and wavelength is None:
+            wavelength = neutron_wavelength(energy)
+        if wavelength is None:
+            wavelength = ABSORPTION_WAVELENGTH
+        wavelength = numpy.asarray(wavelength, 'd')
+        density = self._density(density)
+        if numpy.isnan(self.b_c):
+            return None, None, None
+        if self.mass == 0:
+            zero = numpy.zeros(numpy.broadcast(wavelength, density).shape)
+            return _scalar(zero), _scalar(zero), _scalar(zero)
+
+        # See nsf.neutron_scattering for details.
+        b_c = self.b_c/self.num_atoms
+        sigma_s = self.sigma_s/self.num_atoms
+        sigma_a = self.sigma_a*wavelength/ABSORPTION_WAVELENGTH/self.num_atoms
+        number_density = density/self.mass*avogadro_number*1e-24
+        number_density = number_density*self.num_atoms
+        sigma_c = 4*pi/100 * b_c**2
+        sigma_i = max(sigma_s - sigma_c, 0.0)
+        sld_re = number_density * b_c * 10
+        sld_im = number_density * sigma_a / (2 * wavelength) * 0.01
+        sld_inc = number_density * sqrt(sigma_i / (4*pi/100)) * 10
+        shape = numpy.broadcast(wavelength, density).shape
+        return (_scalar(numpy.broadcast_to(sld_re, shape)),
+                _scalar(sld_im),
+                _scalar(numpy.broadcast_to(sld_inc, shape)))
+
+    def neutron_attenuation(self, wavelength=None, energy=None, density=None,
+                            absorbers=None):
+        r"""
+        Neutron attenuation coefficient.
+
+        :Parameters:
+            *wavelength* : float or vector | |Ang|
+                Neutron wavelength, defaulting to 1.798 |Ang|.
+            *energy* : float or vector | meV
+                Neutron energy, used if wavelength is not given.
+            *density* : float | |g/cm^3|
+                Mass density, or None for the density of the compound.
+            *absorbers* : {atom: f(wavelength) -> float or vector}
+                Energy dependent absorption cross sections, as for
+                :func:`periodictable.nsf.transmission`.
+
+        :Returns:
+            *mu* : float or vector | 1/cm
+                Attenuation coefficient $N (\sigma_s + \sigma_a)$, as for
+                the penetration depth in
+                :func:`periodictable.nsf.neutron_scattering`, or NaN if
+                there is no neutron data for one of the atoms.
+        """
+        from .nsf import neutron_wavelength, ABSORPTION_WAVELENGTH
+        if energy is not None and wavelength is None:
+            wavelength = neutron_wavelength(energy)
+        if wavelength is None:
+            wavelength = ABSORPTION_WAVELENGTH
+        wavelength = numpy.asarray(wavelength, 'd')
+        density = self._density(density)
+        if self.mass == 0:
+            return _scalar(numpy.zeros_like(wavelength))
+        sigma_a = self.sigma_a
+        sigma_v = 0.
+        for atom, count in self.atoms:
+            if absorbers and atom in absorbers:
+                sigma_a = sigma_a - count*atom.neutron.absorption
+                sigma_v = sigma_v + count*numpy.asarray(absorbers[atom](wavelength))
+        number_density = density/self.mass*avogadro_number*1e-24
+        sigma_t = (self.sigma_s + sigma_a*wavelength/ABSORPTION_WAVELENGTH
+                   + sigma_v)
+        return _scalar(number_density*sigma_t)
+
+    def xray_sld(self, energy=None, wavelength=None, density=None):
+        """
+        X-ray scattering length density.
+
+        :Parameters:
+            *energy* : float or vector | keV
+                X-ray energy, if *wavelength* is not given.
+            *wavelength* : float or vector | |Ang|
+                X-ray wavelength.
+            *density* : float or vector | |g/cm^3|
+                Mass density, or None for the density of the compound.
+
+        :Returns:
+            *sld* : (float, float) | |1e-6/Ang^2|
+                (*real*, *imaginary*) scattering length density, as from
+                :func:`periodictable.xsf.xray_sld`, or (None, None) if
+                there is no X-ray data for one of the atoms.
+
+        The sums of the scattering factors over the atoms are tabulated
+        once on the combined energy grid of the element tables, so each
+        call is a single interpolation.
+        """
+        from .xsf import xray_energy
+        from .constants import electron_radius
+        if wavelength is not None:
+            energy = xray_energy(wavelength)
+        assert energy is not None, \
+            "scattering calculation needs energy or wavelength"
+        density = self._density(density)
+        if self._xray is None:
+            self._xray = _xray_sums(self.atoms)
+        grid, sum_f1, sum_f2 = self._xray
+        if grid is None:
+            return None, None
+        if self.mass == 0:
+            zero = numpy.zeros(numpy.broadcast(energy, density).shape)
+            return _scalar(zero), _scalar(zero)
+        f1 = numpy.interp(energy, grid, sum_f1, left=numpy.nan,
+                          right=numpy.nan)
+        f2 = numpy.interp(energy, grid, sum_f2, left=numpy.nan,
+                          right=numpy.nan)
+        N = density/self.mass*avogadro_number*1e-8
+        return _scalar(N*f1*electron_radius), _scalar(N*f2*electron_radius)
+
+def _xray_sums(atoms):
+    """
+    Return the energy grid and the tabulated sums of f1 and f2 for the
+    atoms, or (None, None, None) if the table is missing for an atom.
+
+    The grid contains the energies of every element table within the range
+    common to all of them.  Since each table is linearly interpolated, the
+    interpolated sum on this grid is the same as the sum of the
+    interpolated values at any energy.
+    """
+    tables = [atom.xray.sftable for atom, _ in atoms]
+    if any(t is None for t in tables):
+        return None, None, None
+    if not tables:
+        return numpy.array([0., numpy.inf]), numpy.zeros(2), numpy.zeros(2)
+    low = max(t[0][0] for t in tables)
+    high = min(t[0][-1] for t in tables)
+    grid = numpy.unique(numpy.hstack([t[0] for t in tables]))
+    grid = grid[(grid >= low) & (grid <= high)]
+    sum_f1, sum_f2 = numpy.zeros_like(grid), numpy.zeros_like(grid)
+    for (atom, count), table in zip(atoms, tables):
+        sum_f1 += count*numpy.interp(grid, table[0], table[1])
+        sum_f2 += count*numpy.interp(grid, table[0], table[2])
+    return grid, sum_f1, sum_f2
+
+def _scalar(value):
+    """
+    Return 0-d arrays as python floats.
+    """
+    return float(value) if numpy.ndim(value) == 0 else value
+
 def formula(compound=None, density=None, natural_density=None,
             name=None, table=None):
     r"""
@@ -901,6 +1367,12 @@ def _convert_to_hill_notation(atoms):
     return [(atoms[el], el) for el in sorted(atoms.keys(), key=_hill_key)]
 
 
+def _special_isotope(atom):
+    """
+    Return True for isotopes with their own symbol, such as D and T.
+    """
+    return isinstance(atom, Isotope) and atom._symbol is not None
+
 def _str_atoms(seq):
     """
     Convert formula structure to string.
@@ -910,7 +1382,7 @@ def _str_atoms(seq):
     for count, fragment in seq:
         if isatom(fragment):
             # Normal isotope string form is #-Yy, but we want Yy[#]
-            if isisotope(fragment) and 'symbol' not in fragment.__dict__:
+            if isisotope(fragment) and not _special_isotope(fragment):
                 ret += "%s[%d]"%(fragment.symbol, fragment.isotope)
             else:
                 ret += fragment.symbol
@@ -6,12 +6,19 @@ Adds magnetic_ff[charge].t for t in j0, j2, j4, j6, and J.
 J should be the dipole approximation <j0> + (1 - 2/g) <j2>, according to the
 documentation for CrysFML [#Brown]_ , but that does not seem to be the case in practice.
 
+:func:`formfactor_table` evaluates several form factors for a list of ions
+on a shared *Q* grid, including the dipole approximation
+<j0> + (2/g - 1) <j2> [#Brown]_ for ions with Landé factor *g*.
+
 
 .. [#Brown] Brown. P. J. (Section 4.4.5) International Tables for Crystallography
         Volume C, Wilson. A. J. C.(ed).
 """
 from __future__ import division
 
+import re
+from math import isnan
+
 import numpy
 from numpy import pi, exp
 
@@ -55,6 +62,10 @@ class MagneticFormFactor(object):
         ff = A exp(-a s^2) + B exp(-b s^2) + C exp(-c s^2) + D
 
     The remaining form factors *j2*, *j4* and *j6* are scalled by an additional s^2.
+    The coefficients are also stored as rows of the array *coefficients*,
+    with NaN for missing form factors, in the order given by
+    :data:`FORM_FACTOR_KINDS`.  These are used by :func:`formfactor_table`.
+
     The form factor calculation is performed by the <ff>_Q method for <ff>
     in *M*, *J*, *j0*, *j2*, *j4*, *j6*.  For example, here is the calculation for
     the *M* form factor for Fe^2+ computed at 0, 0.1 and 0.2:
@@ -97,6 +108,101 @@ class MagneticFormFactor(object):
 
     M_Q = j0_Q
 
+#: Form factor kinds stored in :attr:`MagneticFormFactor.coefficients`.
+FORM_FACTOR_KINDS = ('j0', 'j2', 'j4', 'j6', 'J')
+
+def formfactor_table(ions, kinds=('j0', 'j2', 'j4'), Q=None, g=None):
+    """
+    Returns form factors for many ions and form factor kinds on one *Q* grid.
+
+    :Parameters:
+        *ions* : [ion]
+            Ions, elements (charge 0) or :class:`MagneticFormFactor` objects.
+        *kinds* : [string]
+            Form factors to compute from *j0*, *j2*, *j4*, *j6*, *J*, *M*
+            and *dipole*.
+        *Q* : vector | |1/Ang|
+            Scattering vectors.
+        *g* : float or [float]
+            Landé factor for each ion, used for *dipole*, which is
+            <j0> + (2/g - 1) <j2>.
+
+    :Returns:
+        *ff* : array(len(ions), len(kinds), len(Q))
+            Form factors, or NaN if the form factor is not available for
+            the ion.
+
+    Raises ValueError if *dipole* is requested without *g*.
+
+    The coefficients come from :attr:`MagneticFormFactor.coefficients`.
+    *s* = *Q*/(4 |pi|) is computed only once, and the form factors are
+    evaluated in place without allocating temporaries for each term.
+
+    .. doctest::
+
+        >>> import periodictable
+        >>> from periodictable.magnetic_ff import formfactor_table
+        >>> ff = formfactor_table([periodictable.Fe.ion[2]], ['M', 'dipole'],
+        ...                       Q=[0, 0.1, 0.2], g=2)
+        >>> print("[%.5f, %.5f, %.5f]" % tuple(ff[0, 0]))
+        [1.00000, 0.99935, 0.99741]
+        >>> print("[%.5f, %.5f, %.5f]" % tuple(ff[0, 1]))
+        [1.00000, 0.99935, 0.99741]
+    """
+    Q = numpy.asarray(Q, 'd')
+    unknown = set(kinds).difference(FORM_FACTOR_KINDS + ('M', 'dipole'))
+    if unknown:
+        raise ValueError("unknown form factor %r"%sorted(unknown)[0])
+    if 'dipole' in kinds:
+        if g is None:
+            raise ValueError("dipole form factor requires Lande factor g")
+        C2 = 2/numpy.broadcast_to(numpy.asarray(g, 'd'), (len(ions),)) - 1
+
+    # Evaluate in place over the shared s_sq, one ion and kind at a time,
+    # so that the temporaries are the size of Q rather than the result.
+    s_sq = (Q/(4*pi))**2
+    result = numpy.empty((len(ions), len(kinds)) + Q.shape)
+    scratch = numpy.empty_like(s_sq)
+    j2 = numpy.empty_like(s_sq) if 'dipole' in kinds else None
+    for i, ion in enumerate(ions):
+        coefficients = _coefficients(ion)
+        for k, kind in enumerate(kinds):
+            if kind == 'dipole':
+                _evaluate(coefficients[0], s_sq, result[i, k], scratch)
+                _evaluate(coefficients[1], s_sq, j2, scratch, scaled=True)
+                j2 *= C2[i]
+                result[i, k] += j2
+            else:
+                column = FORM_FACTOR_KINDS.index('j0' if kind == 'M' else kind)
+                _evaluate(coefficients[column], s_sq, result[i, k], scratch,
+                          scaled=FORM_FACTOR_KINDS[column] not in ('j0', 'J'))
+    return result
+
+def _evaluate(coefficients, s_sq, out, scratch, scaled=False):
+    """
+    Evaluates the form factor with *coefficients* into *out*, multiplying
+    by *s_sq* if *scaled*.  This is :func:`formfactor_0` or
+    :func:`formfactor_n` without allocating temporaries.
+    """
+    A, a, B, b, C, c, D = coefficients
+    out[...] = D
+    for scale, rate in ((A, a), (B, b), (C, c)):
+        numpy.multiply(s_sq, -rate, out=scratch)
+        numpy.exp(scratch, out=scratch)
+        scratch *= scale
+        out += scratch
+    if scaled:
+        out *= s_sq
+
+_MISSING = numpy.full((len(FORM_FACTOR_KINDS), 7), numpy.nan)
+def _coefficients(ion):
+    """
+    Returns the coefficient array for an ion, element or form factor.
+    """
+    if not isinstance(ion, MagneticFormFactor):
+        table = getattr(ion, 'magnetic_ff', {})
+        ion = table.get(getattr(ion, 'charge', 0), None)
+    return getattr(ion, 'coefficients', _MISSING)
 
 def init(table, reload=False):
     """Add magnetic form factor properties to the periodic table"""
@@ -104,60 +210,76 @@ def init(table, reload=False):
         return
     table.properties.append('magnetic_ff')
 
-    # Function for interpreting ionization state and form factor tuple
-    def Magnetic_Form_Type(state, values):
-        return state, values
-
-    # Remove fortran continuation character, which is & at the end of the line
-    data = CFML_DATA.replace('&\n', '')
-
-    # Parse each line
-    for line in data.split('\n'):
-        # Skip blank lines and comment lines
-        line = line.strip()
-        if '=' not in line:
-            continue
-
-        # Remaining lines contain one of:
-        #   Magnetic_Form(n) = Magnetic_Form_Type("M<EL><ION>", (/FF/))
-        #   Magnetic_Form(n) = Magnetic_Form_Type("J<EL><ION>", (/FF/))
-        #   Magnetic_j2(n) = Magnetic_Form_Type("<EL><ION>", (/FF/))
-        #   Magnetic_j4(n) = Magnetic_Form_Type("<EL><ION>", (/FF/))
-        #   Magnetic_j6(n) = Magnetic_Form_Type("<EL><ION>", (/FF/))
+    # Share the coefficient table between tables; the rows are read-only.
+    ions, coefficients = _cfml_table()
+    for (symbol, charge), row in zip(ions, coefficients):
+        el = table.symbol(symbol)
+        if not hasattr(el, 'magnetic_ff'):
+            el.magnetic_ff = {}
+        ff = el.magnetic_ff[charge] = MagneticFormFactor()
+        for jn, values in zip(FORM_FACTOR_KINDS, row.tolist()):
+            if not isnan(values[0]):
+                setattr(ff, jn, tuple(values))
+        ff.coefficients = row
+
+_CFML_TABLE = None
+def _cfml_table():
+    """
+    Returns the ions and coefficients in *CFML_DATA*, parsing it on first use.
+
+    *ions* is a list of (symbol, charge) and *coefficients* is a read-only
+    array(len(ions), len(FORM_FACTOR_KINDS), 7) with NaN for missing
+    form factors.
+    """
+    global _CFML_TABLE
+    if _CFML_TABLE is None:
+        _CFML_TABLE = _parse_cfml(CFML_DATA)
+    return _CFML_TABLE
+
+# Each entry in CFML_DATA is one of:
+#   Magnetic_Form(n) = Magnetic_Form_Type("M<EL><ION>", (/FF/))
+#   Magnetic_Form(n) = Magnetic_Form_Type("J<EL><ION>", (/FF/))
+#   Magnetic_j2(n) = Magnetic_Form_Type("<EL><ION>", (/FF/))
+#   Magnetic_j4(n) = Magnetic_Form_Type("<EL><ION>", (/FF/))
+#   Magnetic_j6(n) = Magnetic_Form_Type("<EL><ION>", (/FF/))
+# possibly split across lines with the fortran continuation character '&'.
+# Lines starting with '!' are comments.
+_CFML_PATTERN = re.compile(r"""
+    Magnetic_(?P<table>Form|j2|j4|j6) \s*\(\s*\d+\s*\) \s*=\s*
+    Magnetic_Form_Type \s*\(\s* "(?P<state>[^"]*)" \s*,\s*&?\s*
+    \(/ (?P<values>[^/]*) /\) \s*\)
+    """, re.VERBOSE)
+def _parse_cfml(data):
+    """
+    Parses the CrysFML magnetic form factor tables without evaluating them.
+    """
+    matches = _CFML_PATTERN.findall(data)
+    ions, index, kinds = [], {}, []
+    for table, state, _ in matches:
         # The 'M' form is just j0.  The 'J' form should be j0 + (1-g/2)j2.
-        # Split the two parts, remove the slash and figure out if we have
-        # j0, j2, j4, j6 or J.
-        a, b = line.split('=')
-        b = b.replace('/', '')
-        # The following eval is used for parsing the CFM_DATA table defined
-        # below, so there is no risk that it can be invoked from a web
-        # service with a user-defined malicious string.
-        state, values = eval(b)  # eval checked for malicious usage
-        if a.startswith('Magnetic_Form'):
+        if table == 'Form':
             jn = "j0" if state[0] == 'M' else "J"
             state = state[1:]
-        elif a.startswith('Magnetic_j2'):
-            jn = "j2"
-        elif a.startswith('Magnetic_j4'):
-            jn = "j4"
-        elif a.startswith('Magnetic_j6'):
-            jn = "j6"
-
+        else:
+            jn = table
         # Parse <EL><ION> into element symbol and ion state
+        state = state.strip()
         if state[1].isdigit():
-            symbol = state[0]
-            charge = int(state[1])
+            key = state[0], int(state[1])
         else:
-            symbol = state[0:2].capitalize()
-            charge = int(state[2])
-
-        # Add the magnetic form factor info to the element
-        el = table.symbol(symbol)
-        if not hasattr(el, 'magnetic_ff'):
-            el.magnetic_ff = {}
-        if charge not in el.magnetic_ff:
-            el.magnetic_ff[charge] = MagneticFormFactor()
-        setattr(el.magnetic_ff[charge], jn, values)
+            key = state[0:2].capitalize(), int(state[2])
+        if key not in index:
+            index[key] = len(ions)
+            ions.append(key)
+        kinds.append((index[key], FORM_FACTOR_KINDS.index(jn)))
+
+    # Convert all the coefficients in one call.
+    values = numpy.array(",".join(v for _, _, v in matches).split(","), 'd')
+    coefficients = numpy.full((len(ions), len(FORM_FACTOR_KINDS), 7), numpy.nan)
+    for (row, column), v in zip(kinds, values.reshape(-1, 7)):
+        coefficients[row, column] = v
+    coefficients.flags.writeable = False
+    return ions, coefficients
 
 CFML_DATA = """
        Magnetic_Form(  1) = Magnetic_Form_Type("MSC0", &
@@ -54,12 +54,26 @@ There are a number of functions available in periodictable.nsf
         Returns a scattering length density for a compound whose composition
         is variable.
 
+    :func:`transmission`
+        Computes transmission through a stack of materials.
+
+    :func:`neutron_reflectivity`
+        Computes reflectivity from a stack of layers.
+
+    :class:`Enrichment`
+        Computes scattering for an element with many sets of isotope
+        abundances.
+
     :func:`energy_dependent_table`
         Lists isotopes with energy dependence.
 
     :func:`sld_table`
         Lists scattering length densitys for all elements in natural abundance.
 
+    :func:`sld_array`
+        Returns scattering length densities for all elements and isotopes
+        as a structured array.
+
     :func:`absorption_comparison_table`
         Compares the imaginary bound coherent scattering length to the
         absorption cross section.
@@ -152,8 +166,9 @@ __all__ = ['init', 'Neutron',
            'sld_plot',
            'absorption_comparison_table', 'coherent_comparison_table',
            'incoherent_comparison_table', 'total_comparison_table',
-           'energy_dependent_table', 'sld_table',
-           'neutron_sld_from_atoms',
+           'energy_dependent_table', 'sld_table', 'sld_array',
+           'neutron_sld_from_atoms', 'transmission', 'Enrichment',
+           'neutron_reflectivity',
            #'scattering_potential',
           ]
 
@@ -993,6 +1008,318 @@ def neutron_composite_sld(materials, wavelength=ABSORPTION_WAVELENGTH):
     return _compute
 
 
+@require_keywords
+def transmission(stack, wavelength=None, energy=None, absorbers=None,
+                 table=None):
+    r"""
+    Neutron transmission through a stack of slabs.
+
+    :Parameters:
+        *stack* : [(Formula, float or vector)]
+            Sequence of (*material*, *thickness*) pairs, with *thickness* in
+            cm.  Materials are formulas or formula strings with density.
+            Thickness can be a vector, for example with one entry for each
+            run, so long as the thickness vectors in the stack have
+            compatible shapes.
+        *wavelength* = 1.798 : float or vector | |Ang|
+            Neutron wavelength.
+        *energy* : float or vector | meV
+            Neutron energy, if *wavelength* is not given.
+        *absorbers* : {atom: f(wavelength) -> float or vector}
+            Absorption cross section (barn) as a function of wavelength
+            (|Ang|) for atoms whose absorption is energy dependent.  This
+            replaces the $1/v$ scaling of the tabulated absorption for
+            those atoms.
+        *table* : PeriodicTable
+            Private table to use when parsing string formulas.
+
+    :Returns:
+        *transmission* : float or array
+            Fraction of the beam transmitted, with the shape of the
+            thickness followed by the shape of the wavelength.
+
+    The attenuation coefficient $\mu = N (\sigma_s + \sigma_a)$ of each
+    material is computed as for the penetration depth in
+    :func:`neutron_scattering`, with the absorption cross section scaled by
+    $\lambda/\lambda_0$ for $\lambda_0 = 1.798$ |Ang|.  The transmission is
+    $T = e^{-\sum \mu_i t_i}$ for thickness $t_i$.  Transmission accounts
+    for all scattering, including coherent scattering which may not remove
+    neutrons from the beam.  For example, a 1 mm sample of water in a
+    quartz cell with two 1.25 mm windows::
+
+        >>> stack = [('H2O@1', 0.1), ('SiO2@2.2', 0.25)]
+        >>> T = transmission(stack, wavelength=[1, 5, 10])
+        >>> print(", ".join("%.3f"%v for v in T))
+        0.536, 0.533, 0.528
+
+    Scattering sums are computed once per material, so a grid of runs and
+    wavelengths is a few array operations.  For example, transmission for
+    100 sample thicknesses at 1000 wavelengths::
+
+        >>> import numpy as np
+        >>> thickness = np.linspace(0.01, 0.2, 100)
+        >>> wavelength = np.linspace(1, 20, 1000)
+        >>> stack = [('H2O@1', thickness), ('SiO2@2.2', 0.25)]
+        >>> transmission(stack, wavelength=wavelength).shape
+        (100, 1000)
+    """
+    from . import formulas
+    if energy is not None and wavelength is None:
+        wavelength = neutron_wavelength(energy)
+    if wavelength is None:
+        wavelength = ABSORPTION_WAVELENGTH
+    wavelength = asarray(wavelength, 'd')
+    absorbers = absorbers if absorbers is not None else {}
+
+    total = 0.
+    for material, thickness in stack:
+        prepared = formulas.prepare(material, table=table)
+        mu = prepared.neutron_attenuation(wavelength=wavelength,
+                                          absorbers=absorbers)
+        total = total + numpy.multiply.outer(thickness, mu)
+    return numpy.exp(-total)
+
+@require_keywords
+def neutron_reflectivity(layers, Q=None, wavelength=None, angle=None,
+                         chunksize=100000, table=None):
+    r"""
+    Neutron reflectivity from a stack of layers.
+
+    :Parameters:
+        *layers* : [(material, thickness, roughness)]
+            Layers from the incident medium to the substrate.  Each
+            *material* is a formula with density, or the scattering length
+            density $\rho + i\rho_i$ in |1e-6/Ang^2| as a complex number,
+            with $\rho_i \ge 0$ for absorption as returned by
+            :func:`neutron_sld`.  *thickness* (|Ang|) is ignored for the incident medium and the
+            substrate, and *roughness* (|Ang|) is for the interface below
+            the layer, so it is ignored for the substrate and may be left
+            off.  Numeric values may be arrays, one entry for each model,
+            so long as they all have compatible shapes.
+        *Q* : float or vector | |1/Ang|
+            Momentum transfer $4 \pi \sin(\theta)/\lambda$.
+        *wavelength* : float or vector | |Ang|
+            Neutron wavelength, if *Q* is not given.
+        *angle* : float or vector | degrees
+            Incident angle, if *Q* is not given.  Broadcast against
+            *wavelength*.
+        *chunksize* = 100000 : int
+            Maximum number of (model, Q) points computed at once, which
+            limits the memory used for large batches of models.
+        *table* : PeriodicTable
+            Private table to use when parsing string formulas.
+
+    :Returns:
+        *R* : float or array
+            Reflectivity, with the shape of the model parameters followed by
+            the shape of *Q*.
+
+    Reflectivity is computed with the Parratt recursion, with the
+    Névot-Croce factor $e^{-2 k_j k_{j+1} \sigma_j^2}$ for interfacial
+    roughness $\sigma_j$.  The scattering length density of a material
+    is from :func:`neutron_sld`; this is independent of wavelength since
+    absorption is scaled by $1/v$.  For example, a 100 |Ang| nickel film
+    on silicon, and the same film for a batch of five thicknesses::
+
+        >>> import numpy as np
+        >>> Q = np.array([0.005, 0.02, 0.05])
+        >>> layers = [(0, 0, 3), ('Ni', 100, 5), ('Si', 0)]
+        >>> print(", ".join("%.3g"%v for v in neutron_reflectivity(layers, Q=Q)))
+        1, 0.255, 0.00521
+        >>> layers = [(0, 0, 3), ('Ni', np.linspace(80, 120, 5), 5), ('Si', 0)]
+        >>> neutron_reflectivity(layers, Q=Q).shape
+        (5, 3)
+    """
+    from . import formulas
+    if Q is None:
+        assert wavelength is not None and angle is not None, \
+            "reflectivity needs Q or wavelength and angle"
+        Q = 4*pi*numpy.sin(numpy.radians(angle))/asarray(wavelength, 'd')
+    Q = asarray(Q, 'd')
+
+    # Gather layer parameters as complex SLD, thickness and roughness.
+    rho, depth, sigma = [], [], []
+    for layer in layers:
+        material, thickness = layer[0], layer[1]
+        roughness = layer[2] if len(layer) > 2 else 0.
+        if isinstance(material, (int, float, complex, numpy.number,
+                                 numpy.ndarray)):
+            sld = asarray(material)
+        else:
+            re, im, _ = neutron_sld(formulas.formula(material, table=table))
+            sld = re + 1j*im
+        rho.append(sld)
+        depth.append(asarray(thickness, 'd'))
+        sigma.append(asarray(roughness, 'd'))
+    shape = numpy.broadcast(*(rho + depth + sigma)).shape
+    rho, depth, sigma = [[numpy.broadcast_to(v, shape).reshape(-1, 1)
+                          for v in part] for part in (rho, depth, sigma)]
+
+    q = abs(Q).reshape(-1)
+    num_models = rho[0].shape[0]
+    step = max(1, chunksize//num_models)
+    R = numpy.empty((num_models, len(q)))
+    for start in range(0, len(q), step):
+        R[:, start:start+step] = _parratt(q[start:start+step],
+                                          rho, depth, sigma)
+    R = R.reshape(shape + Q.shape)
+    return float(R) if R.ndim == 0 else R
+
+def _parratt(q, rho, depth, sigma):
+    """
+    Returns |r|^2 for models x q given the per-layer model parameters.
+    """
+    kz = q/2
+    rho_0 = rho[0].real
+    # Absorption rho_i > 0 gives Im(k) > 0 so waves decay in the medium.
+    k = [sqrt(kz**2 - 4e-6*pi*(numpy.conj(v) - rho_0) + 0j) for v in rho]
+    r = numpy.zeros(k[0].shape, 'D')
+    for j in range(len(k)-2, -1, -1):
+        r_j = ((k[j] - k[j+1])/(k[j] + k[j+1])
+               * numpy.exp(-2*k[j]*k[j+1]*sigma[j]**2))
+        if j < len(k)-2:
+            phase = numpy.exp(2j*k[j+1]*depth[j+1])
+            r = (r_j + r*phase)/(1 + r_j*r*phase)
+        else:
+            r = r_j
+    return abs(r)**2
+
+class Enrichment(object):
+    r"""
+    Neutron scattering for an element with variable isotope abundance.
+
+    :Parameters:
+        *element* : Element
+            Element to enrich.
+        *isotopes* : [int] | None
+            Isotope numbers, one for each column of the abundance matrix.
+            The default is the isotopes present in natural abundance.
+
+    :Raises:
+        *ValueError* : an isotope has no neutron scattering data.
+
+    The abundance matrix has one row for each case and one column for each
+    isotope.  Rows are normalized so that they sum to one, so abundance
+    can be given as a fraction or as a percentage.  The natural abundance
+    for the isotopes is in *natural*, as a fraction.
+
+    For isotope fractions $c_i$, the scattering length is the average
+    $b_c = \sum c_i b_i$ and the total and absorption cross sections are
+    the weighted sums $\sigma_s = \sum c_i \sigma_{s,i}$ and
+    $\sigma_a = \sum c_i \sigma_{a,i}$.  The coherent cross section is
+    $\sigma_c = 4 \pi b_c^2/100$ and the incoherent cross section is
+    $\sigma_i = \sigma_s - \sigma_c$, which includes both the spin
+    incoherence of the individual isotopes and the incoherence from the
+    random distribution of isotopes,
+    $4 \pi (\sum c_i b_i^2 - b_c^2)/100$.  This is the same calculation
+    used for compounds in :func:`neutron_scattering`.
+
+    For example, the absorption of boron enriched in $^{10}$B::
+
+        >>> from periodictable import B
+        >>> from periodictable.nsf import Enrichment
+        >>> boron = Enrichment(B)
+        >>> print(", ".join(str(iso) for iso in boron.isotopes))
+        10-B, 11-B
+        >>> b_c, coh, inc, absorption = boron.cross_sections([[20, 80], [95, 5]])
+        >>> print(", ".join("%.1f"%v for v in absorption))
+        767.0, 3643.3
+
+    Values may not be correct for isotopes with
+    *is_energy_dependent=True*.
+    """
+    def __init__(self, element, isotopes=None):
+        if isotopes is None:
+            isotopes = [iso for iso in element
+                        if iso.neutron is not None and iso.neutron.abundance]
+        else:
+            isotopes = [element[n] for n in isotopes]
+        for iso in isotopes:
+            nsf = iso.neutron
+            if (nsf is None or nsf.b_c is None or nsf.total is None
+                    or nsf.absorption is None):
+                raise ValueError("no neutron scattering data for %s" % iso)
+        self.element = element
+        self.isotopes = isotopes
+        self.natural = numpy.array([iso.neutron.abundance for iso in isotopes],
+                                   'd')
+        self.natural /= numpy.sum(self.natural)
+        self.isotope_mass = numpy.array([iso.mass for iso in isotopes], 'd')
+        self.b_c = numpy.array([iso.neutron.b_c for iso in isotopes], 'd')
+        self.total = numpy.array([iso.neutron.total for iso in isotopes], 'd')
+        self.absorption = numpy.array([iso.neutron.absorption
+                                       for iso in isotopes], 'd')
+
+    def _fractions(self, abundance):
+        abundance = asarray(abundance, 'd')
+        if abundance.shape[-1] != len(self.isotopes):
+            raise ValueError("abundance needs %d columns for %s"
+                             % (len(self.isotopes), self.isotopes))
+        return abundance / numpy.sum(abundance, axis=-1)[..., None]
+
+    def mass(self, abundance):
+        """
+        Average atomic mass (u) for each row of *abundance*.
+        """
+        return numpy.dot(self._fractions(abundance), self.isotope_mass)
+
+    @require_keywords
+    def cross_sections(self, abundance, wavelength=ABSORPTION_WAVELENGTH):
+        """
+        Scattering length and cross sections for each row of *abundance*.
+
+        :Parameters:
+            *abundance* : n x k matrix
+                Abundance of the *k* isotopes for *n* cases.
+            *wavelength* : float or vector | |Ang|
+                Neutron wavelength, broadcast against the cases.
+
+        :Returns:
+            *b_c* : vector | fm
+                Bound coherent scattering length.
+            *coherent*, *incoherent*, *absorption* : vector | barn
+                Cross sections per atom.
+        """
+        c = self._fractions(abundance)
+        b_c = numpy.dot(c, self.b_c)
+        sigma_s = numpy.dot(c, self.total)
+        sigma_a = numpy.dot(c, self.absorption)*wavelength/ABSORPTION_WAVELENGTH
+        sigma_c = 4*pi/100 * b_c**2
+        sigma_i = numpy.maximum(sigma_s - sigma_c, 0.)
+        return b_c, sigma_c, sigma_i, sigma_a
+
+    @require_keywords
+    def sld(self, abundance, wavelength=ABSORPTION_WAVELENGTH, density=None):
+        """
+        Scattering length density for each row of *abundance*.
+
+        :Parameters:
+            *abundance* : n x k matrix
+                Abundance of the *k* isotopes for *n* cases.
+            *wavelength* : float or vector | |Ang|
+                Neutron wavelength, broadcast against the cases.
+            *density* : float or vector | |g/cm^3|
+                Mass density of the enriched element.  The default is
+                the number density of the natural element, with the mass
+                density scaled by the average mass.
+
+        :Returns:
+            *sld* : (vector, vector, vector) | |1e-6/Ang^2|
+                (*real*, -*imaginary*, *incoherent*) scattering length
+                density, as from :meth:`Neutron.sld`.
+        """
+        b_c, _, sigma_i, sigma_a = self.cross_sections(
+            abundance, wavelength=wavelength)
+        if density is None:
+            number_density = self.element.number_density
+        else:
+            number_density = asarray(density)/self.mass(abundance)*avogadro_number
+        number_density = number_density*1e-24
+        sld_re = number_density * b_c * 10
+        sld_im = number_density * sigma_a / (2 * wavelength) * 0.01
+        sld_inc = number_density * sqrt(sigma_i / (4*pi/100)) * 10
+        return sld_re, sld_im, sld_inc
+
 def sld_plot(table=None):
     """
     Plots SLD as a function of element number.
@@ -1456,6 +1783,77 @@ def fix_number(str):
         str = str[1:]
     return float(str)
 
+def sld_array(wavelength=ABSORPTION_WAVELENGTH, table=None, isotopes=True):
+    """
+    Scattering length density of every element and isotope.
+
+    :Parameters:
+        *wavelength* = 1.798 : float or vector | |Ang|
+            Neutron wavelength.
+        *table* : PeriodicTable
+            If *table* is not specified, use the common periodic table.
+        *isotopes* = True : boolean
+            Whether to include the isotopes of each element.
+
+    :Returns:
+        *data* : structured array
+            One row for each element and isotope with neutron data, with
+            fields *symbol* (such as Fe, 56-Fe or D), *Z*, *A* (zero for
+            the natural element), *mass*, *density*, *energy_dependent*,
+            and *sld*, *isld*, *incoh* in |1e-6/Ang^2|.  If *wavelength*
+            is a vector, the sld fields are vectors of the same length.
+
+    The values are the same as :meth:`Neutron.sld` for each atom, but all
+    atoms and wavelengths are computed together.  For example::
+
+        >>> data = sld_array(wavelength=[1.798, 4.75])
+        >>> row = data[data['symbol'] == '3-He'][0]
+        >>> print("%.3f %.3f %.3f"%(row['sld'][1], row['isld'][1],
+        ...                         row['incoh'][1]))
+        1.054 0.272 0.706
+    """
+    table = default_table(table)
+    atoms = []
+    for el in table:
+        if el.neutron.has_sld():
+            atoms.append(el)
+            if isotopes:
+                atoms.extend(iso for iso in el
+                             if iso.neutron is not None
+                             and iso.neutron.has_sld())
+
+    wavelength = asarray(wavelength, 'd')
+    shape = wavelength.shape
+    data = numpy.empty(len(atoms), dtype=[
+        ('symbol', 'U8'), ('Z', 'i4'), ('A', 'i4'), ('mass', 'd'),
+        ('density', 'd'), ('energy_dependent', '?'),
+        ('sld', 'd', shape), ('isld', 'd', shape), ('incoh', 'd', shape),
+        ])
+    data['symbol'] = [str(atom) for atom in atoms]
+    data['Z'] = [atom.number for atom in atoms]
+    data['A'] = [getattr(atom, 'isotope', 0) for atom in atoms]
+    data['mass'] = [atom.mass for atom in atoms]
+    data['density'] = [atom.density for atom in atoms]
+    data['energy_dependent'] = [atom.neutron.is_energy_dependent
+                                for atom in atoms]
+    if not atoms:
+        return data
+
+    # Same calculation as Neutron.sld, with atoms along the first axis.
+    b_c, sigma_s, sigma_a, number_density = [
+        numpy.array(v, 'd').reshape((-1,) + (1,)*len(shape))
+        for v in zip(*[(atom.neutron.b_c, atom.neutron.total,
+                        atom.neutron.absorption, atom.neutron._number_density)
+                       for atom in atoms])]
+    number_density = number_density*1e-24
+    sigma_a = sigma_a/ABSORPTION_WAVELENGTH*wavelength
+    sigma_c = 4*pi/100 * b_c**2
+    sigma_i = numpy.maximum(sigma_s - sigma_c, 0.)
+    data['sld'] = number_density * b_c * 10
+    data['isld'] = number_density * sigma_a / (2 * wavelength) * 0.01
+    data['incoh'] = number_density * sqrt(sigma_i / (4*pi/100)) * 10
+    return data
+
 def sld_table(wavelength=1, table=None, isotopes=True):
     """
     Scattering length density table for wavelength 4.75 |Ang|.
@@ -1486,30 +1884,20 @@ def sld_table(wavelength=1, table=None, isotopes=True):
         248-Cm  248.072  13.569   2.536   0.000   0.207
         * Energy dependent cross sections
     """
-    table = default_table(table)
     # Table for comparison with scattering length density calculators
     # b_c for Sc, Te, Xe, Sm, Eu, Gd, W, Au, Hg are different from Neutron News
     # The Rauch data have cited references to back up the numbers
     # (see doc directory), though it is not clear what criteria are
     # used to select amongst the available measurements.
+    data = sld_array(wavelength=wavelength, table=table, isotopes=isotopes)
     print(" Neutron scattering length density table")
     print("%-7s %7s %7s %7s %7s %7s"
           %('atom', 'mass', 'density', 'sld', 'imag', 'incoh'))
-    for el in table:
-        if el.neutron.has_sld():
-            coh, jcoh, inc = el.neutron.sld(wavelength=wavelength)
-            print("%-7s %7.3f %7.3f %7.3f %7.3f %7.3f%s"
-                  %(el, el.mass, el.density, coh, jcoh, inc,
-                    ' *' if el.neutron.is_energy_dependent else ''))
-            if isotopes:
-                isos = [iso for iso in el if iso.neutron is not None and iso.neutron.has_sld()]
-            else:
-                isos = []
-            for iso in isos:
-                coh, jcoh, inc = iso.neutron.sld(wavelength=wavelength)
-                print("%-7s %7.3f %7.3f %7.3f %7.3f %7.3f%s"
-                      %(iso, iso.mass, iso.density, coh, jcoh, inc,
-                        ' *' if iso.neutron.is_energy_dependent else ''))
+    for row in data:
+        print("%-7s %7.3f %7.3f %7.3f %7.3f %7.3f%s"
+              %(row['symbol'], row['mass'], row['density'], row['sld'],
+                row['isld'], row['incoh'],
+                ' *' if row['energy_dependent'] else ''))
     print("* Energy dependent cross sections")
 
 def energy_dependent_table(table=None):
@@ -0,0 +1,512 @@
+# This program is public domain
+"""
+Local HTTP/JSON service for scattering and activation calculations.
+
+The server exposes the following endpoints, each accepting a POST with
+a JSON object, or a list of objects to compute several at once:
+
+    /formula
+        {"formula": "CaCO3", "density": 2.71} returns the formula, Hill
+        notation, molar mass, molecular mass, density and charge.
+
+    /neutron_scattering
+        {"formula": "D2O@1.11n", "wavelength": 4.75} returns "sld"
+        (real, -imaginary, incoherent), "xs" (coherent, absorption,
+        incoherent) and "penetration" as from
+        :func:`periodictable.nsf.neutron_scattering`.  Use "energy"
+        instead of "wavelength" for the neutron energy in meV.
+
+    /xray_sld
+        {"formula": "SiO2@2.2", "energy": 8.05} returns "sld" (real,
+        imaginary) as from :func:`periodictable.xsf.xray_sld`.  Use
+        "wavelength" instead of "energy" for the wavelength in Angstroms.
+
+    /activation
+        An inventory row as accepted by
+        :func:`periodictable.activation.batch_activation`, such as
+        {"formula": "Co", "mass": 10, "exposure": 24, "fluence": 1e8},
+        with optional "rest_times" in hours, returns the activation record.
+
+A GET on / returns the list of endpoints and request statistics.
+
+Concurrent requests for the same endpoint are collected for a few
+milliseconds and sent as a single batch to a pool of worker processes
+with the tables and formula parser already loaded.  Within a batch,
+scattering requests for the same material are computed with one call
+over the vector of wavelengths or energies.  Results are kept in a
+bounded cache shared by all clients, and identical requests which arrive
+while a result is pending wait for the same computation.
+
+Errors for individual items are returned as {"error": message}.  A
+request with a single item which fails returns HTTP status 400.  Malformed
+requests, bodies larger than *MAX_BODY_SIZE* and headers with more than
+*MAX_HEADER_LINES* lines or *MAX_HEADER_SIZE* bytes also return 400, and
+the connection is closed.
+
+Start the server from the command line with::
+
+    python -m periodictable.server --port 8000
+
+or from python with :func:`serve`, or use :class:`SLDServer` within a
+running asyncio event loop.
+"""
+import asyncio
+import json
+from collections import OrderedDict
+
+import numpy
+
+from . import core
+from .formulas import formula as build_formula
+
+ENDPOINTS = ('formula', 'neutron_scattering', 'xray_sld', 'activation')
+
+#: Largest request body accepted, in bytes.
+MAX_BODY_SIZE = 16*2**20
+#: Largest number of header lines accepted in a request.
+MAX_HEADER_LINES = 100
+#: Largest total size of the request line and headers, in bytes.
+MAX_HEADER_SIZE = 64*2**10
+
+class SLDServer(object):
+    """
+    Asyncio HTTP server for batched periodictable calculations.
+
+    *host*, *port* : string, int
+
+        Address to listen on.  Use port 0 to pick a free port, which is
+        available as *port* after :meth:`start`.
+
+    *workers* : int
+
+        Number of worker processes.  Defaults to the number of CPUs.  Use
+        *workers=1* to compute in a thread of the current process.
+
+    *batch_size* : int
+
+        Maximum number of requests sent to a worker at once.
+
+    *batch_delay* : float | s
+
+        Time to wait for other requests before sending a batch.
+
+    *cache_size* : int
+
+        Number of results kept for repeated requests.
+    """
+    def __init__(self, host='127.0.0.1', port=8000, workers=None,
+                 batch_size=64, batch_delay=0.002, cache_size=10000):
+        self.host, self.port = host, port
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.cache_size = cache_size
+        #: Number of items requested, number computed and number of batches.
+        self.requests = self.computed = self.batches = 0
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._queues = dict((name, []) for name in ENDPOINTS)
+        self._timers = {}
+        self._executor = None
+        self._server = None
+
+    async def start(self):
+        """
+        Start the worker pool and listen for connections.
+        """
+        if self.workers == 1:
+            from concurrent.futures import ThreadPoolExecutor
+            _warm_worker()
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 initializer=_warm_worker)
+            # Start the workers before accepting connections, otherwise the
+            # forked workers would hold client sockets open.
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, compute_batch,
+                                       'formula', [])
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """
+        Stop listening and shut down the worker pool.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def compute(self, endpoint, item):
+        """
+        Return the result for one *item* of *endpoint*.
+        """
+        self.requests += 1
+        key = endpoint, json.dumps(item, sort_keys=True)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        future = self._pending.get(key, None)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[key] = loop.create_future()
+            queue = self._queues[endpoint]
+            queue.append((key, item, future))
+            if len(queue) >= self.batch_size:
+                self._flush(endpoint)
+            elif len(queue) == 1:
+                self._timers[endpoint] = loop.call_later(
+                    self.batch_delay, self._flush, endpoint)
+        return await asyncio.shield(future)
+
+    def stats(self):
+        """
+        Return the endpoints and request counts.
+        """
+        return dict(endpoints=list(ENDPOINTS), requests=self.requests,
+                    computed=self.computed, batches=self.batches,
+                    cached=len(self._cache))
+
+    def _flush(self, endpoint):
+        """
+        Send the queued requests for *endpoint* to the worker pool.
+        """
+        timer = self._timers.pop(endpoint, None)
+        if timer is not None:
+            timer.cancel()
+        queue, self._queues[endpoint] = self._queues[endpoint], []
+        if not queue:
+            return
+        self.batches += 1
+        self.computed += len(queue)
+        loop = asyncio.get_running_loop()
+        job = loop.run_in_executor(self._executor, compute_batch, endpoint,
+                                   [item for _, item, _ in queue])
+        job.add_done_callback(lambda job: self._finish(queue, job))
+
+    def _finish(self, queue, job):
+        """
+        Deliver the results of a batch to the waiting requests.
+        """
+        try:
+            results = job.result()
+        except Exception as exc:
+            results = [_error(exc)]*len(queue)
+        for (key, _, future), result in zip(queue, results):
+            del self._pending[key]
+            if not result.get('error', None):
+                self._cache[key] = result
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            if not future.done():
+                future.set_result(result)
+
+    async def _handle_connection(self, reader, writer):
+        """
+        Serve HTTP/1.1 requests on one connection until it is closed.
+        """
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except ValueError as exc:
+                    # The rest of the stream cannot be trusted, so reply
+                    # and close the connection.
+                    _write_response(writer, 400, {'error': str(exc)}, False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, reply = await self._dispatch(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                _write_response(writer, status, reply, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body):
+        """
+        Return (status, reply) for a request.
+        """
+        endpoint = path.split('?')[0].strip('/')
+        if method == 'GET' and endpoint == '':
+            return 200, self.stats()
+        if endpoint not in ENDPOINTS:
+            return 404, {'error': "unknown endpoint /%s"%endpoint}
+        if method != 'POST':
+            return 405, {'error': "use POST for /%s"%endpoint}
+        try:
+            items = json.loads(body.decode('utf-8'))
+        except ValueError as exc:
+            return 400, {'error': "invalid JSON: %s"%exc}
+        if isinstance(items, list):
+            if not all(isinstance(item, dict) for item in items):
+                return 400, {'error': "expected a list of objects"}
+            results = await asyncio.gather(
+                *[self.compute(endpoint, item) for item in items])
+            return 200, results
+        if not isinstance(items, dict):
+            return 400, {'error': "expected an object or a list of objects"}
+        result = await self.compute(endpoint, items)
+        return (400 if result.get('error', None) else 200), result
+
+async def _read_request(reader):
+    """
+    Return (method, path, headers, body) for the next request on the
+    connection, or None if the connection was closed.
+
+    Raises ValueError if the request is malformed, the headers are larger
+    than *MAX_HEADER_LINES* or *MAX_HEADER_SIZE*, or the body is larger
+    than *MAX_BODY_SIZE*.
+    """
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    parts = line.decode('latin-1').split()
+    if len(parts) < 2:
+        raise ValueError("invalid request line")
+    method, path = parts[:2]
+    headers = {}
+    count, total = 0, len(line)
+    while True:
+        line = await reader.readline()
+        if not line.strip():
+            break
+        count, total = count + 1, total + len(line)
+        if count > MAX_HEADER_LINES or total > MAX_HEADER_SIZE:
+            raise ValueError("request headers are too large")
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        size = int(headers.get('content-length', 0))
+    except ValueError:
+        raise ValueError("invalid Content-Length")
+    if size < 0 or size > MAX_BODY_SIZE:
+        raise ValueError("Content-Length must be between 0 and %d"
+                         % MAX_BODY_SIZE)
+    body = await reader.readexactly(size) if size else b''
+    return method.upper(), path, headers, body
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+            405: 'Method Not Allowed'}
+def _write_response(writer, status, reply, keep_alive):
+    """
+    Write *reply* as a JSON response.
+    """
+    body = json.dumps(reply, default=_to_json).encode('utf-8')
+    header = ("HTTP/1.1 %d %s\r\n"
+              "Content-Type: application/json\r\n"
+              "Content-Length: %d\r\n"
+              "Connection: %s\r\n\r\n"
+              % (status, _REASONS[status], len(body),
+                 'keep-alive' if keep_alive else 'close'))
+    writer.write(header.encode('latin-1') + body)
+
+def _to_json(value):
+    """
+    Convert numpy values for the JSON encoder.
+    """
+    try:
+        return value.tolist()
+    except AttributeError:
+        raise TypeError("%r is not JSON serializable"%(value,))
+
+def _error(exc):
+    """
+    Return the result for a failed computation.
+    """
+    return {'error': str(exc) if str(exc) else exc.__class__.__name__}
+
+def compute_batch(endpoint, items):
+    """
+    Compute results for a list of request items for *endpoint*.
+
+    Returns one result dictionary per item.  This is the function run in
+    the worker processes, but it can also be called directly.
+    """
+    if endpoint not in ENDPOINTS:
+        raise ValueError("unknown endpoint %r"%endpoint)
+    return _BATCH_FUNCTIONS[endpoint](items)
+
+def _formula_batch(items):
+    """Formula summary for each item."""
+    results = []
+    for item in items:
+        try:
+            f = _parse(item)
+            results.append(dict(
+                formula=str(f), hill=str(f.hill), mass=f.mass,
+                molecular_mass=f.molecular_mass, density=f.density,
+                charge=f.charge))
+        except Exception as exc:
+            results.append(_error(exc))
+    return results
+
+def _neutron_batch(items):
+    """Neutron scattering for each item, grouped by material."""
+    from .nsf import neutron_scattering, neutron_wavelength
+    from .nsf import ABSORPTION_WAVELENGTH
+    def probe(item):
+        if item.get('energy', None) is not None:
+            return neutron_wavelength(item['energy'])
+        wavelength = item.get('wavelength', None)
+        return ABSORPTION_WAVELENGTH if wavelength is None else wavelength
+    def compute(compound, wavelength):
+        sld, xs, penetration = neutron_scattering(compound,
+                                                  wavelength=wavelength)
+        if sld[0] is None:
+            raise ValueError("no neutron data for %s"%compound)
+        return [dict(sld=[_index(v, k) for v in sld],
+                     xs=[_index(v, k) for v in xs],
+                     penetration=_index(penetration, k))
+                for k in range(len(wavelength))]
+    return _grouped(items, probe, compute)
+
+def _xray_batch(items):
+    """X-ray SLD for each item, grouped by material."""
+    from .xsf import xray_sld, xray_energy
+    def probe(item):
+        if item.get('wavelength', None) is not None:
+            return xray_energy(item['wavelength'])
+        if item.get('energy', None) is None:
+            raise TypeError("X-ray SLD needs energy or wavelength")
+        return item['energy']
+    def compute(compound, energy):
+        rho, irho = xray_sld(compound, energy=energy)
+        return [dict(sld=[_index(rho, k), _index(irho, k)])
+                for k in range(len(energy))]
+    return _grouped(items, probe, compute)
+
+def _activation_batch(items):
+    """Activation record for each inventory item."""
+    from . import activation
+    environment = activation.ActivationEnvironment()
+    results = []
+    for item in items:
+        item = dict(item)
+        rest_times = item.pop('rest_times', (0, 1, 24, 360))
+        try:
+            job = activation._activation_job(
+                item, environment, 1, rest_times,
+                activation.NIST2001_isotopic_abundance)
+            results.append(activation._run_activation_job(job))
+        except Exception as exc:
+            results.append(_error(exc))
+    return results
+
+_BATCH_FUNCTIONS = {
+    'formula': _formula_batch,
+    'neutron_scattering': _neutron_batch,
+    'xray_sld': _xray_batch,
+    'activation': _activation_batch,
+}
+
+def _grouped(items, probe, compute):
+    """
+    Evaluate scattering for a batch, calling *compute(compound, probes)*
+    once for each distinct material with the vector of probe values
+    returned by *probe(item)* for the items using that material.
+    """
+    results = [None]*len(items)
+    groups = OrderedDict()
+    for k, item in enumerate(items):
+        try:
+            compound = _parse(item)
+            groups.setdefault(id(compound), (compound, [], []))
+            groups[id(compound)][1].append(k)
+            groups[id(compound)][2].append(float(probe(item)))
+        except Exception as exc:
+            results[k] = _error(exc)
+    for compound, index, values in groups.values():
+        try:
+            group = compute(compound, numpy.array(values))
+        except Exception as exc:
+            group = [_error(exc)]*len(index)
+        for k, result in zip(index, group):
+            results[k] = result
+    return results
+
+def _index(value, k):
+    """
+    Return element *k* of a vector result, or the value if it is a scalar.
+    """
+    return float(value[k]) if numpy.ndim(value) else float(value)
+
+# Parsed formulas, indexed by (formula, density, natural_density).
+_FORMULA_CACHE = {}
+def _parse(item):
+    """
+    Return the formula for a request item, using the parse cache.
+    """
+    compound = item.get('formula', None)
+    if not isinstance(compound, str):
+        raise TypeError("request needs a formula string")
+    key = compound, item.get('density', None), item.get('natural_density', None)
+    f = _FORMULA_CACHE.get(key, None)
+    if f is None:
+        f = build_formula(compound, density=key[1], natural_density=key[2])
+        if len(_FORMULA_CACHE) > 10000:
+            _FORMULA_CACHE.clear()
+        _FORMULA_CACHE[key] = f
+    return f
+
+def _warm_worker():
+    """
+    Load the tables and formula parser before processing requests.
+    """
+    from . import activation
+    table = core.default_table()
+    activation.init(table)
+    build_formula("H2O@1").neutron_sld(wavelength=1.798)
+    table.O.xray.scattering_factors(energy=8.)
+
+def serve(host='127.0.0.1', port=8000, workers=None, **kw):
+    """
+    Run an :class:`SLDServer` until interrupted.
+    """
+    async def run():
+        server = SLDServer(host=host, port=port, workers=workers, **kw)
+        await server.start()
+        print("periodictable server on http://%s:%d/"%(server.host, server.port))
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+def main():
+    """
+    Command line entry point for the server.
+    """
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="HTTP/JSON server for periodictable calculations")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: number of CPUs)")
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--batch-delay', type=float, default=0.002,
+                        help="seconds to wait for a batch to fill")
+    parser.add_argument('--cache-size', type=int, default=10000)
+    opts = parser.parse_args()
+    serve(host=opts.host, port=opts.port, workers=opts.workers,
+          batch_size=opts.batch_size, batch_delay=opts.batch_delay,
+          cache_size=opts.cache_size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+# This program is public domain
+"""
+Property tables in shared memory for pools of worker processes.
+
+Each worker process in a pool loads its own copy of the neutron, X-ray
+and activation tables the first time they are used, parsing the data
+files again in every worker.  Instead, the parent can publish the tables
+once with :class:`SharedTables`, and the workers attach to them with
+:func:`attach`.  The arrays are read-only views of the shared memory, so
+there is one copy of the data on the machine and nothing to parse in
+the workers.
+
+The published arrays are:
+
+    *atoms*
+        Structured array with one row for each element (*A* = 0) and
+        isotope, with *mass*, *abundance* and *density*, and the neutron
+        scattering fields of :class:`periodictable.nsf.Neutron` (NaN if
+        missing).  *has_neutron* marks the rows with neutron data.
+
+    *xray_index*, *xray*
+        Henke scattering factor tables packed end to end in a (3, n)
+        array of (E, f1, f2), with the (Z, start, stop) columns for each
+        element in *xray_index*.
+
+    *activation*
+        The activation records of
+        :class:`periodictable.activation.ActivationTable`.
+
+Use :meth:`SharedTables.executor` for a process pool whose workers attach
+to the tables when they start, or pass :attr:`SharedTables.initializer`
+and :attr:`SharedTables.initargs` to :func:`periodictable.util.pool_map`.
+For example, with *sld* a module level function of a formula::
+
+    from periodictable.shared import SharedTables
+    with SharedTables() as tables:
+        with tables.executor(max_workers=64) as pool:
+            rho = list(pool.map(sld, formulas))
+
+Mass and density are loaded when periodictable is imported, so they are
+published for use as arrays but not installed in the worker tables.
+
+Only the X-ray and activation tables are used in place.  The neutron
+properties are attributes of a :class:`periodictable.nsf.Neutron` object
+on each element and isotope, so :func:`attach` builds these objects
+from the shared *atoms* rows.  The neutron files are not parsed again,
+but each worker holds its own copy of the neutron data (a few hundred
+kilobytes).  Use the *atoms* array directly for the neutron fields
+without the copy.
+
+The shared memory belongs to the parent, and is released by
+:meth:`SharedTables.close` when the workers are done with it.
+"""
+from __future__ import division
+
+import os
+
+import numpy
+
+from . import core
+
+__all__ = ['SharedTables', 'attach']
+
+# Alignment of the arrays within the shared memory block.
+_ALIGN = 64
+
+# Neutron fields published in the atoms table.
+NEUTRON_FIELDS = ('b_c', 'b_c_i', 'bp', 'bp_i', 'bm', 'bm_i', 'coherent',
+                  'incoherent', 'total', 'absorption')
+
+class SharedTables(object):
+    """
+    Publish the property tables in shared memory.
+
+    :Parameters:
+        *table* : PeriodicTable
+            Table to publish, which defaults to the public table.
+        *properties* = ('neutron', 'xray', 'activation') : [string]
+            Properties to publish.  These are loaded in the parent if
+            they are not already loaded.
+
+    *manifest* describes the shared memory block and the arrays within
+    it.  It is small and can be pickled, so it can be sent to the workers
+    in the pool initializer arguments.  *arrays* are the published arrays
+    as read-only views.
+
+    Use as a context manager, or call :meth:`close` to release the shared
+    memory when the workers are done with it.
+    """
+    def __init__(self, table=None,
+                 properties=('neutron', 'xray', 'activation')):
+        from multiprocessing import shared_memory
+        table = core.default_table(table)
+        arrays = {'atoms': _atoms_array(table, 'neutron' in properties)}
+        if 'xray' in properties:
+            arrays['xray_index'], arrays['xray'] = _xray_arrays(table)
+        if 'activation' in properties:
+            from .activation import activation_table
+            arrays['activation'] = activation_table().data
+
+        layout, size = {}, 0
+        for name, value in sorted(arrays.items()):
+            layout[name] = (value.dtype, value.shape, size)
+            size += -(-value.nbytes//_ALIGN)*_ALIGN
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.manifest = dict(name=self._shm.name,
+                             table=core._table_key(table[0].table),
+                             properties=tuple(properties), arrays=layout)
+        self.arrays = _views(self._shm, layout, writeable=True)
+        for name, value in arrays.items():
+            self.arrays[name][...] = value
+            self.arrays[name].flags.writeable = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def initializer(self):
+        """Pool initializer which attaches the worker to the tables."""
+        return attach
+
+    @property
+    def initargs(self):
+        """Arguments for :attr:`initializer`."""
+        return (self.manifest,)
+
+    def executor(self, max_workers=None, **kw):
+        """
+        Return a *concurrent.futures.ProcessPoolExecutor* whose workers
+        attach to the shared tables.  Keyword arguments are passed to the
+        executor.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        return ProcessPoolExecutor(max_workers=max_workers,
+                                   initializer=self.initializer,
+                                   initargs=self.initargs, **kw)
+
+    def close(self):
+        """
+        Release the shared memory.  The *arrays* are no longer available.
+        """
+        if self._shm is not None:
+            self.arrays = {}
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+# Shared memory blocks attached in this process, kept open for the life
+# of the process since the tables refer to them.
+_ATTACHED = {}
+def attach(manifest, table=None):
+    """
+    Attach to tables published by :class:`SharedTables`.
+
+    :Parameters:
+        *manifest* : dict
+            The *manifest* attribute of the published tables.
+        *table* : PeriodicTable
+            Table to install the properties in, which defaults to the table
+            that was published.  A private table is rebuilt from its recipe
+            if it does not exist in the worker.
+
+    :Returns:
+        *arrays* : {string: array}
+            Read-only views of the published arrays.
+
+    Neutron properties are installed in the table unless they are already
+    loaded, the X-ray scattering factor tables are used for all tables in
+    the process, and the activation records are used for all tables which
+    do not already have activation properties.  This is the pool
+    initializer set by :meth:`SharedTables.executor`.
+    """
+    name = manifest['name']
+    if name not in _ATTACHED:
+        shm = _open_shared_memory(name)
+        _ATTACHED[name] = shm, _views(shm, manifest['arrays'], writeable=False)
+    arrays = _ATTACHED[name][1]
+
+    if 'xray' in manifest['properties']:
+        _install_xray(arrays['xray_index'], arrays['xray'])
+    if 'activation' in manifest['properties']:
+        from . import activation
+        if activation._ACTIVATION_TABLE is None:
+            activation._ACTIVATION_TABLE = \
+                activation.ActivationTable.from_array(arrays['activation'])
+
+    install, installed = None, ()
+    if 'neutron' in manifest['properties']:
+        install = lambda table: _install_neutron(table, arrays['atoms'])
+        installed = ('neutron',)
+    key = manifest['table']
+    if (table is None and isinstance(key, tuple)
+            and key[0] not in core.PRIVATE_TABLES):
+        # Rebuild the private table with the published neutron data rather
+        # than loading it from the data files.
+        core._rebuild_table(key, install=install, installed=installed)
+    else:
+        table = core._get_table(key) if table is None else table
+        if install is not None:
+            install(table)
+    return arrays
+
+def _open_shared_memory(name):
+    """
+    Open an existing shared memory block without tracking it.
+
+    The block belongs to the publishing process.  If the attaching process
+    registers it with its resource tracker, the tracker will remove the
+    block when the attaching process exits.
+    """
+    from multiprocessing import resource_tracker, shared_memory
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError: # CRUFT: python < 3.13 has no track option
+        pass
+    register = resource_tracker.register
+    def _register(name, rtype):
+        if rtype != "shared_memory":
+            register(name, rtype)
+    resource_tracker.register = _register
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+def _views(shm, layout, writeable):
+    """
+    Return arrays for the *layout* of the shared memory block.
+    """
+    views = {}
+    for name, (dtype, shape, offset) in layout.items():
+        view = numpy.ndarray(shape, dtype=dtype, buffer=shm.buf,
+                             offset=offset)
+        view.flags.writeable = writeable
+        views[name] = view
+    return views
+
+def _atoms_array(table, neutron):
+    """
+    Return the columns for the elements and isotopes of *table*.
+    """
+    if neutron:
+        from . import nsf
+        nsf.init(table)
+    atoms = []
+    for el in table:
+        atoms.append(el)
+        atoms.extend(iso for iso in el)
+    data = numpy.zeros(len(atoms), dtype=[
+        ('Z', 'i4'), ('A', 'i4'), ('mass', 'd'), ('abundance', 'd'),
+        ('density', 'd'), ('has_neutron', '?'), ('nuclear_spin', 'U8'),
+        ('is_energy_dependent', '?'), ('neutron_abundance', 'd'),
+        ] + [(name, 'd') for name in NEUTRON_FIELDS])
+    for k, atom in enumerate(atoms):
+        row = data[k]
+        row['Z'] = atom.number
+        row['A'] = getattr(atom, 'isotope', 0)
+        row['mass'] = _float(atom.mass)
+        row['abundance'] = _float(getattr(atom, 'abundance', None)
+                                  if row['A'] else 100.)
+        if table[atom.number].density is not None:
+            row['density'] = atom.density
+        else:
+            row['density'] = numpy.nan
+        if neutron and 'neutron' in atom.__dict__:
+            nsf = atom.neutron
+            row['has_neutron'] = True
+            row['nuclear_spin'] = getattr(atom, 'nuclear_spin', None) or ''
+            row['is_energy_dependent'] = nsf.is_energy_dependent
+            row['neutron_abundance'] = _float(nsf.abundance)
+            for name in NEUTRON_FIELDS:
+                row[name] = _float(getattr(nsf, name))
+    return data
+
+def _float(value):
+    return numpy.nan if value is None else value
+
+def _install_neutron(table, data):
+    """
+    Set the neutron properties of *table* from the atoms array, as
+    :func:`periodictable.nsf.init` does from the data tables.
+
+    The values are copied into new :class:`periodictable.nsf.Neutron`
+    objects rather than viewing the shared memory.
+    """
+    from .nsf import Neutron
+    if 'neutron' in table.properties:
+        return
+    table.properties.append('neutron')
+    missing = Neutron()
+    core.Isotope.neutron = missing
+    core.Element.neutron = missing
+    data = data[data['has_neutron']]
+    columns = [data[name].tolist() for name in NEUTRON_FIELDS]
+    for k, (Z, A, spin, energy_dependent, abundance) in enumerate(zip(
+            data['Z'].tolist(), data['A'].tolist(),
+            data['nuclear_spin'].tolist(),
+            data['is_energy_dependent'].tolist(),
+            data['neutron_abundance'].tolist())):
+        nsf = Neutron()
+        for name, column in zip(NEUTRON_FIELDS, columns):
+            value = column[k]
+            setattr(nsf, name, None if value != value else value)
+        nsf.is_energy_dependent = energy_dependent
+        nsf.abundance = abundance
+        element = table[Z]
+        nsf._number_density = element.number_density
+        if A == 0:
+            element.neutron = nsf
+        else:
+            isotope = element.add_isotope(A)
+            isotope.neutron = nsf
+            isotope.nuclear_spin = spin
+
+def _xray_arrays(table):
+    """
+    Return the (Z, start, stop) index and packed (E, f1, f2) tables.
+    """
+    from . import xsf
+    xsf.init(table)
+    index, tables, start = [], [], 0
+    for el in table:
+        sftable = el.xray.sftable
+        if sftable is not None:
+            index.append((el.number, start, start + sftable.shape[1]))
+            tables.append(sftable)
+            start += sftable.shape[1]
+    index = numpy.array(index, dtype=[('Z', 'i4'), ('start', 'i8'),
+                                      ('stop', 'i8')])
+    packed = numpy.hstack(tables) if tables else numpy.empty((3, 0))
+    return index, packed
+
+def _install_xray(index, packed):
+    """
+    Use the packed tables as the X-ray scattering factor tables.
+    """
+    from . import xsf
+    table = core.default_table()
+    for Z, start, stop in index.tolist():
+        symbol = table[Z].symbol
+        filename = os.path.join(xsf.Xray._nff_path, symbol.lower()+".nff")
+        xsf._NFF_CACHE.setdefault(filename, packed[:, start:stop])
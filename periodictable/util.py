@@ -113,3 +113,64 @@ def _getargspec_from_signature(function):
         elif p.kind is p.VAR_KEYWORD:
             varkwd = p.name
     return args, vararg, varkwd, defaults
+
+def pool_map(function, items, workers=None, chunksize=1,
+             initializer=None, initargs=()):
+    """
+    Map *function* over *items* using a pool of worker processes.
+
+    :Parameters:
+        *function* : callable
+            Module level function applied to each item.
+        *items* : iterable
+            Items to process.  This may be an iterator of any length; it
+            is consumed incrementally.
+        *workers* = None : int
+            Number of worker processes.  Defaults to the number of CPUs.
+            Use *workers=1* to run in the current process.
+        *chunksize* = 1 : int
+            Number of items sent to a worker at a time.
+        *initializer*, *initargs* :
+            Function called once in each worker before processing starts,
+            for example to load the tables needed by *function*.
+
+    :Returns:
+        *results* : iterator
+            Results in the same order as *items*.
+
+    Only a few chunks per worker are in flight at any time, so memory use
+    is bounded by *workers* and *chunksize* rather than by the number of
+    items.
+    """
+    import itertools
+    items = iter(items)
+    if workers == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for item in items:
+            yield function(item)
+        return
+
+    import os
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = iter(lambda: list(itertools.islice(items, chunksize)), [])
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer,
+                             initargs=initargs) as pool:
+        pending = deque(pool.submit(_map_chunk, function, chunk)
+                        for chunk in itertools.islice(chunks, 2*workers))
+        while pending:
+            results = pending.popleft().result()
+            for chunk in itertools.islice(chunks, 1):
+                pending.append(pool.submit(_map_chunk, function, chunk))
+            for value in results:
+                yield value
+
+def _map_chunk(function, chunk):
+    """
+    Apply *function* to each item in *chunk* within a worker process.
+    """
+    return [function(item) for item in chunk]
@@ -49,6 +49,15 @@ The following functions are available for X-ray scatting information processing:
      :func:`mirror_reflectivity`
          X-ray reflectivity from a mirror made of a single compound.
 
+     :func:`attenuation_length`
+         X-ray 1/e attenuation length in a compound.
+
+     :func:`xray_transmission`
+         X-ray transmission through a stack of materials.
+
+     :func:`energy_grid`
+         Energies which resolve the absorption edges of a set of materials.
+
      :func:`xray_sld_from_atoms`
          The underlying scattering length density calculator. This works with
          a dictionary of atoms and quantities directly.
@@ -56,6 +65,9 @@ The following functions are available for X-ray scatting information processing:
      :func:`emission_table`
          Prints a table of emission lines.
 
+     :func:`sld_array`, :func:`emission_array`
+         Returns the SLD and emission line tables as structured arrays.
+
 K_alpha, K_beta1 (|Ang|):
     X-ray emission lines for elements beyond neon, with
     $K_\alpha = (2 K_{\alpha 1} + K_{\alpha 2})/3$.
@@ -180,6 +192,8 @@ __all__ = ['Xray', 'init', 'init_spectral_lines',
            'xray_sld', 'xray_sld_from_atoms',
            'emission_table', 'sld_table', 'plot_xsf',
            'index_of_refraction', 'mirror_reflectivity',
+           'sld_array', 'emission_array',
+           'attenuation_length', 'xray_transmission', 'energy_grid',
            ]
 import os.path
 
@@ -239,6 +253,20 @@ def xray_energy(wavelength):
     """
     return plancks_constant*speed_of_light/numpy.asarray(wavelength)*1e7
 
+# Scattering factor tables are shared between periodic tables.
+_NFF_CACHE = {}
+def _read_nff(filename):
+    """
+    Return the (E, f1, f2) table from an .nff file, reading it on first use.
+    """
+    if filename not in _NFF_CACHE:
+        xsf = numpy.loadtxt(filename, skiprows=1).T
+        xsf[1, xsf[1] == -9999.] = numpy.NaN
+        xsf[0] *= 0.001  # Use keV in table rather than eV
+        xsf.flags.writeable = False
+        _NFF_CACHE[filename] = xsf
+    return _NFF_CACHE[filename]
+
 class Xray(object):
     """
     X-ray scattering properties for the elements. Refer help(periodictable.xsf)
@@ -260,10 +288,7 @@ class Xray(object):
             filename = os.path.join(self._nff_path,
                                     self.element.symbol.lower()+".nff")
             if self.element.symbol != 'n' and os.path.exists(filename):
-                xsf = numpy.loadtxt(filename, skiprows=1).T
-                xsf[1, xsf[1] == -9999.] = numpy.NaN
-                xsf[0] *= 0.001  # Use keV in table rather than eV
-                self._table = xsf
+                self._table = _read_nff(filename)
         return self._table
     sftable = property(_gettable, doc="X-ray scattering factor table (E,f1,f2)")
 
@@ -511,6 +536,172 @@ def mirror_reflectivity(compound, density=None, natural_density=None,
     return abs(r)**2
 
 
+@require_keywords
+def attenuation_length(compound, energy=None, wavelength=None, density=None,
+                       natural_density=None, table=None):
+    r"""
+    X-ray 1/e attenuation length.
+
+    :Parameters:
+        *compound* : Formula initializer
+            Chemical formula.
+        *energy* : float or vector | keV
+            X-ray energy, if *wavelength* is not given.
+        *wavelength* : float or vector | |Ang|
+            X-ray wavelength.
+        *density* : float | |g/cm^3|
+            Mass density of the compound, or None for default.
+        *natural_density* : float | |g/cm^3|
+            Mass density of the compound at naturally occurring isotope
+            abundance.
+        *table* : PeriodicTable
+            Private table to use when parsing string formulas.
+
+    :Returns:
+        *length* : float or vector | cm
+            Depth at which the intensity falls to $1/e$, or None if there
+            is no X-ray data for one of the atoms.
+
+    The attenuation coefficient is $\mu = 2 \lambda \rho_i$ for imaginary
+    scattering length density $\rho_i$ (see :func:`xray_sld`), and the
+    attenuation length is $1/\mu$.  For example, silicon at Cu K-alpha::
+
+        >>> print("%.1f um"%(attenuation_length('Si', energy=8.048)*1e4))
+        71.0 um
+    """
+    from . import formulas
+    prepared = formulas.prepare(compound, density=density,
+                                natural_density=natural_density, table=table)
+    mu = _attenuation(prepared, energy=energy, wavelength=wavelength)
+    if mu is None:
+        return None
+    with numpy.errstate(divide='ignore'):
+        return 1/mu
+
+@require_keywords
+def xray_transmission(stack, energy=None, wavelength=None, table=None,
+                      energy_range=None, n=200):
+    r"""
+    X-ray transmission through a stack of slabs.
+
+    :Parameters:
+        *stack* : [(Formula, float or vector)]
+            Sequence of (*material*, *thickness*) pairs, with *thickness* in
+            cm.  Materials are formulas or formula strings with density.
+            Thickness can be a vector, so long as the thickness vectors in
+            the stack have compatible shapes.
+        *energy* : float or vector | keV
+            X-ray energy, if *wavelength* is not given.
+        *wavelength* : float or vector | |Ang|
+            X-ray wavelength.
+        *table* : PeriodicTable
+            Private table to use when parsing string formulas.
+        *energy_range* : (float, float) | keV
+            Energy range to sample, if neither *energy* nor *wavelength*
+            is given.
+        *n* = 200 : int
+            Number of logarithmically spaced points in *energy_range*.
+
+    :Returns:
+        *energy* : vector | keV
+            Energies sampled from *energy_range*, if it is given.
+        *transmission* : float or array
+            Fraction of the beam transmitted, with the shape of the
+            thickness followed by the shape of the energy, or None if
+            there is no X-ray data for one of the atoms.
+
+    The transmission is $T = e^{-\sum \mu_i t_i}$ with attenuation
+    coefficient $\mu_i$ as in :func:`attenuation_length`.  The
+    scattering factors for each material are summed once on the combined
+    energy grid of its elements (see :func:`periodictable.formulas.prepare`),
+    so a grid of thicknesses and energies is a few array operations.
+    The thickness is given with each material rather than as a separate
+    argument since each layer of the stack has its own thickness.
+
+    For example, the transmission of a 25 |um| copper filter with a 50 |um|
+    kapton window either side of the Cu K edge::
+
+        >>> stack = [('Cu', 25e-4), ('C22H10N2O5@1.42', 100e-4)]
+        >>> T = xray_transmission(stack, energy=[8.97, 8.99])
+        >>> print(", ".join("%.3f"%v for v in T))
+        0.416, 0.002
+
+    Use *energy_range* instead of *energy* to sample the absorption edges
+    of the materials in the stack as well as a logarithmic grid, as given
+    by :func:`energy_grid`::
+
+        >>> energy, T = xray_transmission(stack, energy_range=(5, 20))
+        >>> k = numpy.searchsorted(energy, 8.979)
+        >>> print("%.4f keV: %.3f, %.4f keV: %.3f"
+        ...       % (energy[k-1], T[k-1], energy[k], T[k]))
+        8.9788 keV: 0.417, 8.9790 keV: 0.002
+    """
+    from . import formulas
+    if energy_range is not None and energy is None and wavelength is None:
+        low, high = energy_range
+        energy = energy_grid([material for material, _ in stack], low, high,
+                             n=n, table=table)
+        return energy, xray_transmission(stack, energy=energy, table=table)
+    if wavelength is not None:
+        energy = xray_energy(wavelength)
+    assert energy is not None, \
+        "scattering calculation needs energy, wavelength or energy_range"
+    energy = numpy.asarray(energy, 'd')
+    total = 0.
+    for material, thickness in stack:
+        prepared = formulas.prepare(material, table=table)
+        mu = _attenuation(prepared, energy=energy)
+        if mu is None:
+            return None
+        total = total + numpy.multiply.outer(thickness, mu)
+    return numpy.exp(-total)
+
+def energy_grid(compounds, low, high, n=200, table=None):
+    """
+    X-ray energies from *low* to *high* keV which resolve absorption edges.
+
+    :Parameters:
+        *compounds* : [Formula initializer]
+            Materials whose absorption edges should be resolved.
+        *low*, *high* : float | keV
+            Energy range.
+        *n* = 200 : int
+            Number of points on the logarithmic grid between *low* and
+            *high*.
+        *table* : PeriodicTable
+            Private table to use when parsing string formulas.
+
+    :Returns:
+        *energy* : vector | keV
+            Sorted energies.
+
+    The grid contains *n* logarithmically spaced points plus every point
+    of the scattering factor tables of the elements within the range.
+    These tables have points 0.1 eV above and below each absorption edge,
+    and since values are linearly interpolated between table points,
+    curves computed on this grid show the edges exactly.
+    """
+    from . import formulas
+    points = [numpy.logspace(numpy.log10(low), numpy.log10(high), n)]
+    for compound in compounds:
+        for atom in formulas.formula(compound, table=table).atoms:
+            xsf = atom.xray.sftable
+            if xsf is not None:
+                points.append(xsf[0][(xsf[0] >= low) & (xsf[0] <= high)])
+    return numpy.unique(numpy.hstack(points))
+
+def _attenuation(prepared, energy=None, wavelength=None):
+    """
+    Returns attenuation coefficient (1/cm) of a prepared compound.
+    """
+    if wavelength is None:
+        wavelength = xray_wavelength(energy)
+    _, irho = prepared.xray_sld(wavelength=wavelength)
+    if irho is None:
+        return None
+    # mu = 2 lambda irho, with irho in 1e-6/Ang^2 and mu in 1/cm
+    return 2*wavelength*irho*100
+
 def xray_sld_from_atoms(*args, **kw):
     """
     .. deprecated:: 0.91
@@ -672,6 +863,61 @@ def plot_xsf(el):
     pylab.legend(['f1', 'f2'])
     pylab.show()
 
+@require_keywords
+def sld_array(wavelength=None, energy=None, table=None):
+    """
+    X-ray scattering length density of every element.
+
+    :Parameters:
+        *wavelength* = Cu K-alpha : float or vector | |Ang|
+            X-ray wavelength.
+        *energy* : float or vector | keV
+            X-ray energy, if *wavelength* is not given.
+        *table* : PeriodicTable
+            The default periodictable unless a specific table has been requested.
+
+    :Returns:
+        *data* : structured array
+            One row for each element with X-ray data, with fields *symbol*,
+            *Z*, *mass*, *density*, and *sld*, *isld* in |1e-6/Ang^2|.  If
+            the wavelength or energy is a vector, the sld fields are vectors
+            of the same length.
+
+    The values are the same as :meth:`Xray.sld` for each element.  For
+    example::
+
+        >>> data = sld_array(energy=[8.048, 17.479])
+        >>> row = data[data['symbol'] == 'Si'][0]
+        >>> print("%.3f %.3f"%tuple(row['sld']))
+        20.070 19.825
+    """
+    table = default_table(table)
+    if energy is None:
+        if wavelength is None:
+            wavelength = table.Cu.K_alpha
+        energy = xray_energy(wavelength)
+    energy = numpy.asarray(energy, 'd')
+    elements = [el for el in table
+                if el.xray.sftable is not None
+                and el.number_density is not None]
+    shape = energy.shape
+    data = numpy.empty(len(elements), dtype=[
+        ('symbol', 'U8'), ('Z', 'i4'), ('mass', 'd'), ('density', 'd'),
+        ('sld', 'd', shape), ('isld', 'd', shape),
+        ])
+    data['symbol'] = [el.symbol for el in elements]
+    data['Z'] = [el.number for el in elements]
+    data['mass'] = [el.mass for el in elements]
+    data['density'] = [el.density for el in elements]
+    for k, el in enumerate(elements):
+        xsf = el.xray.sftable
+        scale = electron_radius*el.number_density*1e-8
+        data['sld'][k] = scale*numpy.interp(energy, xsf[0], xsf[1],
+                                            left=nan, right=nan)
+        data['isld'][k] = scale*numpy.interp(energy, xsf[0], xsf[2],
+                                             left=nan, right=nan)
+    return data
+
 def sld_table(wavelength=None, table=None):
     """
     Prints the xray SLD table for the given wavelength.
@@ -706,14 +952,37 @@ def sld_table(wavelength=None, table=None):
     table = default_table(table)
     if wavelength is None:
         wavelength = table.Cu.K_alpha
+    data = sld_array(wavelength=wavelength, table=table)
 
     # NBCU spreadsheet format
     print("X-ray scattering length density for %g Ang"%wavelength)
     print("%3s %6s %6s"%('El', 'rho', 'irho'))
-    for el in table:
-        rho, irho = el.xray.sld(wavelength=table.Cu.K_alpha)
-        if rho is not None:
-            print("%3s %6.2f %6.2f"%(el.symbol, rho, irho))
+    for row in data:
+        print("%3s %6.2f %6.2f"%(row['symbol'], row['sld'], row['isld']))
+
+def emission_array(table=None):
+    """
+    K-alpha and K-beta1 emission lines of every element.
+
+    :Parameters:
+        *table* : PeriodicTable
+            The default periodictable unless a specific table has been requested.
+
+    :Returns:
+        *data* : structured array
+            One row for each element with emission lines, with fields
+            *symbol*, *Z*, *K_alpha* and *K_beta1* in |Ang|.
+    """
+    table = default_table(table)
+    elements = [el for el in table if hasattr(el, 'K_alpha')]
+    data = numpy.empty(len(elements), dtype=[
+        ('symbol', 'U8'), ('Z', 'i4'), ('K_alpha', 'd'), ('K_beta1', 'd'),
+        ])
+    data['symbol'] = [el.symbol for el in elements]
+    data['Z'] = [el.number for el in elements]
+    data['K_alpha'] = [el.K_alpha for el in elements]
+    data['K_beta1'] = [el.K_beta1 for el in elements]
+    return data
 
 def emission_table(table=None):
     """
@@ -736,8 +1005,7 @@ def emission_table(table=None):
          Si  7.1263  6.7531
          ...
     """
-    table = default_table(table)
+    data = emission_array(table=table)
     print("%3s %7s %7s"%('El', 'Kalpha', 'Kbeta1'))
-    for el in table:
-        if hasattr(el, 'K_alpha'):
-            print("%3s %7.4f %7.4f"%(el.symbol, el.K_alpha, el.K_beta1))
+    for row in data:
+        print("%3s %7.4f %7.4f"%(row['symbol'], row['K_alpha'], row['K_beta1']))
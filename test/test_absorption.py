@@ -0,0 +1,107 @@
+import numpy as np
+
+from periodictable.nsf import neutron_scattering
+from periodictable.absorption import (Slab, Cylinder, Annulus,
+                                      absorption_factors, paalman_pings)
+
+def mu(material, wavelength):
+    return 1/neutron_scattering(material, wavelength=wavelength)[2]
+
+def test_slab():
+    t, L = 0.1, 5.
+    m = mu('H2O@1', L)
+    two_theta = np.array([0, 20, 60, 120, 160])
+    A = absorption_factors([('H2O@1', Slab(t))], wavelength=L,
+                           two_theta=two_theta, resolution=400)[0]
+    for a, angle in zip(A, two_theta):
+        c = np.cos(np.radians(angle))
+        if c > 0:
+            # transmission: l_in = z, l_out = (t-z)/cos(2 theta)
+            k = m*(1 - 1/c)
+            exact = np.exp(-m*t/c)*(np.expm1(-k*t)/(-k*t) if k != 0 else 1)
+        else:
+            # reflection: l_in = z, l_out = z/|cos(2 theta)|
+            k = m*(1 + 1/abs(c))
+            exact = -np.expm1(-k*t)/(k*t)
+        assert abs(a - exact) < 1e-5*exact
+
+    # Windows attenuate the incoming and outgoing beams in transmission
+    window = 'SiO2@2.2'
+    parts = [(window, Slab(0.1, position=-0.1)), ('H2O@1', Slab(t)),
+             (window, Slab(0.1, position=t))]
+    A_s = absorption_factors(parts, wavelength=L, two_theta=30)[1]
+    A = absorption_factors([('H2O@1', Slab(t))], wavelength=L, two_theta=30)[0]
+    c = np.cos(np.radians(30))
+    expected = A*np.exp(-mu(window, L)*0.1*(1 + 1/c))
+    assert abs(A_s - expected) < 1e-12
+
+def test_cylinder():
+    R = 0.3
+    wavelength = np.array([1., 4.])
+    A = absorption_factors([('V', Cylinder(R))], wavelength=wavelength,
+                           two_theta=[0, 90, 150], resolution=40)[0]
+    assert A.shape == (2, 3)
+    # In the forward direction the path length is the chord through the point
+    # The chord is zero at the ends, so the trapezoid rule is a plain sum.
+    y, dy = np.linspace(-R, R, 200001, retstep=True)
+    chord = 2*np.sqrt(R**2 - y**2)
+    for k, L in enumerate(wavelength):
+        exact = np.sum(np.exp(-mu('V', L)*chord)*chord)*dy/(np.pi*R**2)
+        assert abs(A[k, 0] - exact) < 1e-3*exact
+
+    # Annulus with the same material inside is the same as a cylinder,
+    # and a resolution change gives nearly the same answer.
+    parts = [('V', Cylinder(0.1)), ('V', Annulus(0.1, R))]
+    A_in, A_out = absorption_factors(parts, wavelength=wavelength,
+                                     two_theta=[0, 90, 150], resolution=40)
+    total = (A_in*0.1**2 + A_out*(R**2 - 0.1**2))/R**2
+    assert np.allclose(total, A, rtol=2e-3)
+    A_fine = absorption_factors([('V', Cylinder(R))], wavelength=wavelength,
+                                two_theta=[0, 90, 150], resolution=80)[0]
+    assert np.allclose(A, A_fine, rtol=1e-3)
+    A_chunks = absorption_factors([('V', Cylinder(R))], wavelength=wavelength,
+                                  two_theta=[0, 90, 150], resolution=40,
+                                  chunksize=100)[0]
+    assert np.allclose(A, A_chunks, rtol=1e-14)
+
+def test_cache():
+    from periodictable import elements, formula
+    def A(material, shape=Cylinder(0.3)):
+        return absorption_factors([(material, shape)], two_theta=30)[0]
+
+    # Private tables and later overrides are not hidden by the cache
+    table = elements.clone("absorption cache", properties=['neutron'])
+    public = A(formula('V', table=table))
+    table.override('V', 'neutron.absorption', 100.)
+    assert A(formula('V', table=table)) < public/2
+    assert A('V') == public
+
+    # Formulas with the same name and shapes which print the same differ
+    H2O = formula('H2O@1', name='sample')
+    D2O = formula('D2O@1', name='sample')
+    assert A(H2O) < A(D2O)
+    assert A('V', Cylinder(0.3000001)) != A('V', Cylinder(0.3))
+    assert A('V', Slab(0.1000001)) != A('V', Slab(0.1))
+
+def test_paalman_pings():
+    sample, container = 'Ni@8.9', 'V'
+    A_ssc, A_csc, A_cc = paalman_pings(sample, Cylinder(0.25),
+                                       container, Annulus(0.25, 0.3),
+                                       wavelength=[1, 2, 4],
+                                       two_theta=[10, 60, 120], resolution=10)
+    A_s = absorption_factors([(sample, Cylinder(0.25))],
+                             wavelength=[1, 2, 4], two_theta=[10, 60, 120],
+                             resolution=10)[0]
+    assert A_ssc.shape == A_csc.shape == A_cc.shape == (3, 3)
+    assert (A_ssc < A_s).all() and (A_csc < A_cc).all()
+    # Cached results are copies
+    A_ssc[...] = 0
+    assert (paalman_pings(sample, Cylinder(0.25), container,
+                          Annulus(0.25, 0.3), wavelength=[1, 2, 4],
+                          two_theta=[10, 60, 120], resolution=10)[0] > 0).all()
+
+if __name__ == "__main__":
+    test_slab()
+    test_cylinder()
+    test_cache()
+    test_paalman_pings()
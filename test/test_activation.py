@@ -0,0 +1,98 @@
+from io import StringIO
+from pickle import loads, dumps
+
+from periodictable import activation, Co
+
+def test_batch():
+    env = activation.ActivationEnvironment(fluence=1e5, Cd_ratio=70, fast_ratio=50)
+    inventory = StringIO(
+        "name,formula,mass,exposure,fluence\n"
+        "magnet,Co30Fe70,10,10,\n"
+        "salt,NaCl,2,,1e7\n"
+        "typo,Xx,1,,\n"
+        )
+    rows = list(activation.read_inventory(inventory))
+    assert rows[0] == dict(name='magnet', formula='Co30Fe70', mass=10., exposure=10.)
+    assert rows[1]['fluence'] == 1e7
+
+    # Batch results match the single sample calculation
+    serial = list(activation.batch_activation(rows, env, workers=1))
+    sample = activation.Sample("Co30Fe70", 10)
+    sample.calculate_activation(env, exposure=10)
+    total = [sum(v) for v in zip(*sample.activity.values())]
+    assert serial[0]['name'] == 'magnet'
+    assert all(abs(a-b) < 1e-12*b for a, b in zip(serial[0]['activity'], total))
+    assert len(serial[0]['products']) == len(sample.activity)
+    assert serial[1]['exposure'] == 1
+    assert serial[2]['error'] is not None
+
+    # Worker pool returns the same records in the same order
+    parallel = list(activation.batch_activation(iter(rows*3), env,
+                                                workers=2, chunksize=2))
+    assert parallel == serial*3
+
+    out = StringIO()
+    activation.write_activation_csv(serial, out)
+    lines = out.getvalue().splitlines()
+    assert lines[0] == "name,formula,mass,exposure,0 hrs,1 hrs,24 hrs,360 hrs,error"
+    assert lines[1].startswith("magnet,Co30Fe70,10,10,1.665,")
+    assert lines[3] == "typo,Xx,1,1,,,,,unknown element Xx"
+
+def test_response():
+    env = activation.ActivationEnvironment(fluence=1e8, Cd_ratio=70, fast_ratio=50)
+    response = activation.ActivationResponse(env, exposure=10, rest_times=[0, 1, 24])
+    for formula in ("Co30Fe70", "NaCl", "Co[59]Co", "W", "H2O"):
+        sample = activation.Sample(formula, 10)
+        sample.calculate_activation(env, exposure=10, rest_times=[0, 1, 24])
+        expected = {}
+        for el, frac in sample.formula.mass_fraction.items():
+            targets = ([(el, 1.)] if hasattr(el, 'element')
+                       else [(el[iso], el[iso].abundance*0.01) for iso in el.isotopes])
+            for iso, portion in targets:
+                for ai, v in activation.activity(iso, 10*frac*portion, env, 10,
+                                                 [0, 1, 24]).items():
+                    total = expected.get(ai, [0]*3)
+                    expected[ai] = [a+b for a, b in zip(total, v)]
+        result = response.activity(formula, 10)
+        assert set(result) == set(expected) == set(sample.activity)
+        for ai, v in expected.items():
+            assert all(abs(a-b) <= 1e-12*abs(b) for a, b in zip(result[ai], v))
+
+    # Element responses are computed once per target
+    records, values = response.response(Co)
+    assert records == Co[59].neutron_activation[:len(records)]
+    assert values.shape == (len(records), 3)
+    assert response.response(Co)[1] is values
+
+def test_cached_response():
+    # Samples keep the caller's environment even when the response is shared
+    env = activation.ActivationEnvironment(fluence=1e5, location="BT-2")
+    other = activation.ActivationEnvironment(fluence=1e5, location="NG-7")
+    first, second = activation.Sample("Co", 1), activation.Sample("Co", 1)
+    first.calculate_activation(env)
+    second.calculate_activation(other)
+    assert first.environment is env and second.environment is other
+    assert first.activity == second.activity
+
+    # Changing the environment after use changes the activity
+    env.fluence = 1e7
+    first.calculate_activation(env)
+    second.calculate_activation(activation.ActivationEnvironment(fluence=1e7))
+    assert first.activity == second.activity
+    second.calculate_activation(other)
+    assert first.activity != second.activity
+
+def test_table():
+    data = activation.activation_table()
+    records = Co[59].neutron_activation
+    assert [r.daughter for r in records[:3]] == ['Co-60m+', 'Co-61', 'Co-60']
+    assert records[2].Thalf_str == '5.272 y' and records[2].Thalf_hrs == 46182.72
+    assert records[0].fast is False and records[4].fast is True
+    assert loads(dumps(records[0])) is records[0]
+
+    # Vectorized queries over the columns
+    rows = data.producing('Co-60m')
+    assert set(data.isotope[rows]) == {'Co-59', 'Ni-60', 'Cu-63'}
+    assert list(data.rows(27, 59)) == [r._row for r in records]
+    assert len(data.rows(27, 1)) == 0
+    assert (data.Thalf_hrs > 0).all()
@@ -0,0 +1,94 @@
+import io
+import json
+import os
+import tempfile
+
+from periodictable import neutron_scattering, xray_sld, formula, Cu
+from periodictable.batch import read_rows, calculate, write_csv, write_jsonl
+from periodictable.batch import main, OUTPUT_COLUMNS
+
+INPUT = """\
+formula,density,wavelength,xray_energy
+H2O,1,,
+D2O@1n,,4.75,10
+Fe,7.87,,
+Xx,1,,
+CaCO3,,,
+NaCl,two,,
+"""
+
+def check(records):
+    assert [r['formula'] for r in records] \
+        == ['H2O', 'D2O', 'Fe', 'Xx', 'CaCO3', 'NaCl']
+    for r, (compound, L, E) in zip(records, [
+            ('H2O@1', 1.798, None), ('D2O@1n', 4.75, 10), ('Fe@7.87', 1.798, None)]):
+        assert r['error'] is None
+        sld, _, penetration = neutron_scattering(compound, wavelength=L)
+        assert all(abs(r[k] - v) < 1e-10*abs(v)
+                   for k, v in zip(('sld', 'isld', 'incoh'), sld))
+        assert abs(r['penetration'] - penetration) < 1e-10*penetration
+        if E is None:
+            rho, irho = xray_sld(compound, wavelength=Cu.K_alpha)
+        else:
+            rho, irho = xray_sld(compound, energy=E)
+        assert abs(r['xray_sld'] - rho) < 1e-10*rho
+        assert abs(r['xray_isld'] - irho) < 1e-10*irho
+        assert abs(r['mass'] - formula(compound).mass) < 1e-10
+    for r in records[3:]:
+        assert r['error'] and r['sld'] is None
+    assert 'density' in records[4]['error']
+
+def test():
+    rows = list(read_rows(io.StringIO(INPUT)))
+    assert rows[1] == {'formula': 'D2O@1n', 'wavelength': 4.75, 'xray_energy': 10.}
+    check(list(calculate(rows, chunksize=4)))
+    check(list(calculate(rows, chunksize=2, workers=2)))
+
+    # Plain lists of formulas
+    rows = list(read_rows(io.StringIO("H2O@1\n\nD2O@1n\n")))
+    assert rows == [{'formula': 'H2O@1'}, {'formula': 'D2O@1n'}]
+    records = list(calculate(rows, energy=25.3))
+    assert abs(records[1]['sld'] - neutron_scattering('D2O@1n', energy=25.3)[0][0]) < 1e-10
+
+def test_missing_neutron():
+    # At has no neutron data, but has mass and X-ray scattering factors
+    record, = calculate([{'formula': 'At2', 'density': 5}], xray_energy=8.)
+    assert record['error'] is None
+    assert abs(record['mass'] - formula('At2').mass) < 1e-10
+    assert record['sld'] != record['sld'] and record['isld'] != record['isld']
+    assert abs(record['xray_sld'] - xray_sld('At2@5', energy=8.)[0]) < 1e-10
+
+def test_output():
+    records = list(calculate(read_rows(io.StringIO(INPUT))))
+    fh = io.StringIO()
+    write_jsonl(records, fh)
+    lines = [json.loads(line) for line in fh.getvalue().splitlines()]
+    assert lines[0]['sld'] == records[0]['sld'] and lines[3]['sld'] is None
+
+    # Numbers use the given format, with missing values left blank
+    fh = io.StringIO()
+    write_csv(records, fh, format="%.3g")
+    lines = fh.getvalue().splitlines()
+    assert lines[0] == ",".join(OUTPUT_COLUMNS)
+    assert lines[1].startswith("H2O,1,18,1.8,-0.561,")
+    assert lines[4] == "Xx" + ","*(len(OUTPUT_COLUMNS) - 1) + "unknown element Xx"
+
+    path = tempfile.mkdtemp()
+    infile = os.path.join(path, 'in.csv')
+    outfile = os.path.join(path, 'out.csv')
+    with open(infile, 'w') as fh:
+        fh.write(INPUT)
+    main([infile, '-o', outfile, '--xray-wavelength', str(Cu.K_alpha)])
+    with open(outfile) as fh:
+        lines = fh.read().splitlines()
+    assert lines[0] == ",".join(OUTPUT_COLUMNS)
+    assert len(lines) == 7 and lines[1].startswith("H2O,1,18.0153,1.798,")
+    assert lines[4].endswith("unknown element Xx")
+    os.remove(infile)
+    os.remove(outfile)
+    os.rmdir(path)
+
+if __name__ == "__main__":
+    test()
+    test_missing_neutron()
+    test_output()
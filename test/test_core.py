@@ -62,6 +62,17 @@ def test():
     except ValueError as msg:
         assert str(msg) == "-3 is not a valid charge for Fe"
 
+    # Check that isotopes and ions delegate to the element and accept
+    # attributes which are not part of the table
+    assert H[2].name == 'deuterium' and Fe[56].name == 'iron'
+    assert Fe[56].number == 26 and Fe[56].ion[2].number == 26
+    assert str(H[2].ion[1]) == "D{+}" and Fe[56].ion[2].symbol == 'Fe'
+    Fe[56].custom = 5
+    assert Fe[56].custom == 5 and not hasattr(Fe[58], 'custom')
+    Fe[56].ion[2].custom = 6
+    assert Fe[56].ion[2].custom == 6 and Fe[56].ion[3].custom == 5
+    del Fe[56].custom
+
     assert data_files()[0][0] == "periodictable-data/xsf"
 
 if __name__ == "__main__":
@@ -181,6 +181,80 @@ def test():
     # fasta
     check_formula(formula('aa:A'), formula('C3H5NO'))
 
+def test_mixer():
+    import numpy as np
+    from periodictable import neutron_sld, xray_sld
+    from periodictable.formulas import Mixer
+    components = ['H2O@1', 'D2O@1n', 'NaCl@2.16', 'SiO2']
+    fractions = np.array([[1, 0, 0, 0], [0.3, 0.2, 0.1, 0.4], [2, 1, 0, 0]])
+    for by, mix in (('weight', mix_by_weight), ('volume', mix_by_volume)):
+        if by == 'volume':
+            components[-1] = 'SiO2@2.2'
+        mixer = Mixer(components, by=by)
+        counts = mixer.counts(fractions)
+        density = mixer.density(fractions)
+        rho, irho, inc = mixer.neutron_sld(fractions, wavelength=4.75)
+        xrho, xirho = mixer.xray_sld(fractions, energy=8.05)
+        for k, row in enumerate(fractions):
+            args = sum(([c, q] for c, q in zip(components, row)), [])
+            f = mix(*args)
+            assert all(abs(f.atoms.get(a, 0) - counts[k, j]) < 1e-10
+                       for j, a in enumerate(mixer.atoms))
+            assert abs(mixer.mass(fractions)[k] - f.mass) < 1e-10*f.mass
+            if f.density is None:
+                # Mixing by weight with SiO2, which has no density
+                assert row[3] > 0 and np.isnan(density[k])
+                continue
+            assert abs(density[k] - f.density) < 1e-12*f.density
+            assert np.allclose(neutron_sld(f, wavelength=4.75),
+                               (rho[k], irho[k], inc[k]))
+            assert np.allclose(xray_sld(f, energy=8.05), (xrho[k], xirho[k]))
+
+    # Vacuum, single mixture and vector energy
+    assert mixer.neutron_sld([0, 0, 0, 0]) == (0, 0, 0)
+    assert mixer.xray_sld([1, 0, 0, 0], energy=[8, 10])[0].shape == (2,)
+    try:
+        Mixer(['H2O', 'D2O@1n'], by='volume')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError for missing density")
+
+def test_prepare():
+    import numpy as np
+    from periodictable import neutron_sld, xray_sld, neutron_scattering
+    from periodictable.formulas import prepare
+    energy = np.linspace(1, 24, 50)
+    for compound in ["SiO2@2.65", "D2O@1.11n", "Gd2O3@7.4", "H[2]2O@1.1"]:
+        f = formula(compound)
+        prepared = prepare(compound)
+        for L in (1.798, 4.75):
+            assert np.allclose(prepared.neutron_sld(wavelength=L),
+                               neutron_sld(f, wavelength=L), rtol=1e-12)
+        assert np.allclose(prepared.xray_sld(energy=energy),
+                           xray_sld(f, energy=energy), rtol=1e-12)
+        assert np.allclose(prepared.xray_sld(wavelength=1.54, density=2),
+                           xray_sld(f, wavelength=1.54, density=2), rtol=1e-12)
+        penetration = neutron_scattering(f, wavelength=4.75)[2]
+        assert np.allclose(prepared.neutron_attenuation(wavelength=4.75),
+                           1/penetration, rtol=1e-12)
+
+    # Vector density broadcast against wavelength
+    rho, irho, inc = prepare("SiO2").neutron_sld(wavelength=[[1], [5]],
+                                                 density=[1, 2, 3])
+    assert rho.shape == irho.shape == inc.shape == (2, 3)
+    assert np.allclose(rho[1], neutron_sld("SiO2", density=2.)[0]*np.array([0.5, 1, 1.5]))
+    assert prepare("").xray_sld(energy=8, density=1) == (0, 0)
+
+    # Energy dependent absorption replaces the tabulated absorption
+    from periodictable import B
+    from periodictable.constants import avogadro_number
+    boron = prepare("B@2.34")
+    flat = boron.neutron_attenuation(wavelength=[1, 5],
+                                     absorbers={B: lambda L: 0*L})
+    N = 2.34/boron.mass*avogadro_number*1e-24
+    assert np.allclose(flat, N*boron.sigma_s, rtol=1e-12)
+
 def check_mass(f1, mass, tol=1e-14):
     """Check that the total mass of f1 is as expected."""
     assert abs(f1.total_mass - mass) < mass*tol
@@ -194,3 +268,5 @@ def check_formula(f1, f2, tol=1e-14):
 
 if __name__ == "__main__":
     test()
+    test_mixer()
+    test_prepare()
@@ -1,4 +1,6 @@
+import numpy
 from periodictable import elements
+from periodictable.magnetic_ff import formfactor_table
 
 def test():
     A,a,B,b,C,c,D = elements.Fe.magnetic_ff[2].j0
@@ -6,4 +8,32 @@ def test():
     ion = elements.Fe.ion[2]
     assert ion.magnetic_ff[ion.charge].j0[3] == b
 
-if __name__ == "__main__": test()
+def test_table():
+    Q = numpy.linspace(0, 10, 21)
+    ions = [elements.Fe.ion[2], elements.Co.ion[2], elements.O, elements.Ho.ion[3]]
+    ff = formfactor_table(ions, ['j0', 'j2', 'j4', 'M', 'dipole'], Q,
+                          g=[2, 2.5, 2, 1.25])
+    assert ff.shape == (4, 5, 21)
+    for k, ion in enumerate(ions[:2]):
+        mff = ion.magnetic_ff[ion.charge]
+        assert numpy.allclose(ff[k, 0], mff.j0_Q(Q))
+        assert numpy.allclose(ff[k, 1], mff.j2_Q(Q))
+        assert numpy.allclose(ff[k, 2], mff.j4_Q(Q))
+        assert numpy.allclose(ff[k, 3], mff.M_Q(Q))
+    dipole = ff[1, 0] + (2/2.5 - 1)*ff[1, 1]
+    assert numpy.allclose(ff[1, 4], dipole)
+    # Oxygen has no magnetic form factor
+    assert numpy.isnan(ff[2]).all()
+
+    ff = formfactor_table([elements.Fe.magnetic_ff[3]], ['J'], Q.reshape(3, 7))
+    assert ff.shape == (1, 1, 3, 7)
+    try:
+        formfactor_table(ions, ['dipole'], Q)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("dipole without g should fail")
+
+if __name__ == "__main__":
+    test()
+    test_table()
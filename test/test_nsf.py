@@ -211,6 +211,141 @@ def test_abundance():
 
 
 
+def test_sld_array():
+    wavelength = numpy.array([1, 4.75, 10])
+    data = nsf.sld_array(wavelength=wavelength)
+    assert data['sld'].shape == (len(data), 3)
+    for row in data[::7]:
+        if row['A'] == 0:
+            atom = elements[row['Z']]
+        else:
+            atom = elements[row['Z']][row['A']]
+        assert str(atom) == row['symbol']
+        for k, L in enumerate(wavelength):
+            sld = atom.neutron.sld(wavelength=L)
+            assert numpy.allclose((row['sld'][k], row['isld'][k], row['incoh'][k]),
+                                  sld, rtol=1e-14, atol=0)
+    data = nsf.sld_array(wavelength=4.75, isotopes=False)
+    assert (data['A'] == 0).all() and data['sld'].shape == (len(data),)
+    assert data[data['symbol'] == 'Si']['sld'][0] == elements.Si.neutron.sld(wavelength=4.75)[0]
+
+
+def test_transmission():
+    from periodictable.nsf import transmission
+    wavelength = numpy.linspace(1, 20, 7)
+    thickness = numpy.array([0.05, 0.1, 0.2])
+    stack = [('H2O@1', thickness), ('SiO2@2.2', 0.25), ('Al@2.7', 0.1)]
+    T = transmission(stack, wavelength=wavelength)
+    assert T.shape == (3, 7)
+    for i, t in enumerate(thickness):
+        for j, L in enumerate(wavelength):
+            mu_t = sum(d/neutron_scattering(m, wavelength=L)[2]
+                       for m, d in [('H2O@1', t), ('SiO2@2.2', 0.25), ('Al@2.7', 0.1)])
+            assert abs(T[i, j] - numpy.exp(-mu_t)) < 1e-12
+
+    # Energy dependent absorbers replace the 1/v absorption
+    Gd = elements.Gd
+    one_over_v = lambda L: Gd.neutron.absorption*L/nsf.ABSORPTION_WAVELENGTH
+    stack = [('Gd2O3@7.4', 1e-4)]
+    assert numpy.allclose(transmission(stack, wavelength=wavelength),
+                          transmission(stack, wavelength=wavelength,
+                                       absorbers={Gd: one_over_v}))
+    T = transmission(stack, wavelength=wavelength,
+                     absorbers={Gd: lambda L: 0*L})
+    assert (T > transmission(stack, wavelength=wavelength)).all()
+    assert T.shape == (7,) and transmission([('H2O@1', 0.1)]) < 1
+
+def test_reflectivity():
+    from periodictable.nsf import neutron_reflectivity
+    Q = numpy.linspace(0.001, 0.2, 50)
+    Si = complex(*neutron_sld('Si')[:2])
+    Ni = complex(*neutron_sld('Ni')[:2])
+
+    # Single interface with Nevot-Croce roughness
+    k0 = Q/2
+    k1 = numpy.sqrt(k0**2 - 4e-6*pi*Si.conjugate())
+    fresnel = abs((k0 - k1)/(k0 + k1)*numpy.exp(-2*k0*k1*5**2))**2
+    R = neutron_reflectivity([(0, 0, 5), ('Si', 0)], Q=Q)
+    assert numpy.allclose(R, fresnel, rtol=1e-12, atol=0)
+
+    # Film on a substrate, checked against matching the plane waves at
+    # each interface
+    def plane_waves(q, rho, depth):
+        k = [numpy.sqrt((q/2)**2 - 4e-6*pi*(numpy.conj(v) - rho[0]) + 0j)
+             for v in rho]
+        z = numpy.cumsum([0] + depth[1:-1])
+        A, B = 1, 0
+        for j in range(len(k)-1, 0, -1):
+            u, v = A*numpy.exp(1j*k[j]*z[j-1]), B*numpy.exp(-1j*k[j]*z[j-1])
+            ratio = k[j]/k[j-1]
+            A = ((u + v) + ratio*(u - v))/2*numpy.exp(-1j*k[j-1]*z[j-1])
+            B = ((u + v) - ratio*(u - v))/2*numpy.exp(1j*k[j-1]*z[j-1])
+        return abs(B/A)**2
+    R = neutron_reflectivity([(0, 0), ('Ni', 100), ('Ti', 37), ('Si', 0)], Q=Q)
+    rho = [0, Ni, complex(*neutron_sld('Ti')[:2]), Si]
+    assert numpy.allclose(R, plane_waves(Q, rho, [0, 100, 37, 0]),
+                          rtol=1e-10, atol=0)
+
+    # Batches of models match single models, with or without chunks
+    thickness = numpy.linspace(50, 150, 7)
+    layers = [(0, 0, 3), (Ni, thickness, 5), (Si, 0)]
+    R = neutron_reflectivity(layers, Q=Q)
+    assert R.shape == (7, 50)
+    assert numpy.allclose(neutron_reflectivity(layers, Q=Q, chunksize=30), R)
+    for k, d in enumerate(thickness):
+        assert numpy.allclose(R[k],
+            neutron_reflectivity([(0, 0, 3), (Ni, d, 5), (Si, 0)], Q=Q))
+
+    # Absorbing films attenuate rather than amplify, and a thick film
+    # reflects like the bulk material
+    for material in ('Gd@7.9', 'B[10]@2.3', complex(0.5, 2.0)):
+        R = neutron_reflectivity([(0, 0), (material, 2000), ('Si', 0)], Q=Q)
+        assert (R <= 1).all()
+    bulk = complex(0.5, 2.0)
+    R = neutron_reflectivity([(0, 0), (bulk, 100000), ('Si', 0)], Q=Q)
+    assert numpy.allclose(R, neutron_reflectivity([(0, 0), (bulk, 0)], Q=Q),
+                          rtol=1e-8, atol=0)
+
+    # Wavelength and angle
+    wavelength = numpy.array([[4.75], [5.0]])
+    angle = numpy.array([0.3, 0.6, 1.2])
+    R = neutron_reflectivity(layers, wavelength=wavelength, angle=angle)
+    assert R.shape == (7, 2, 3)
+    Q = 4*pi*numpy.sin(numpy.radians(angle[1]))/5.0
+    assert abs(R[3, 1, 1] - neutron_reflectivity(layers, Q=Q)[3]) < 1e-14
+
+def test_enrichment():
+    from periodictable.nsf import Enrichment
+    B, H = elements.B, elements.H
+    boron = Enrichment(B)
+    assert [iso.isotope for iso in boron.isotopes] == [10, 11]
+    assert abs(boron.mass(boron.natural) - B.mass) < 1e-2
+
+    # Pure isotopes match the isotope values and mixtures match formulas
+    abundance = numpy.array([[100, 0], [0, 100], [90, 10], [20, 80]])
+    rho, irho, inc = boron.sld(abundance, wavelength=4.75)
+    for k, iso in enumerate(boron.isotopes):
+        assert numpy.allclose((rho[k], irho[k], inc[k]),
+                              iso.neutron.sld(wavelength=4.75), rtol=1e-14)
+    rho, irho, inc = boron.sld(abundance, wavelength=4.75, density=2.3)
+    for k, (c10, c11) in list(enumerate(abundance))[2:]:
+        sld = neutron_sld("B[10]%gB[11]%g"%(c10, c11), density=2.3,
+                          wavelength=4.75)
+        assert numpy.allclose((rho[k], irho[k], inc[k]), sld, rtol=1e-12)
+
+    # Isotope disorder adds to the incoherent cross section
+    hydrogen = Enrichment(H, isotopes=[1, 2])
+    b_c, coh, inc, _ = hydrogen.cross_sections([[1, 0], [0, 1], [1, 1]])
+    disorder = 4*pi/100*(H[1].neutron.b_c - H[2].neutron.b_c)**2/4
+    assert abs(inc[2] - ((inc[0] + inc[1])/2 + disorder)) < 1e-10
+
+    try:
+        Enrichment(H, isotopes=[1, 6])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError for missing data")
+
 def _summarize(M):
     from periodictable.nsf import neutron_sld, neutron_xs
     sld = neutron_sld(M,wavelength=4.75)
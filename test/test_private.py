@@ -43,3 +43,101 @@ def test():
     assert privateH2O == publicH2O.change_table(private)
     private.H._mass = 1
     assert formula('H2', table=private).mass == 2
+
+def test_clone():
+    # Clone shares data with the public table
+    clone = elements.clone("clone", properties=['neutron', 'xray'],
+                           overrides={'Ni': {'density': 9., 'neutron.b_c': 1.},
+                                      '58-Ni': {'mass': 58.}})
+    assert 'neutron' in clone.properties and 'mass' in clone.properties
+    assert clone.Cm.mass == elements.Cm.mass
+    assert clone.Fe.neutron is elements.Fe.neutron
+    assert clone.D.mass == elements.D.mass and str(clone.D) == 'D'
+    assert clone.Cm.xray.sftable is elements.Cm.xray.sftable
+    assert clone.Cm.xray is not elements.Cm.xray
+    assert clone.Cm.xray.element is clone.Cm
+
+    # Overrides are copied rather than changing the public table
+    assert clone.Ni.density == 9. and elements.Ni.density != 9.
+    assert clone.Ni.neutron.b_c == 1. and elements.Ni.neutron.b_c != 1.
+    assert clone.Ni.neutron.b_c_i == elements.Ni.neutron.b_c_i
+    assert clone.Ni[58].mass == 58. and elements.Ni[58].mass != 58.
+    clone.override(clone.Fe[56], 'neutron.b_c', 2.)
+    assert elements.Fe[56].neutron.b_c != 2.
+
+    # Formulas use the cloned values
+    assert formula('Ni', table=clone).mass == clone.Ni.mass
+    assert formula('Ni[58]', table=clone).mass == 58.
+
+def test_recipe():
+    from pickle import dumps, loads
+    from periodictable import core
+    mine = elements.clone("recipe", properties=['neutron'],
+                          overrides={'Ni': {'neutron.b_c': 2.8}})
+    mine.override('D', 'mass', 2.5)
+    assert mine.recipe[0] == "recipe" and 'neutron' in mine.recipe[1]
+    assert mine.recipe[2] == (('Ni', 'neutron.b_c', 2.8), ('D', 'mass', 2.5))
+    assert mine.recipe is mine.recipe
+
+    # The recipe is stored once for all atoms and formulas from the table
+    items = [mine.Ni, mine.D, mine.Ni[58].ion[2],
+             formula('D2O@1.1', table=mine), formula('NiO', table=mine)]
+    data = dumps(items)
+    assert data.count(b'neutron.b_c') == 1
+    assert loads(data)[0] is mine.Ni
+
+    # A process without the table rebuilds it from the recipe, once
+    del core.PRIVATE_TABLES["recipe"]
+    Ni, D, ion, D2O, NiO = loads(data)
+    rebuilt = core.PRIVATE_TABLES["recipe"]
+    assert rebuilt is not mine and Ni is rebuilt.Ni and NiO.atoms[Ni] == 1
+    assert Ni.neutron.b_c == 2.8 and D.mass == 2.5 and D2O.density == 1.1
+    assert ion.charge == 2 and ion.element is rebuilt.Ni[58]
+    assert (D2O.neutron_sld(wavelength=4.75)
+            == formula("D2O@1.1", table=mine).neutron_sld(wavelength=4.75))
+    assert loads(data)[0] is Ni
+    assert dumps(elements.Ni).count(b'public') == 1
+
+    # A worker which already has the table follows later overrides made
+    # by the parent, with PRIVATE_TABLES switched to act as each process
+    def parent(action):
+        worker = core.PRIVATE_TABLES["recipe"]
+        core.PRIVATE_TABLES["recipe"] = mine
+        try:
+            return action()
+        finally:
+            core.PRIVATE_TABLES["recipe"] = worker
+    newer = parent(lambda: mine.override('Ni', 'neutron.b_c', 5.)
+                   or dumps(mine.Ni))
+    assert loads(newer) is Ni and Ni.neutron.b_c == 5.
+    # An earlier recipe replaces a rebuilt table, but not the original
+    assert loads(data)[0].neutron.b_c == 2.8
+    assert core.PRIVATE_TABLES["recipe"] is not rebuilt
+    try:
+        parent(lambda: loads(data))
+    except ValueError as exc:
+        assert "does not match" in str(exc)
+    else:
+        raise AssertionError("stale recipe used for the original table")
+
+    # Failed overrides are not recorded
+    try:
+        mine.override('Ni', 'nosuch.b_c', 1.)
+    except AttributeError:
+        pass
+    assert mine.recipe[2][-1] == ('Ni', 'neutron.b_c', 5.)
+
+    # Tables not built by clone have no recipe, so they must exist in the
+    # process which unpickles their atoms
+    custom = PeriodicTable("no recipe")
+    mass.init(custom)
+    custom.H._mass = 1
+    assert custom.recipe is None
+    data = dumps(custom.H)
+    del core.PRIVATE_TABLES["no recipe"]
+    try:
+        loads(data)
+    except ValueError as exc:
+        assert "not initialized" in str(exc)
+    else:
+        raise AssertionError("table without recipe was rebuilt")
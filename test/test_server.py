@@ -0,0 +1,162 @@
+import asyncio
+import json
+
+from periodictable import formula, neutron_scattering, xray_sld
+from periodictable.server import SLDServer, compute_batch
+from periodictable.server import MAX_BODY_SIZE, MAX_HEADER_LINES, MAX_HEADER_SIZE
+
+async def request(port, method, path, data=None, repeat=1):
+    """
+    Send *repeat* requests on one connection, returning (status, reply)
+    for each.
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(data).encode('utf-8') if data is not None else b''
+    replies = []
+    for _ in range(repeat):
+        writer.write(("%s %s HTTP/1.1\r\nHost: localhost\r\n"
+                      "Content-Length: %d\r\n\r\n"
+                      % (method, path, len(body))).encode('latin-1') + body)
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.lower()] = value.strip()
+        reply = await reader.readexactly(int(headers['content-length']))
+        replies.append((status, json.loads(reply.decode('utf-8'))))
+    writer.close()
+    return replies if repeat > 1 else replies[0]
+
+async def raw_request(port, data):
+    """
+    Send the bytes *data* and return the response status, or None if the
+    connection is closed without a response.
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(data)
+    line = await reader.readline()
+    writer.close()
+    return int(line.split()[1]) if line else None
+
+async def run_server_checks():
+    server = SLDServer(port=0, workers=1, batch_delay=0.05)
+    await server.start()
+    try:
+        port = server.port
+
+        # Concurrent requests are computed in one batch, with duplicates
+        # sharing the same computation.
+        wavelengths = [1, 2, 4.75, 5, 4.75]
+        replies = await asyncio.gather(*[
+            request(port, 'POST', '/neutron_scattering',
+                    {"formula": "D2O@1.11n", "wavelength": L})
+            for L in wavelengths])
+        assert server.batches == 1 and server.computed == 4
+        for L, (status, reply) in zip(wavelengths, replies):
+            sld, xs, penetration = neutron_scattering("D2O@1.11n", wavelength=L)
+            assert status == 200
+            assert all(abs(a-b) < 1e-12*abs(b) for a, b in zip(reply['sld'], sld))
+            assert all(abs(a-b) < 1e-12*abs(b) for a, b in zip(reply['xs'], xs))
+            assert abs(reply['penetration'] - penetration) < 1e-12*penetration
+
+        # Repeated requests come from the cache.
+        await request(port, 'POST', '/neutron_scattering',
+                      {"wavelength": 2, "formula": "D2O@1.11n"})
+        assert server.batches == 1
+
+        # Lists of items, with errors reported per item, on a connection
+        # which is kept open between requests.
+        items = [{"formula": "SiO2@2.2", "energy": 8.05},
+                 {"formula": "SiO2@2.2", "wavelength": 1.54},
+                 {"formula": "Xx@1", "energy": 8.05}]
+        for status, reply in await request(port, 'POST', '/xray_sld', items,
+                                           repeat=2):
+            assert status == 200
+            rho, irho = xray_sld("SiO2@2.2", energy=8.05)
+            assert abs(reply[0]['sld'][0] - rho) < 1e-12*rho
+            assert abs(reply[0]['sld'][1] - irho) < 1e-12*irho
+            assert 'error' in reply[2]
+
+        status, reply = await request(port, 'POST', '/formula',
+                                      {"formula": "CaCO3", "density": 2.71})
+        assert status == 200
+        assert reply['hill'] == "CCaO3" and reply['density'] == 2.71
+        assert abs(reply['mass'] - formula("CaCO3").mass) < 1e-12
+
+        status, reply = await request(port, 'POST', '/activation',
+                                      {"formula": "Co", "mass": 10,
+                                       "exposure": 24, "fluence": 1e8,
+                                       "rest_times": [0, 24]})
+        assert status == 200 and reply['error'] is None
+        assert len(reply['activity']) == 2 and reply['activity'][0] > 0
+
+        # Errors
+        status, reply = await request(port, 'POST', '/xray_sld',
+                                      {"formula": "H2O", "energy": 8})
+        assert status == 400 and 'density' in reply['error']
+        status, reply = await request(port, 'POST', '/unknown', {})
+        assert status == 404
+        status, reply = await request(port, 'GET', '/formula')
+        assert status == 405
+        for data in (b"GET\r\n\r\n",
+                     b"POST /formula HTTP/1.1\r\nContent-Length: x\r\n\r\n",
+                     b"POST /formula HTTP/1.1\r\nContent-Length: -1\r\n\r\n",
+                     b"POST /formula HTTP/1.1\r\nContent-Length: %d\r\n\r\n"
+                     % (MAX_BODY_SIZE + 1),
+                     b"GET / HTTP/1.1\r\n" + b"X: y\r\n"*(MAX_HEADER_LINES + 1),
+                     b"GET / HTTP/1.1\r\nX: " + b"y"*(MAX_HEADER_SIZE//2)
+                     + b"\r\nY: " + b"y"*(MAX_HEADER_SIZE//2) + b"\r\n\r\n"):
+            assert await raw_request(port, data) == 400
+        status, reply = await request(port, 'GET', '/')
+        assert status == 200 and 'formula' in reply['endpoints']
+        assert reply['requests'] == server.requests
+    finally:
+        await server.close()
+
+async def run_worker_checks():
+    server = SLDServer(port=0, workers=2, batch_size=2, batch_delay=0.05)
+    await server.start()
+    try:
+        # Batches are spread over the worker processes.
+        wavelengths = [1, 2, 4.75, 5]
+        replies = await asyncio.gather(*[
+            request(server.port, 'POST', '/neutron_scattering',
+                    {"formula": "D2O@1.11n", "wavelength": L})
+            for L in wavelengths])
+        assert server.batches == 2 and server.computed == 4
+        for L, (status, reply) in zip(wavelengths, replies):
+            sld, xs, penetration = neutron_scattering("D2O@1.11n", wavelength=L)
+            assert status == 200
+            assert all(abs(a-b) < 1e-12*abs(b) for a, b in zip(reply['sld'], sld))
+
+        status, reply = await request(server.port, 'POST', '/activation',
+                                      [{"formula": "Co", "mass": 10},
+                                       {"formula": "Xx", "mass": 1}])
+        assert status == 200 and reply[0]['error'] is None
+        assert 'Xx' in reply[1]['error']
+    finally:
+        await server.close()
+
+def test():
+    asyncio.run(run_server_checks())
+
+def test_workers():
+    asyncio.run(run_worker_checks())
+
+def test_compute_batch():
+    results = compute_batch('neutron_scattering', [
+        {"formula": "H2O@1", "wavelength": 1.798},
+        {"formula": "H2O@1", "energy": 25.3},
+        {"formula": "H2O"},
+        ])
+    assert abs(results[0]['sld'][0] - neutron_scattering("H2O@1")[0][0]) < 1e-12
+    assert abs(results[1]['sld'][1] - results[0]['sld'][1]) < 1e-3*results[0]['sld'][1]
+    assert 'error' in results[2]
+
+if __name__ == "__main__":
+    test()
+    test_workers()
+    test_compute_batch()
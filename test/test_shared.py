@@ -0,0 +1,65 @@
+import numpy as np
+
+from periodictable import elements, mass, density
+from periodictable.core import PeriodicTable
+from periodictable.activation import activation_table
+from periodictable.shared import SharedTables, attach
+
+def _sld(formula):
+    import periodictable
+    return periodictable.neutron_sld(formula, density=1)[0]
+
+def test_attach():
+    with SharedTables() as tables:
+        assert not tables.arrays['atoms'].flags.writeable
+        private = PeriodicTable("shared-test")
+        mass.init(private)
+        density.init(private)
+        arrays = attach(tables.manifest, table=private)
+        assert 'neutron' in private.properties
+        for el in elements:
+            for atom in [el] + list(el):
+                if 'neutron' not in atom.__dict__:
+                    continue
+                copy = private[el.number]
+                if atom is not el:
+                    copy = copy[atom.isotope]
+                    assert copy.nuclear_spin == atom.nuclear_spin
+                for name in ('b_c', 'b_c_i', 'total', 'absorption',
+                             'abundance', 'is_energy_dependent'):
+                    assert getattr(copy.neutron, name) \
+                        == getattr(atom.neutron, name)
+                assert (copy.neutron.sld(wavelength=4.75)
+                        == atom.neutron.sld(wavelength=4.75))
+
+        # X-ray tables in the process cache are the same values.
+        Fe = arrays['xray_index'][arrays['xray_index']['Z'] == 26][0]
+        assert np.array_equal(arrays['xray'][:, Fe['start']:Fe['stop']],
+                              elements.Fe.xray.sftable, equal_nan=True)
+        assert len(arrays['activation']) == len(activation_table().data)
+
+def test_private_table():
+    from periodictable import core
+    mine = elements.clone("shared-recipe", properties=['neutron'],
+                          overrides={'Ni': {'neutron.b_c': 2.8, 'mass': 60.}})
+    with SharedTables(table=mine) as tables:
+        assert tables.manifest['table'] == mine.recipe
+        # A worker without the table rebuilds it with the shared data
+        del core.PRIVATE_TABLES["shared-recipe"]
+        attach(tables.manifest)
+        rebuilt = core.PRIVATE_TABLES["shared-recipe"]
+        assert rebuilt is not mine and rebuilt.recipe[2] == mine.recipe[2]
+        assert rebuilt.Ni.neutron.b_c == 2.8 and rebuilt.Ni.mass == 60.
+        assert rebuilt.Fe.neutron.b_c == elements.Fe.neutron.b_c
+
+def test_executor():
+    formulas = ['H2O', 'D2O', 'SiO2']
+    with SharedTables(properties=('neutron',)) as tables:
+        with tables.executor(max_workers=2) as pool:
+            rho = list(pool.map(_sld, formulas))
+    assert rho == [_sld(f) for f in formulas]
+
+if __name__ == "__main__":
+    test_attach()
+    test_private_table()
+    test_executor()
@@ -158,7 +158,55 @@ def test_refl():
     assert numpy.max(abs((R-numpy.vstack([R2,R3]))/R)) < 1e-4
 
 
+def test_sld_array():
+    from periodictable import elements
+    from periodictable.xsf import sld_array, emission_array
+    energy = numpy.array([1, 8.05, 17.5])
+    data = sld_array(energy=energy)
+    assert data['sld'].shape == (len(data), 3)
+    for row in data:
+        rho, irho = elements[row['Z']].xray.sld(energy=energy)
+        assert numpy.allclose(row['sld'], rho, rtol=1e-14, equal_nan=True)
+        assert numpy.allclose(row['isld'], irho, rtol=1e-14, equal_nan=True)
+    rho, irho = sld_array(wavelength=Cu.K_alpha)[Cu.number-1][['sld', 'isld']]
+    assert (rho, irho) == Cu.xray.sld(wavelength=Cu.K_alpha)
+
+    lines = emission_array()
+    assert lines[lines['symbol'] == 'Cu']['K_alpha'][0] == Cu.K_alpha
+
+def test_transmission():
+    from periodictable.xsf import (attenuation_length, xray_transmission,
+                                   energy_grid, xray_wavelength)
+    energy = numpy.array([1.5, 8.05, 8.97, 8.99, 17.5])
+    thickness = numpy.array([10e-4, 25e-4])
+    T = xray_transmission([('Cu', thickness), ('SiO2@2.2', 0.01)],
+                          energy=energy)
+    assert T.shape == (2, 5)
+    for j, E in enumerate(energy):
+        L = xray_wavelength(E)
+        mu_Cu = 2*L*xray_sld('Cu', energy=E)[1]*100
+        mu_SiO2 = 2*L*xray_sld('SiO2', density=2.2, energy=E)[1]*100
+        assert abs(attenuation_length('Cu', energy=E) - 1/mu_Cu) < 1e-12/mu_Cu
+        for i, t in enumerate(thickness):
+            assert abs(T[i, j] - numpy.exp(-mu_Cu*t - mu_SiO2*0.01)) < 1e-12
+
+    # The grid includes the tabulated points on either side of the edge
+    grid = energy_grid(['Cu'], 5, 20, n=50)
+    assert len(grid) > 50
+    assert abs(grid - 8.9788).min() < 1e-9 and abs(grid - 8.979).min() < 1e-9
+    edge = xray_transmission([('Cu', 1e-4)], energy=[8.9788, 8.979])
+    assert numpy.ptp(edge) > 0.1
+
+    # The calculator samples the edges itself given an energy range
+    stack = [('Cu', thickness), ('SiO2@2.2', 0.01)]
+    E, T = xray_transmission(stack, energy_range=(5, 20), n=50)
+    assert T.shape == (2, len(E))
+    assert (E == energy_grid(['Cu', 'SiO2@2.2'], 5, 20, n=50)).all()
+    assert (T == xray_transmission(stack, energy=E)).all()
+
 def main():
     test_xsf()
     test_refl()
+    test_sld_array()
+    test_transmission()
 if __name__ == "__main__": main()